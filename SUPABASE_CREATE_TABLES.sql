@@ -34,14 +34,246 @@ CREATE TABLE IF NOT EXISTS complete_questionnaires (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- 昵称唯一：先合并已有的重复昵称（问卷归到最早创建的用户名下）
+UPDATE complete_questionnaires q SET user_id = d.keep_id
+FROM (SELECT id, MIN(id) OVER (PARTITION BY nickname) AS keep_id FROM users) d
+WHERE q.user_id = d.id AND d.id <> d.keep_id;
+DELETE FROM users u USING users k WHERE u.nickname = k.nickname AND u.id > k.id;
+
 -- 创建索引
-CREATE INDEX IF NOT EXISTS idx_users_nickname ON users(nickname);
+-- get_or_create_user 的 INSERT ... ON CONFLICT (nickname) 依赖这个唯一索引
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_nickname_unique ON users(nickname);
+DROP INDEX IF EXISTS idx_users_nickname;
+-- 昵称子串搜索（LIKE / ILIKE '%关键词%'）使用三元组 GIN 索引
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_users_nickname_trgm ON users USING GIN (nickname gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
 CREATE INDEX IF NOT EXISTS idx_complete_user_id ON complete_questionnaires(user_id);
 CREATE INDEX IF NOT EXISTS idx_complete_bagang_type ON complete_questionnaires(bagang_type_code);
 CREATE INDEX IF NOT EXISTS idx_complete_wjw_main ON complete_questionnaires(wjw_main_constitution);
 CREATE INDEX IF NOT EXISTS idx_complete_created_at ON complete_questionnaires(created_at);
+-- 问卷列表按 (created_at, id) 倒序游标分页
+CREATE INDEX IF NOT EXISTS idx_complete_created_at_id ON complete_questionnaires(created_at DESC, id DESC);
+
+-- ==================== 列式存储 ====================
+-- 雷达图8个维度、卫健委9种体质得分存为数值列，61道题的答案存为压缩答案编码（每道题 3 位，共 23 字节），
+-- 统计和导出直接读这些列，不再解析 JSON 文本
+-- 已有数据执行后回填一次：python -c "import database_postgres; database_postgres.backfill_columnar_storage()"
+ALTER TABLE complete_questionnaires
+    ADD COLUMN IF NOT EXISTS radar_cold DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_heat DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_void DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_solid DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_dry DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_wet DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_qi DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS radar_blood DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS wjw_qixu INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_yangxu INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_yinxu INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_tanshi INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_shire INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_xueyu INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_qiyu INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_tebing INTEGER,
+    ADD COLUMN IF NOT EXISTS wjw_pinghe INTEGER,
+    ADD COLUMN IF NOT EXISTS answer_codes BYTEA;
+
+-- 新问卷的答案只写入 answer_codes；旧行的 JSON 答案列保留，备份并确认编码无损后可手动清理：
+-- python -c "import database_postgres; print(database_postgres.clear_legacy_answer_json(dry_run=True))"
+-- python -c "import database_postgres; print(database_postgres.clear_legacy_answer_json())"
 
 -- 插入默认管理员密码
 INSERT INTO admin_password (password) VALUES ('8888')
 ON CONFLICT DO NOTHING;
+
+-- ==================== 统计表（由触发器维护） ====================
+-- get_statistics 直接读取这些表，不再扫描问卷全表
+-- 每日新增按数据库时区的日期统计（Supabase 默认 UTC）
+
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name TEXT PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS stats_type_counts (
+    type_code TEXT PRIMARY KEY,  -- 类型为空时记为 ''
+    type_name TEXT,
+    count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS stats_daily_counts (
+    day DATE PRIMARY KEY,
+    count BIGINT NOT NULL DEFAULT 0
+);
+
+-- 用户数：语句级触发器，批量插入时每条语句只更新一次计数器
+CREATE OR REPLACE FUNCTION stats_users_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO stats_counters (name, value)
+        SELECT 'users', COUNT(*) FROM new_rows
+        ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + excluded.value;
+    ELSE
+        UPDATE stats_counters SET value = value - (SELECT COUNT(*) FROM old_rows) WHERE name = 'users';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stats_users_insert ON users;
+CREATE TRIGGER trg_stats_users_insert AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_users_changed();
+
+DROP TRIGGER IF EXISTS trg_stats_users_delete ON users;
+CREATE TRIGGER trg_stats_users_delete AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_users_changed();
+
+-- 问卷数 / 类型分布 / 每日新增：按语句汇总后再更新，一批问卷只触及少量统计行
+-- （按主键顺序写入，避免并发批量插入之间死锁）
+CREATE OR REPLACE FUNCTION stats_questionnaires_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE stats_counters SET value = value - (SELECT COUNT(*) FROM old_rows)
+        WHERE name = 'questionnaires';
+
+        UPDATE stats_type_counts s SET count = s.count - o.n
+        FROM (
+            SELECT COALESCE(bagang_type_code, '') AS type_code, COUNT(*) AS n
+            FROM old_rows GROUP BY 1 ORDER BY 1
+        ) o
+        WHERE s.type_code = o.type_code;
+
+        UPDATE stats_daily_counts s SET count = s.count - o.n
+        FROM (
+            SELECT created_at::date AS day, COUNT(*) AS n
+            FROM old_rows WHERE created_at IS NOT NULL GROUP BY 1 ORDER BY 1
+        ) o
+        WHERE s.day = o.day;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO stats_counters (name, value)
+        SELECT 'questionnaires', COUNT(*) FROM new_rows
+        ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + excluded.value;
+
+        INSERT INTO stats_type_counts (type_code, type_name, count)
+        SELECT COALESCE(bagang_type_code, ''), MAX(bagang_type_name), COUNT(*)
+        FROM new_rows GROUP BY 1 ORDER BY 1
+        ON CONFLICT (type_code) DO UPDATE
+            SET count = stats_type_counts.count + excluded.count,
+                type_name = excluded.type_name;
+
+        INSERT INTO stats_daily_counts (day, count)
+        SELECT created_at::date, COUNT(*)
+        FROM new_rows WHERE created_at IS NOT NULL GROUP BY 1 ORDER BY 1
+        ON CONFLICT (day) DO UPDATE SET count = stats_daily_counts.count + excluded.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 更新只处理统计列（类型、类型名、日期）有变化的行：过渡表不能与 UPDATE OF 列清单同用，
+-- 所以在函数里按 id 对照新旧行过滤，其他列（如答案编码回填）的更新不改统计表。
+-- 旧值记 -1、新值记 +1，按键汇总成净变化后各做一次 upsert
+CREATE OR REPLACE FUNCTION stats_questionnaires_updated() RETURNS TRIGGER AS $$
+BEGIN
+    WITH changed AS (
+        SELECT o.bagang_type_code AS old_code, n.bagang_type_code AS new_code, n.bagang_type_name AS new_name
+        FROM old_rows o JOIN new_rows n USING (id)
+        WHERE o.bagang_type_code IS DISTINCT FROM n.bagang_type_code
+           OR o.bagang_type_name IS DISTINCT FROM n.bagang_type_name
+    )
+    INSERT INTO stats_type_counts (type_code, type_name, count)
+    SELECT type_code, MAX(type_name), SUM(delta)
+    FROM (
+        SELECT COALESCE(old_code, '') AS type_code, NULL::TEXT AS type_name, -1 AS delta FROM changed
+        UNION ALL
+        SELECT COALESCE(new_code, ''), new_name, 1 FROM changed
+    ) d
+    GROUP BY 1 ORDER BY 1
+    ON CONFLICT (type_code) DO UPDATE
+        SET count = stats_type_counts.count + excluded.count,
+            type_name = COALESCE(excluded.type_name, stats_type_counts.type_name);
+
+    WITH changed AS (
+        SELECT o.created_at::date AS old_day, n.created_at::date AS new_day
+        FROM old_rows o JOIN new_rows n USING (id)
+        WHERE o.created_at::date IS DISTINCT FROM n.created_at::date
+    )
+    INSERT INTO stats_daily_counts (day, count)
+    SELECT day, SUM(delta)
+    FROM (
+        SELECT old_day AS day, -1 AS delta FROM changed WHERE old_day IS NOT NULL
+        UNION ALL
+        SELECT new_day, 1 FROM changed WHERE new_day IS NOT NULL
+    ) d
+    GROUP BY 1 ORDER BY 1
+    ON CONFLICT (day) DO UPDATE SET count = stats_daily_counts.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stats_questionnaires_insert ON complete_questionnaires;
+CREATE TRIGGER trg_stats_questionnaires_insert AFTER INSERT ON complete_questionnaires
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_questionnaires_changed();
+
+DROP TRIGGER IF EXISTS trg_stats_questionnaires_update ON complete_questionnaires;
+CREATE TRIGGER trg_stats_questionnaires_update AFTER UPDATE ON complete_questionnaires
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_questionnaires_updated();
+
+DROP TRIGGER IF EXISTS trg_stats_questionnaires_delete ON complete_questionnaires;
+CREATE TRIGGER trg_stats_questionnaires_delete AFTER DELETE ON complete_questionnaires
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_questionnaires_changed();
+
+-- 按现有数据重建统计表：SELECT rebuild_statistics();
+CREATE OR REPLACE FUNCTION rebuild_statistics() RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE stats_counters, stats_type_counts, stats_daily_counts IN EXCLUSIVE MODE;
+    DELETE FROM stats_counters;
+    DELETE FROM stats_type_counts;
+    DELETE FROM stats_daily_counts;
+
+    INSERT INTO stats_counters (name, value)
+    SELECT 'users', COUNT(*) FROM users
+    UNION ALL
+    SELECT 'questionnaires', COUNT(*) FROM complete_questionnaires;
+
+    INSERT INTO stats_type_counts (type_code, type_name, count)
+    SELECT COALESCE(bagang_type_code, ''), MAX(bagang_type_name), COUNT(*)
+    FROM complete_questionnaires
+    GROUP BY COALESCE(bagang_type_code, '');
+
+    INSERT INTO stats_daily_counts (day, count)
+    SELECT created_at::date, COUNT(*)
+    FROM complete_questionnaires
+    WHERE created_at IS NOT NULL
+    GROUP BY created_at::date;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_statistics();
+
+-- 统计汇总：get_statistics 一次 RPC 往返只取回汇总结果（类型为空的记录 type_code 返回 null）
+-- for_day 默认取 CURRENT_DATE，与触发器的 created_at::date 使用同一时区（数据库会话时区）
+CREATE OR REPLACE FUNCTION get_statistics_summary(for_day DATE DEFAULT CURRENT_DATE) RETURNS JSON AS $$
+    SELECT json_build_object(
+        'total_users', COALESCE((SELECT value FROM stats_counters WHERE name = 'users'), 0),
+        'total_questionnaires', COALESCE((SELECT value FROM stats_counters WHERE name = 'questionnaires'), 0),
+        'today_count', COALESCE((SELECT count FROM stats_daily_counts WHERE day = for_day), 0),
+        'type_distribution', COALESCE((
+            SELECT json_agg(json_build_object(
+                       'type_code', NULLIF(type_code, ''),
+                       'type_name', type_name,
+                       'count', count
+                   ) ORDER BY count DESC, type_code)
+            FROM stats_type_counts
+            WHERE count > 0
+        ), '[]'::json)
+    );
+$$ LANGUAGE sql STABLE;
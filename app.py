@@ -8,24 +8,26 @@ import pandas as pd
 
 # 使用 PostgreSQL 数据库（Supabase）
 from database_postgres import (
-    init_db, get_or_create_user, save_complete_questionnaire,
+    init_db, get_or_create_user, get_user_cache_stats, save_complete_questionnaire, save_complete_questionnaires,
     verify_admin_password, update_admin_password,
-    get_statistics, search_questionnaires, export_to_excel,
-    get_all_questionnaires
+    get_statistics, get_questionnaires_page, export_to_csv, export_to_excel
 )
+from submission_queue import SubmissionQueue
+import static_assets
+import questionnaire_pages
 
 # # 注释掉旧的 SQLite 导入
 # # from database import (
-# #     init_db, get_or_create_user, save_complete_questionnaire,
+# #     init_db, get_or_create_user, get_user_cache_stats, save_complete_questionnaire, save_complete_questionnaires,
 # #     verify_admin_password, update_admin_password,
-# #     get_statistics, search_questionnaires, export_to_excel
+# #     get_statistics, get_questionnaires_page, export_to_csv, export_to_excel
 # # )
 
 # # 使用 Supabase 导入
 # # from database_supabase import (
-# #     init_db, get_or_create_user, save_complete_questionnaire,
+# #     init_db, get_or_create_user, get_user_cache_stats, save_complete_questionnaire, save_complete_questionnaires,
 # #     verify_admin_password, update_admin_password,
-# #     get_statistics, search_questionnaires, export_to_excel
+# #     get_statistics, get_questionnaires_page, export_to_csv, export_to_excel
 # # )
 
 # 兼容性处理：旧版本 streamlit 使用 experimental_rerun
@@ -33,21 +35,56 @@ if not hasattr(st, 'rerun'):
     st.rerun = st.experimental_rerun
 #一行注释
 
-# ==================== 性能优化：缓存数据加载 ====================
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_questions_cached():
-    """缓存加载问题数据，避免每次重新读取Excel"""
-    return logic.load_questions()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_wjw_data_cached():
-    """缓存加载卫健委数据"""
-    return logic.load_wjw_data()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_data_cached():
-    """缓存加载体质类型数据"""
-    return logic.load_data()
+# ==================== 性能优化：进程级共享题库 ====================
+@st.cache_resource(show_spinner=False)
+def get_question_bank():
+    """所有会话共享同一份只读题库（cache_resource 不做序列化拷贝）"""
+    return logic.get_question_bank()
+
+@st.cache_resource(show_spinner=False)
+def get_submission_queue():
+    """进程级后台写入队列：提交后立即返回，由后台线程批量写库"""
+    return SubmissionQueue(save_complete_questionnaire, save_many=save_complete_questionnaires)
+
+def get_radar_figure(radar_data):
+    """
+    雷达图按雷达数据缓存在当前会话中：报告页重跑直接复用，换了答案才重新构建
+
+    Plotly 图是可变对象，复制一份比重新构建还慢，所以不在会话之间共享
+    """
+    key = tuple(radar_data.items())
+    cached = st.session_state.get("radar_figure")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    fig = build_radar_figure(radar_data)
+    st.session_state["radar_figure"] = (key, fig)
+    return fig
+
+def build_radar_figure(radar_data):
+    """构建体质分布雷达图"""
+    categories = list(radar_data.keys())
+    values = list(radar_data.values())
+
+    fig = go.Figure(data=go.Scatterpolar(
+        r=values + [values[0]],  # 闭合图形
+        theta=categories + [categories[0]],
+        fill='toself',
+        name='体质分布'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, max(values) * 1.2]
+            )),
+        showlegend=False,
+        title="体质分布雷达图",
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font_color="#4A5568"
+    )
+    return fig
 
 # 1. 页面基础设置 (必须是第一行)
 st.set_page_config(
@@ -57,6 +94,49 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+def export_with_progress(export_func, total):
+    """流式导出并显示进度条（total 为预计行数，来自统计表）"""
+    progress_bar = st.progress(0.0, text="正在导出...")
+
+    def show_progress(count):
+        progress_bar.progress(min(count / total, 1.0) if total else 1.0, text=f"已导出 {count} 条")
+
+    filename = export_func(progress_callback=show_progress)
+    progress_bar.empty()
+    return filename
+
+# 管理后台问卷列表每页条数
+QUESTIONNAIRE_PAGE_SIZE = 50
+
+def render_questionnaire_pages(key, filters):
+    """分页显示问卷列表：每次只查询一页，翻页游标保存在 session_state 中"""
+    state = st.session_state.setdefault(f"{key}_pager", {"filters": None, "cursors": [None], "total": None})
+    if state["filters"] != filters:
+        # 筛选条件变化，回到第一页
+        state.update(filters=filters, cursors=[None], total=None)
+
+    page = get_questionnaires_page(page_size=QUESTIONNAIRE_PAGE_SIZE, cursor=state["cursors"][-1], **filters)
+    if page["total"] is not None:
+        state["total"] = f"约 {page['total']}" if page["total_is_estimate"] else str(page["total"])
+
+    if not page["items"]:
+        st.info("未找到匹配的记录" if any(filters.values()) else "暂无问卷数据")
+        return
+
+    st.dataframe(pd.DataFrame(page["items"]), use_container_width=True)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ 上一页", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with info_col:
+        st.caption(f"第 {len(state['cursors'])} 页 · 共 {state['total']} 条记录")
+    with next_col:
+        if st.button("下一页 ▶", key=f"{key}_next", disabled=page["next_cursor"] is None):
+            state["cursors"].append(page["next_cursor"])
+            st.rerun()
+
 # ==================== 性能优化：延迟初始化数据库 ====================
 if "db_initialized" not in st.session_state:
     init_db()
@@ -344,12 +424,9 @@ if st.session_state["current_page"] == "main":
     # 使用列布局创建右上角动态人物区域
     header_cols = st.columns([3, 1])
     with header_cols[1]:
-        # 使用st.image显示GIF动图（确保动画播放）
-        import base64
+        # GIF动图走静态文件服务（浏览器缓存，重跑时只发送 URL）
         try:
-            with open("assets/doro.gif", "rb") as f:
-                gif_data = f.read()
-            gif_base64 = base64.b64encode(gif_data).decode()
+            gif_url = static_assets.asset_url("doro.gif")
 
             # GIF图片区域 - 长方形，完整显示
             st.markdown(f"""
@@ -390,7 +467,7 @@ if st.session_state["current_page"] == "main":
             </style>
             <div class="gif-wrapper">
                 <div class="gif-container" title="点击加入我们">
-                    <img src="data:image/gif;base64,{gif_base64}" alt="点击加入我们">
+                    <img src="{gif_url}" alt="点击加入我们">
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -588,7 +665,10 @@ if st.session_state.get("current_page") == "join_us":
     with col_qr2:
         # 显示公众号二维码
         try:
-            st.image("assets/account.jpg", width=250, caption="")
+            st.markdown(
+                f'<img src="{static_assets.asset_url("account.jpg")}" width="250" alt="公众号二维码">',
+                unsafe_allow_html=True
+            )
         except:
             st.error("无法加载二维码图片")
 
@@ -615,9 +695,10 @@ elif st.session_state.get("current_page") == "main":
             st.warning("⚠️ 请先在上方输入您的昵称")
             st.stop()
 
-        # 加载两组题目（使用缓存函数提升性能）
-        df_questions = load_questions_cached()  # 28题
-        df_wjw = load_wjw_data_cached()  # 33题
+        # 加载两组题目（进程级共享题库）
+        question_bank = get_question_bank()
+        df_questions = question_bank.questions  # 28题
+        df_wjw = question_bank.wjw_questions  # 33题
 
         if df_questions is None or df_wjw is None:
             st.error("❌ 无法加载题库，请检查数据库文件")
@@ -628,83 +709,50 @@ elif st.session_state.get("current_page") == "main":
         st.info(f"📋 共 {total_questions} 道题目，内设逻辑判断 乱选可能导致全部数据作废")
         st.info(f"📋 温馨提示：问卷初始默认选C 点击选项可改变选择")
 
-        # 创建合并表单
-        with st.form("combined_quiz_form"):
-            # 第一组题目（28题）- 不显示来源
-            for index, row in df_questions.iterrows():
-                question_number = index + 1
-                st.write(f"**{question_number}. {row['question']}**")
-                st.radio(
-                    "请选择程度:",
-                    ["A. 非常符合", "B. 比较符合", "C. 一般", "D. 不太符合", "E. 完全不符"],
-                    key=f"q_{row['id']}",
-                    index=2,
-                    horizontal=True,
-                    label_visibility="collapsed"
-                )
-                st.markdown("---")
-
-            # 第二组题目（33题）- 不显示来源，题号连续
-            for index, row in df_wjw.iterrows():
-                question_number = len(df_questions) + index + 1
-                st.write(f"**{question_number}. {row['question']}**")
-                st.radio(
-                    "请选择程度:",
-                    ["A. 非常符合", "B. 比较符合", "C. 一般", "D. 不太符合", "E. 完全不符"],
-                    key=f"wjw_q_{row['id']}",
-                    index=2,
-                    horizontal=True,
-                    label_visibility="collapsed"
-                )
-                st.markdown("---")
-
-            # 提交按钮
-            submitted = st.form_submit_button("🚀 提交问卷", type="primary")
+        # 问卷（默认分页，每页只渲染10道题；答案存在 session_state 的答题卡中）
+        answers = questionnaire_pages.render_questionnaire(
+            questionnaire_pages.question_list(df_questions, df_wjw)
+        )
 
-        if submitted:
+        if answers is not None:
             with st.spinner("正在分析您的体质数据..."):
-                # 1. 计算PBTI体质结果（使用缓存函数）
-                df_questions, df_types = load_data_cached()
-                result_part1 = logic.calculate_results(st.session_state, df_questions, df_types)
+                # 1-2. 计算PBTI和卫健委体质结果（按答案指纹缓存，相同答案不重复计算）
+                fingerprint, result_part1, result_part2 = question_bank.score(answers)
+                st.session_state["answer_fingerprint"] = fingerprint
                 st.session_state["part1_result"] = result_part1
                 st.session_state["part1_completed"] = True
-
-                # 2. 计算卫健委体质结果
-                result_part2 = logic.calculate_wjw_results(st.session_state, df_wjw)
                 st.session_state["part2_result"] = result_part2
                 st.session_state["part2_completed"] = True
 
-                # 3. 存储到数据库
+                # 3. 存储到数据库（每次提交都保存，重复作答也是一次有效记录）
                 if "user_id" in st.session_state:
                     user_id = st.session_state["user_id"]
 
-                    # 提取两部分答案
+                    # 拆分两部分答案
                     part1_answers = {}
                     part2_answers = {}
-                    raw_answers = {}
-                    for key, value in st.session_state.items():
+                    for key, value in answers.items():
                         if key.startswith("q_"):
                             part1_answers[key] = value
-                            raw_answers[key] = value
                         elif key.startswith("wjw_q_"):
                             part2_answers[key] = value
-                        raw_answers[key] = value
+                    raw_answers = {**part1_answers, **part2_answers}
                 
-                # 保存完整数据
-                try:
-                    save_complete_questionnaire(
-                        user_id=user_id,
-                        part1_result=result_part1,
-                        part2_result=result_part2,
-                        part1_answers=part1_answers,
-                        part2_answers=part2_answers,
-                        raw_answers=raw_answers
-                    )
-                    st.success("✅ 数据已同步到赛博数据库！")
-                except Exception as e:
-                    st.error(f"❌ 数据保存失败: {e}")
-                    import traceback
-                    st.error(traceback.format_exc())
+                    # 保存完整数据（先写入本地队列，由后台线程批量同步）
+                    try:
+                        get_submission_queue().enqueue(
+                            user_id=user_id,
+                            part1_result=result_part1,
+                            part2_result=result_part2,
+                            part1_answers=part1_answers,
+                            part2_answers=part2_answers,
+                            raw_answers=raw_answers
+                        )
+                        st.success("✅ 数据已提交，正在后台同步到赛博数据库！")
+                    except Exception as e:
+                        st.error(f"❌ 数据保存失败: {e}")
+                        import traceback
+                        st.error(traceback.format_exc())
             
             st.success("✅ 体质评估完成！感谢您对健康科研事业的贡献！😆")
             st.success("🎉 完整的体质报告已生成！现在回到点击'体质报告' 按钮查看吧！")
@@ -797,39 +845,17 @@ elif st.session_state.get("current_page") == "main":
                 # 显示雷达图
                 radar_data = result.get('radar_chart', {})
                 if radar_data:
-                    import plotly.graph_objects as go
-
-                    categories = list(radar_data.keys())
-                    values = list(radar_data.values())
-
-                    fig = go.Figure(data=go.Scatterpolar(
-                        r=values + [values[0]],  # 闭合图形
-                        theta=categories + [categories[0]],
-                        fill='toself',
-                        name='体质分布'
-                    ))
-
-                    fig.update_layout(
-                        polar=dict(
-                            radialaxis=dict(
-                                visible=True,
-                                range=[0, max(values) * 1.2]
-                            )),
-                        showlegend=False,
-                        title="体质分布雷达图",
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        font_color="#4A5568"
-                    )
-
+                    fig = get_radar_figure(radar_data)
                     st.plotly_chart(fig, use_container_width=True)
 
-                # 显示能量条
-                energy_data = result.get('energy_bars', {})
+                # 显示能量条（值 = 右端 - 左端，范围 -100 ~ 100，进度条中点为平衡）
+                energy_data = result.get('energy_bars', [])
                 if energy_data:
                     st.markdown("#### ⚡ 体质能量分布")
-                    for key, value in energy_data.items():
-                        st.progress(min(value / 100, 1.0), text=f"{key}: {value}")
+                    for bar in energy_data:
+                        value = bar['val']
+                        st.progress(min(max((value + 100) / 200, 0.0), 1.0),
+                                    text=f"{bar['label']}: {bar['left']} ◀ {value:+.0f} ▶ {bar['right']}")
             else:
                 st.info("请完成体质问卷以查看结果")
 
@@ -938,6 +964,22 @@ elif st.session_state.get("current_page") == "main":
                 with col3:
                     st.metric("📅 今日新增", stats['today_count'])
 
+                cache_stats = get_user_cache_stats()
+                st.caption(
+                    f"用户缓存：{cache_stats['size']} 个昵称，命中 {cache_stats['hits']} 次 / "
+                    f"未命中 {cache_stats['misses']} 次（命中率 {cache_stats['hit_rate']:.0%}）"
+                )
+
+                queue_stats = get_submission_queue().get_stats()
+                if not queue_stats['worker_alive']:
+                    st.error(f"⚠️ 后台写入线程已停止，{queue_stats['pending']} 份问卷未写入数据库（已保存在 spool 目录，重启后恢复）")
+                elif queue_stats['worker_errors']:
+                    st.warning(f"⚠️ 后台写入出错 {queue_stats['worker_errors']} 次，最近一次：{queue_stats['last_error']}")
+                st.caption(
+                    f"写入队列：待写入 {queue_stats['pending']} 份，已写入 {queue_stats['saved']} 份，"
+                    f"重试 {queue_stats['retries']} 次，移入 failed 目录 {queue_stats['dead_lettered']} 份"
+                )
+
                 # 体质类型分布
                 if stats['type_distribution']:
                     st.subheader("🧬 体质类型分布")
@@ -978,7 +1020,7 @@ elif st.session_state.get("current_page") == "main":
                 with search_col3:
                     date_range = st.date_input("日期范围", [])
 
-                # 执行搜索
+                # 执行搜索（条件保存在 session_state 中，翻页时沿用）
                 if st.button("🔍 搜索"):
                     start_date = None
                     end_date = None
@@ -988,19 +1030,15 @@ elif st.session_state.get("current_page") == "main":
 
                     type_code = None if search_type == "全部" else search_type
 
-                    results = search_questionnaires(
-                        nickname=search_nickname if search_nickname else None,
-                        type_code=type_code,
-                        start_date=start_date,
-                        end_date=end_date
-                    )
+                    st.session_state["search_filters"] = {
+                        "nickname": search_nickname if search_nickname else None,
+                        "type_code": type_code,
+                        "start_date": start_date,
+                        "end_date": end_date
+                    }
 
-                    if results:
-                        st.success(f"找到 {len(results)} 条记录")
-                        results_df = pd.DataFrame(results)
-                        st.dataframe(results_df, use_container_width=True)
-                    else:
-                        st.info("未找到匹配的记录")
+                if "search_filters" in st.session_state:
+                    render_questionnaire_pages("search", st.session_state["search_filters"])
 
                 # 数据导出功能
                 st.subheader("💾 数据导出")
@@ -1008,22 +1046,24 @@ elif st.session_state.get("current_page") == "main":
                 export_col1, export_col2 = st.columns(2)
                 with export_col1:
                     if st.button("📄 导出为 CSV"):
-                        st.info("💡 CSV导出功能暂未实现，请使用Excel导出")
-                        # filename = export_to_csv()
-                        # st.success(f"✅ 数据已导出到: {filename}")
-                        #
-                        # # 提供下载链接
-                        # with open(filename, 'rb') as f:
-                        #     st.download_button(
-                        #         label="⬇️ 下载 CSV 文件",
-                        #         data=f,
-                        #         file_name=filename,
-                        #         mime='text/csv'
-                        #     )
+                        filename = export_with_progress(export_to_csv, stats['total_questionnaires'])
+                        if filename:
+                            st.success(f"✅ 数据已导出到: {filename}")
+
+                            # 提供下载链接
+                            with open(filename, 'rb') as f:
+                                st.download_button(
+                                    label="⬇️ 下载 CSV 文件",
+                                    data=f,
+                                    file_name=filename,
+                                    mime='text/csv'
+                                )
+                        else:
+                            st.info("暂无问卷数据")
 
                 with export_col2:
                     if st.button("📊 导出为 Excel"):
-                        filename = export_to_excel()
+                        filename = export_with_progress(export_to_excel, stats['total_questionnaires'])
                         if filename:
                             st.success(f"✅ 数据已导出到: {filename}")
 
@@ -1036,17 +1076,12 @@ elif st.session_state.get("current_page") == "main":
                                     mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                                 )
                         else:
-                            st.error("❌ 导出失败，请确保已安装 pandas 和 openpyxl")
+                            st.error("❌ 导出失败，请确保已安装 openpyxl 且数据库中有问卷数据")
 
                 # 显示所有问卷数据
                 st.subheader("📋 所有问卷记录")
 
-                all_questionnaires = get_all_questionnaires(limit=100)
-                if all_questionnaires:
-                    df = pd.DataFrame(all_questionnaires)
-                    st.dataframe(df, use_container_width=True)
-                else:
-                    st.info("暂无问卷数据")
+                render_questionnaire_pages("all", {})
 
                 # 数据库信息
                 st.subheader("🗄️ 数据库信息")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+连接池压力基准：多个线程同时借出连接执行读写，对比旧版连接池（池满时创建临时连接、
+每次归还都执行 SELECT 1）与当前的有界连接池
+
+用法: python benchmarks/bench_db_pool.py [线程数] [每线程操作数]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+class LegacyPool:
+    """旧版连接池的借出 / 归还逻辑（去掉单例），用于对照"""
+
+    def __init__(self, db_path, max_connections=5):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self._connection_count = 0
+        self._local = threading.local()
+        self.creations = 0
+
+    def _create_connection(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        self._connection_count += 1
+        self.creations += 1
+        return conn
+
+    def get_connection(self):
+        if getattr(self._local, 'connection', None):
+            return self._local.connection
+        with self._pool_lock:
+            if self._pool:
+                conn = self._pool.pop()
+            else:
+                # 未满时新建，池满时创建临时连接
+                conn = self._create_connection()
+            self._local.connection = conn
+            return conn
+
+    def release_connection(self, conn):
+        if getattr(self._local, 'connection', None) is conn:
+            self._local.connection = None
+        with self._pool_lock:
+            try:
+                conn.execute('SELECT 1')
+                if len(self._pool) < self.max_connections:
+                    self._pool.append(conn)
+                else:
+                    conn.close()
+                    self._connection_count -= 1
+            except sqlite3.Error:
+                conn.close()
+                self._connection_count -= 1
+
+    def close_all(self):
+        for conn in self._pool:
+            conn.close()
+
+
+def run(pool, threads, ops):
+    """每个线程交替执行读和写，返回 (每秒操作数, 借出延迟 p99 毫秒, 最多同时打开的连接数)"""
+    latencies = []
+    peak = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(i):
+        barrier.wait()
+        local = []
+        for j in range(ops):
+            start = time.perf_counter()
+            conn = pool.get_connection()
+            local.append(time.perf_counter() - start)
+            with lock:
+                if isinstance(pool, LegacyPool):
+                    open_connections = pool._connection_count
+                else:
+                    open_connections = pool.stats()['open_connections']
+                peak[0] = max(peak[0], open_connections)
+            try:
+                if j % 4 == 0:
+                    conn.execute("INSERT INTO t (x) VALUES (?)", (i * ops + j,))
+                    conn.commit()
+                else:
+                    conn.execute("SELECT COUNT(*) FROM t WHERE x > ?", (j,)).fetchone()
+            finally:
+                pool.release_connection(conn)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return threads * ops / elapsed, latencies[int(len(latencies) * 0.99)] * 1000, peak[0]
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    print(f"线程数: {threads}，每线程 {ops} 次操作（1/4 写入），连接池大小 5")
+    print(f"{'连接池':<8} {'操作/秒':>10} {'借出p99(ms)':>12} {'峰值连接数':>10} {'创建连接数':>10} {'等待次数':>8}")
+    for label in ["旧版", "当前"]:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        setup = sqlite3.connect(path)
+        setup.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, x INTEGER)")
+        setup.close()
+
+        if label == "旧版":
+            pool = LegacyPool(path)
+        else:
+            pool = database.DatabasePool(db_path=path, max_connections=5)
+        throughput, p99, peak = run(pool, threads, ops)
+        if label == "旧版":
+            creations, waits = pool.creations, "-"
+        else:
+            stats = pool.stats()
+            creations, waits = stats['creations'], stats['waits']
+        pool.close_all()
+        print(f"{label:<8} {throughput:>10.0f} {p99:>12.3f} {peak:>10} {creations:>10} {waits:>8}")
+
+
+if __name__ == "__main__":
+    main()
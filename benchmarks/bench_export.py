@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Excel 导出基准：对比旧版（pandas 读全表 + 逐行 apply + 内存中构建工作簿）
+与流式导出的耗时和 Python 内存峰值
+
+用法: python benchmarks/bench_export.py [问卷数]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import database
+from test_bulk_import import _make_submissions
+
+
+LEGACY_QUERY = '''
+SELECT c.id, u.nickname, c.bagang_type_code, c.bagang_type_name, c.bagang_radar_data, c.bagang_energy_data,
+       c.wjw_main_constitution, c.wjw_main_score, c.wjw_main_result, c.wjw_all_results, c.wjw_scores,
+       c.raw_answers, c.created_at
+FROM complete_questionnaires c
+JOIN users u ON c.user_id = u.id
+ORDER BY c.created_at DESC
+'''
+
+
+def _format_pairs(value):
+    try:
+        return ', '.join(f"{k}:{v}" for k, v in json.loads(value).items())
+    except (TypeError, ValueError, AttributeError):
+        return value
+
+
+def _format_wjw_results(value):
+    try:
+        return ', '.join(f"{k}({v['score']}分-{v['result']})" for k, v in json.loads(value).items())
+    except (TypeError, ValueError, AttributeError, KeyError):
+        return value
+
+
+def _format_raw_answers(value):
+    answers = json.loads(value)
+    q_items = sorted((int(k[2:]), f"Q{k[2:]}:{v}") for k, v in answers.items() if k.startswith('q_'))
+    w_items = sorted((int(k[6:]), f"W{k[6:]}:{v}") for k, v in answers.items() if k.startswith('wjw_q_'))
+    return '; '.join([item[1] for item in q_items] + [item[1] for item in w_items])
+
+
+def legacy_export(filename):
+    """复现旧版 export_to_excel 的主要步骤（逐行解析 JSON 文本列）"""
+    with database.get_db_connection() as conn:
+        df = pd.read_sql_query(LEGACY_QUERY, conn)
+    df['八纲雷达数据'] = df['bagang_radar_data'].apply(_format_pairs)
+    df['八纲能量数据'] = df['bagang_energy_data'].apply(_format_pairs)
+    df['卫健委各体质结果'] = df['wjw_all_results'].apply(_format_wjw_results)
+    df['原始答案'] = df['raw_answers'].apply(_format_raw_answers)
+    wjw_scores_df = df['wjw_scores'].apply(lambda v: json.loads(v) if v else {}).apply(pd.Series)
+    df = pd.concat([df, wjw_scores_df], axis=1)
+    df.to_excel(filename, index=False, engine='openpyxl')
+
+
+def measure(export, filename):
+    """返回 (秒, 内存峰值 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    export(filename)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    tmp_dir = tempfile.mkdtemp()
+    database.DB_PATH = os.path.join(tmp_dir, "bench.db")
+    database.init_db()
+    template = _make_submissions(500, 100)
+    database.bulk_import_questionnaires(template[i % len(template)] for i in range(n))
+
+    legacy_s, legacy_mb = measure(legacy_export, os.path.join(tmp_dir, "legacy.xlsx"))
+    stream_s, stream_mb = measure(database.export_to_excel, os.path.join(tmp_dir, "stream.xlsx"))
+
+    print(f"问卷数: {n}")
+    print(f"{'实现':<10} {'耗时(秒)':>10} {'内存峰值(MB)':>14}")
+    print(f"{'旧版':<10} {legacy_s:>10.2f} {legacy_mb:>14.1f}")
+    print(f"{'流式':<10} {stream_s:>10.2f} {stream_mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
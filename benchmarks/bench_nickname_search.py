@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+昵称搜索基准：对比旧版 LIKE '%关键词%'（扫描 users 全表）与 FTS5 三元组索引
+
+用法: python benchmarks/bench_nickname_search.py [用户数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from test_bulk_import import _make_submissions
+
+LEGACY_QUERY = database._QUESTIONNAIRE_LIST_QUERY + ' WHERE u.nickname LIKE ? ORDER BY q.created_at DESC'
+CHARACTERS = "赛博本草中医阴阳五行气血津液寒热虚实表里春夏秋冬金木水火土"
+
+
+def timed_ms(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, len(result)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    database.init_db()
+    rng = random.Random(0)
+    nicknames = [''.join(rng.choice(CHARACTERS) for _ in range(rng.randint(3, 8))) + str(i) for i in range(n)]
+    template = _make_submissions(1, 1)[0]
+    database.bulk_import_questionnaires({**template, "nickname": name} for name in nicknames)
+
+    print(f"用户数: {n}")
+    print(f"{'关键词':<12} {'旧版LIKE(ms)':>14} {'当前(ms)':>10} {'结果数':>8}")
+    for term in ["本草中医", "阴阳五", "春夏", str(n // 2)]:
+        with database.get_db_connection() as conn:
+            legacy_ms, _ = timed_ms(lambda: conn.execute(LEGACY_QUERY, (f'%{term}%',)).fetchall())
+        current_ms, count = timed_ms(lambda: database.search_questionnaires(nickname=term))
+        print(f"{term:<12} {legacy_ms:>14.2f} {current_ms:>10.2f} {count:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+问卷渲染基准：对比整张表单（61题）与分页问卷（每页10题）
+每次重跑的脚本耗时和发送给浏览器的元素数 / 字节数
+
+用法: python benchmarks/bench_questionnaire_pages.py [重跑次数]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+
+def form_app():
+    import logic
+    import questionnaire_pages
+
+    bank = logic.get_question_bank()
+    questionnaire_pages.render_questionnaire_form(
+        questionnaire_pages.question_list(bank.questions, bank.wjw_questions)
+    )
+
+
+def paged_app():
+    import logic
+    import questionnaire_pages
+
+    bank = logic.get_question_bank()
+    questionnaire_pages.render_questionnaire_page(
+        questionnaire_pages.question_list(bank.questions, bank.wjw_questions)
+    )
+
+
+def _elements(node):
+    """递归收集页面上的叶子元素（容器本身不单独发送内容）"""
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from _elements(child)
+    elif getattr(node, "proto", None) is not None:
+        yield node.proto
+
+
+def measure(app, reruns, turn_pages):
+    """返回 (每次重跑耗时 ms, 元素数, 元素字节数)"""
+    at = AppTest.from_function(app, default_timeout=30).run()
+    start = time.perf_counter()
+    for i in range(reruns):
+        if turn_pages:
+            # 分页：每次重跑就是一次翻页（到最后一页后往回翻）
+            label = "下一页 ➡️" if (i // 6) % 2 == 0 else "⬅️ 上一页"
+            next(b for b in at.button if b.label == label).click().run()
+        else:
+            # 整张表单：提交一次就要重新渲染全部题目
+            next(b for b in at.button if b.label == "🚀 提交问卷").click().run()
+    elapsed = (time.perf_counter() - start) / reruns * 1000
+    protos = list(_elements(at.main))
+    return elapsed, len(protos), sum(len(p.SerializeToString()) for p in protos)
+
+
+def main():
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    print(f"重跑 {reruns} 次")
+    print(f"{'方式':<10} {'耗时/重跑(ms)':>14} {'元素数':>8} {'字节/重跑':>10}")
+    for label, app, turn_pages in [("整张表单", form_app, False), ("分页(10题)", paged_app, True)]:
+        elapsed, count, size = measure(app, reruns, turn_pages)
+        print(f"{label:<10} {elapsed:>14.2f} {count:>8} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+问卷保存开销基准：对比旧版（每次保存都执行 DDL + 列探测）与当前实现
+每次保存执行的 SQL 语句数和耗时
+
+用法: python benchmarks/bench_save_statements.py [保存次数]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import logic
+
+# 旧版 save_complete_questionnaire 在 INSERT 之前执行的语句
+LEGACY_SCHEMA_STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS complete_questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        bagang_type_code TEXT,
+        bagang_type_name TEXT,
+        bagang_radar_data TEXT,
+        bagang_energy_data TEXT,
+        bagang_answers TEXT,
+        wjw_main_constitution TEXT,
+        wjw_main_score INTEGER,
+        wjw_main_result TEXT,
+        wjw_all_results TEXT,
+        wjw_scores TEXT,
+        wjw_answers TEXT,
+        raw_answers TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''',
+    'SELECT wjw_scores FROM complete_questionnaires LIMIT 1',
+    'SELECT raw_answers FROM complete_questionnaires LIMIT 1',
+]
+
+
+def legacy_save(user_id, *args):
+    """复现旧版保存路径：DDL + 列探测 + INSERT + COMMIT"""
+    with database.get_db_connection() as conn:
+        c = conn.cursor()
+        for sql in LEGACY_SCHEMA_STATEMENTS:
+            c.execute(sql)
+        c.execute(database._INSERT_COMPLETE_QUESTIONNAIRE, database._complete_questionnaire_params(user_id, *args))
+        conn.commit()
+
+
+def measure(save, n, args):
+    """返回 (每次保存的语句数, 每次保存的微秒数)"""
+    statements = []
+    with database.get_db_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        start = time.perf_counter()
+        for _ in range(n):
+            save(*args)
+        elapsed = time.perf_counter() - start
+        conn.set_trace_callback(None)
+    return len(statements) / n, elapsed / n * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    database.init_db()
+
+    df_questions, df_types = logic.load_data()
+    answers = {f"q_{qid}": logic.ANSWER_OPTIONS[qid % 5] for qid in range(1, 29)}
+    wjw_answers = {f"wjw_q_{qid}": logic.ANSWER_OPTIONS[qid % 5] for qid in range(1, 34)}
+    args = (
+        database.get_or_create_user("基准用户"),
+        logic.calculate_results(answers, df_questions, df_types),
+        logic.calculate_wjw_results(wjw_answers, logic.load_wjw_data()),
+        answers,
+        wjw_answers,
+        {**answers, **wjw_answers},
+    )
+
+    legacy_statements, legacy_us = measure(legacy_save, n, args)
+    current_statements, current_us = measure(database.save_complete_questionnaire, n, args)
+
+    print(f"保存次数: {n}")
+    print(f"{'实现':<10} {'语句数/次':>10} {'耗时(µs)/次':>14}")
+    print(f"{'旧版':<10} {legacy_statements:>10.1f} {legacy_us:>14.1f}")
+    print(f"{'当前':<10} {current_statements:>10.1f} {current_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
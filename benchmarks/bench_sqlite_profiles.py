@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+SQLite 性能配置档基准：每个配置档在新数据库中写入合成数据（默认 100 万行），
+统计写入吞吐、写完后的 WAL 大小、按索引点查吞吐、全表聚合耗时（三次取最快）
+和一次 TRUNCATE 检查点的耗时
+
+合成表与 complete_questionnaires 的常用列相近：用户ID、体质类型、创建时间、
+23 字节答案编码和一个分数列，user_id 和 created_at 上有索引。
+
+用法: python benchmarks/bench_sqlite_profiles.py [行数] [配置档,...]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+BATCH = 1000  # 每个写事务的行数，接近批量导入 / 提交队列的批大小
+POINT_READS = 20000
+TYPE_CODES = [f"{a}{b}{c}" for a in "YX" for b in "BH" for c in "ZS"]
+
+
+def _rows(start, count, n_users):
+    rnd = random.Random(start)
+    for i in range(start, start + count):
+        yield (
+            rnd.randrange(n_users),
+            TYPE_CODES[i % len(TYPE_CODES)],
+            f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00",
+            rnd.randbytes(23),
+            rnd.uniform(-100, 100),
+        )
+
+
+def _wal_size(path):
+    try:
+        return os.path.getsize(path + "-wal")
+    except OSError:
+        return 0
+
+
+def run_profile(name, rows):
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    pool = database.DatabasePool(db_path=path, profile=name)
+    n_users = max(rows // 10, 1)
+    conn = pool.get_connection()
+    try:
+        conn.execute("""
+        CREATE TABLE answers (
+            id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, type_code TEXT NOT NULL,
+            created_at TEXT NOT NULL, answer_codes BLOB NOT NULL, score REAL NOT NULL
+        )""")
+        conn.execute("CREATE INDEX idx_answers_user ON answers (user_id)")
+        conn.execute("CREATE INDEX idx_answers_created ON answers (created_at)")
+        conn.commit()
+
+        start = time.perf_counter()
+        for offset in range(0, rows, BATCH):
+            conn.executemany(
+                "INSERT INTO answers (user_id, type_code, created_at, answer_codes, score) VALUES (?, ?, ?, ?, ?)",
+                _rows(offset, min(BATCH, rows - offset), n_users)
+            )
+            conn.commit()
+        write_rate = rows / (time.perf_counter() - start)
+        wal_bytes = _wal_size(path)
+
+        rnd = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(POINT_READS):
+            conn.execute("SELECT id, score FROM answers WHERE user_id = ?", (rnd.randrange(n_users),)).fetchall()
+        read_rate = POINT_READS / (time.perf_counter() - start)
+
+        scan_ms = float("inf")
+        for _ in range(3):  # 取最快一次，排除首次读盘
+            start = time.perf_counter()
+            conn.execute("SELECT type_code, COUNT(*), AVG(score) FROM answers GROUP BY type_code ORDER BY 2 DESC").fetchall()
+            scan_ms = min(scan_ms, (time.perf_counter() - start) * 1000)
+    finally:
+        pool.release_connection(conn)
+
+    start = time.perf_counter()
+    database.MaintenanceScheduler(path, interval=0).run_once()
+    checkpoint_ms = (time.perf_counter() - start) * 1000
+    pool.close_all()
+    return write_rate, wal_bytes, read_rate, scan_ms, checkpoint_ms
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    profiles = sys.argv[2].split(",") if len(sys.argv) > 2 else list(database.SQLITE_PROFILES)
+
+    print(f"合成数据 {rows} 行，每事务 {BATCH} 行，点查 {POINT_READS} 次")
+    print(f"{'配置档':<12} {'写入(行/s)':>12} {'WAL(MB)':>9} {'点查(次/s)':>12} {'聚合(ms)':>10} {'检查点(ms)':>11}")
+    for name in profiles:
+        write_rate, wal_bytes, read_rate, scan_ms, checkpoint_ms = run_profile(name, rows)
+        print(f"{name:<12} {write_rate:>12.0f} {wal_bytes / 1e6:>9.1f} {read_rate:>12.0f} "
+              f"{scan_ms:>10.1f} {checkpoint_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+静态资源基准：对比旧版每次重跑 base64 内联吉祥物 GIF 与静态文件服务 URL，
+统计每次重跑发送给浏览器的元素字节数和脚本耗时
+
+用法: python benchmarks/bench_static_assets.py [重跑次数]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # 读取 .streamlit/config.toml（server.enableStaticServing）
+
+from streamlit.testing.v1 import AppTest
+
+
+def legacy_page():
+    import base64
+
+    import streamlit as st
+
+    with open("static/doro.gif", "rb") as f:
+        gif_base64 = base64.b64encode(f.read()).decode()
+    st.markdown(f'<img src="data:image/gif;base64,{gif_base64}" alt="点击加入我们">', unsafe_allow_html=True)
+    st.text_input("输入您的代号 (ID):", "", key="nickname")
+
+
+def current_page():
+    import streamlit as st
+
+    import static_assets
+
+    st.markdown(f'<img src="{static_assets.asset_url("doro.gif")}" alt="点击加入我们">', unsafe_allow_html=True)
+    st.text_input("输入您的代号 (ID):", "", key="nickname")
+
+
+def measure(page, reruns):
+    """模拟在昵称框里逐字输入，返回 (每次重跑发送的元素字节数, 每次重跑耗时 ms)"""
+    at = AppTest.from_function(page).run()
+    start = time.perf_counter()
+    for i in range(reruns):
+        at.text_input(key="nickname").input(f"用户{i}").run()
+    elapsed = (time.perf_counter() - start) / reruns * 1000
+    protos = [getattr(node, "proto", None) for node in at.main]
+    sent = sum(len(proto.SerializeToString()) for proto in protos if proto is not None)
+    return sent, elapsed
+
+
+def main():
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    import static_assets
+
+    print(f"静态文件服务: {'开启' if static_assets.static_serving_enabled() else '未开启'}，"
+          f"doro.gif {os.path.getsize('static/doro.gif')} 字节，重跑 {reruns} 次")
+    print(f"{'方式':<12} {'字节/重跑':>10} {'耗时/重跑(ms)':>14}")
+    for label, page in [("旧版base64", legacy_page), ("静态URL", current_page)]:
+        sent, elapsed = measure(page, reruns)
+        print(f"{label:<12} {sent:>10} {elapsed:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
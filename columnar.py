@@ -0,0 +1,163 @@
+"""
+完整问卷的列式存储布局（三个数据库后端共用）
+
+雷达图8个维度、卫健委9种体质得分存为定长数值列，61道题的答案存为
+压缩答案编码（BLOB / BYTEA，每道题 3 位，见 logic.encode_answer_codes），
+统计和导出直接读这些列，不再逐行解析 JSON 文本。
+"""
+
+import json
+
+import logic
+
+# 雷达图维度列，顺序同 logic.DIMENSIONS
+RADAR_COLUMNS = [f'radar_{dim}' for dim in logic.DIMENSIONS]
+
+# 卫健委体质得分列，顺序同 logic.WJW_CONSTITUTIONS
+WJW_SCORE_COLUMNS = [
+    'wjw_qixu', 'wjw_yangxu', 'wjw_yinxu', 'wjw_tanshi', 'wjw_shire',
+    'wjw_xueyu', 'wjw_qiyu', 'wjw_tebing', 'wjw_pinghe'
+]
+
+# 答案编码列
+ANSWER_CODES_COLUMN = 'answer_codes'
+
+# 数值列（可直接聚合）
+SCORE_COLUMNS = RADAR_COLUMNS + WJW_SCORE_COLUMNS
+
+# 全部列式存储列（插入参数按此顺序）
+COLUMNS = SCORE_COLUMNS + [ANSWER_CODES_COLUMN]
+
+
+def _number(value, cast):
+    try:
+        return None if value is None else cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def merge_answers(*answer_dicts):
+    """合并多个答案字典（后面的覆盖前面的），忽略空值和非字典"""
+    merged = {}
+    for answers in answer_dicts:
+        if isinstance(answers, dict):
+            merged.update(answers)
+    return merged
+
+
+def column_values(radar, wjw_scores, answers):
+    """
+    计算列式存储各列的值
+
+    Args:
+        radar: 雷达图数据 {维度: 分数}
+        wjw_scores: 卫健委体质得分 {体质: 得分}
+        answers: 答案字典（q_* / wjw_q_*）
+
+    Returns:
+        list: 与 COLUMNS 对应的值，缺失的数据为 None
+    """
+    radar = radar if isinstance(radar, dict) else {}
+    wjw_scores = wjw_scores if isinstance(wjw_scores, dict) else {}
+    return (
+        [_number(radar.get(dim), float) for dim in logic.DIMENSIONS] +
+        [_number(wjw_scores.get(c), int) for c in logic.WJW_CONSTITUTIONS] +
+        [logic.encode_answer_codes(answers) if answers else None]
+    )
+
+
+def _load_json(value):
+    if isinstance(value, (dict, list)) or value is None:
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def column_values_from_json(radar_json, scores_json, *answers_json):
+    """
+    由旧版 JSON 文本列计算列式存储各列的值（迁移回填用），无法解析的列记为 None
+
+    Args:
+        radar_json: bagang_radar_data
+        scores_json: wjw_scores
+        answers_json: 答案 JSON 列，按优先级从低到高（如 raw_answers, bagang_answers, wjw_answers）
+    """
+    answers = merge_answers(*[_load_json(value) for value in answers_json])
+    return column_values(_load_json(radar_json), _load_json(scores_json), answers)
+
+
+def _exact_score(value):
+    """答案能无损还原时返回分数（标准选项文本或 1-5 的整数），否则返回 None"""
+    if isinstance(value, str):
+        return logic.parse_answer_score(value) if value in logic.ANSWER_OPTIONS else None
+    if isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 5:
+        return value
+    return None
+
+
+def codes_preserve_json(codes, *answers_json):
+    """
+    压缩答案编码是否完整保存了各 JSON 答案列的内容（清空 JSON 答案列前的检查）
+
+    每个非空 JSON 列都必须是字典，键都是 logic.ANSWER_KEYS 中的题目，
+    值为标准选项文本、1-5 的整数或 null，并且与编码中的分数一致；
+    其他情况（多余的键、非标准答案、无法解析的 JSON）清空后无法还原，返回 False。
+    """
+    if codes is None:
+        return False
+    try:
+        scores = dict(zip(logic.ANSWER_KEYS, logic.answer_codes_to_matrix([to_bytes(codes)])[0]))
+    except ValueError:
+        return False
+    for value in answers_json:
+        if value is None:
+            continue
+        answers = _load_json(value)
+        if not isinstance(answers, dict):
+            return False
+        for key, answer in answers.items():
+            if key not in scores:
+                return False
+            expected = 0 if answer is None else _exact_score(answer)
+            if expected is None or scores[key] != expected:
+                return False
+    return True
+
+
+def score_averages(count, averages):
+    """
+    整理数值列的聚合结果
+
+    Args:
+        count: 参与统计的问卷数
+        averages: 与 SCORE_COLUMNS 对应的平均值
+
+    Returns:
+        dict: count, radar {维度: 平均分}, wjw_scores {体质: 平均分}（没有数据时为 None）
+    """
+    averages = [None if value is None else round(float(value), 2) for value in averages]
+    n_radar = len(RADAR_COLUMNS)
+    return {
+        'count': count,
+        'radar': dict(zip(logic.DIMENSIONS, averages[:n_radar])),
+        'wjw_scores': dict(zip(logic.WJW_CONSTITUTIONS, averages[n_radar:]))
+    }
+
+
+def to_bytes(value):
+    """
+    把数据库读出的答案编码统一为 bytes：
+    sqlite3 返回 bytes，psycopg2 返回 memoryview，PostgREST 返回 '\\x..' 十六进制文本
+    """
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('\\x') else value)
+    return bytes(value)
+
+
+def to_hex(value):
+    """答案编码 -> PostgREST 接受的 bytea 十六进制文本"""
+    return None if value is None else '\\x' + value.hex()
@@ -0,0 +1,58 @@
+# pytest 共用夹具：临时数据库和测试问卷数据
+
+import itertools
+
+import pytest
+
+import database
+import logic
+
+
+def _build_submissions(n, n_users):
+    """用真实计算结果构造 n 份问卷，分布在 n_users 个昵称上"""
+    df_questions, df_types = logic.load_data()
+    df_wjw = logic.load_wjw_data()
+    submissions = []
+    for i in range(n):
+        answers = {f"q_{qid}": logic.ANSWER_OPTIONS[(i + qid) % 5] for qid in range(1, 29)}
+        wjw_answers = {f"wjw_q_{qid}": logic.ANSWER_OPTIONS[(i * qid) % 5] for qid in range(1, 34)}
+        submissions.append({
+            "nickname": f"导入用户{i % n_users}",
+            "part1_result": logic.calculate_results(answers, df_questions, df_types),
+            "part2_result": logic.calculate_wjw_results(wjw_answers, df_wjw),
+            "part1_answers": answers,
+            "part2_answers": wjw_answers,
+            "raw_answers": {**answers, **wjw_answers},
+            "created_at": f"2025-01-{i % 28 + 1:02d} 12:00:00"
+        })
+    return submissions
+
+
+@pytest.fixture
+def make_submissions():
+    """构造测试问卷：make_submissions(份数, 昵称数)"""
+    return _build_submissions
+
+
+@pytest.fixture
+def temp_database(tmp_path, monkeypatch):
+    """
+    把 database 模块切换到 tmp_path 下初始化好的新数据库
+
+    返回切换函数：temp_database() 再换一个新数据库，temp_database(path, init=False)
+    切换到指定文件（由测试自己建表或调用 init_db）。测试结束后关闭连接池，
+    DB_PATH 由 monkeypatch 恢复。
+    """
+    monkeypatch.setattr(database, "DB_PATH", database.DB_PATH)
+    names = itertools.count()
+
+    def switch(path=None, init=True):
+        database.close_db_pool()
+        database.DB_PATH = str(path or tmp_path / f"cybertcm_test_{next(names)}.db")
+        if init:
+            database.init_db()
+        return database.DB_PATH
+
+    switch()
+    yield switch
+    database.close_db_pool()
@@ -22,6 +22,9 @@ def show_menu():
     print("5. 📄 导出为 CSV")
     print("6. 📊 导出为 Excel")
     print("7. 🗄️  查看数据库信息")
+    print("8. 📥 批量导入历史问卷")
+    print("9. 🔄 重建统计数据")
+    print("10. 🧹 清理旧问卷的 JSON 答案列")
     print("0. 🚪 退出")
     print("="*50)
 
@@ -41,6 +44,13 @@ def show_statistics():
         for item in stats['type_distribution']:
             print(f"  {item['type_code']} - {item['type_name']}: {item['count']} 人")
 
+    averages = database.get_score_averages()
+    if averages['count']:
+        print("\n📈 八纲雷达平均分:")
+        print("  " + ", ".join(f"{dim}:{avg}" for dim, avg in averages['radar'].items() if avg is not None))
+        print("📈 卫健委体质平均分:")
+        print("  " + ", ".join(f"{c}:{avg}" for c, avg in averages['wjw_scores'].items() if avg is not None))
+
 def show_all_users():
     """显示所有用户"""
     print("\n👥 所有用户列表")
@@ -105,6 +115,10 @@ def search_questionnaires():
     else:
         print("未找到匹配的记录")
 
+def show_export_progress(count):
+    """导出进度"""
+    print(f"\r  已导出 {count} 条", end="", flush=True)
+
 def export_to_csv():
     """导出为CSV"""
     print("\n📄 导出为 CSV")
@@ -118,8 +132,11 @@ def export_to_csv():
         filename += '.csv'
     
     try:
-        result = database.export_to_csv(filename)
-        print(f"✅ 数据已成功导出到: {result}")
+        result = database.export_to_csv(filename, progress_callback=show_export_progress)
+        if result:
+            print(f"\n✅ 数据已成功导出到: {result}")
+        else:
+            print("\nℹ️ 暂无问卷数据，未生成文件")
     except Exception as e:
         print(f"❌ 导出失败: {e}")
 
@@ -136,12 +153,12 @@ def export_to_excel():
         filename += '.xlsx'
     
     try:
-        result = database.export_to_excel(filename)
+        result = database.export_to_excel(filename, progress_callback=show_export_progress)
         if result:
-            print(f"✅ 数据已成功导出到: {result}")
+            print(f"\n✅ 数据已成功导出到: {result}")
         else:
-            print("❌ 导出失败，请确保已安装 pandas 和 openpyxl")
-            print("💡 提示: pip install pandas openpyxl")
+            print("\n❌ 没有导出文件：数据库中暂无问卷数据，或未安装 openpyxl")
+            print("💡 提示: pip install openpyxl")
     except Exception as e:
         print(f"❌ 导出失败: {e}")
 
@@ -159,6 +176,79 @@ def show_database_info():
     else:
         print("数据库文件不存在")
 
+def bulk_import():
+    """批量导入历史问卷"""
+    print("\n📥 批量导入历史问卷")
+    print("-" * 30)
+    print("支持 .jsonl（每行一条问卷）和 .csv（包含 nickname 列）")
+    
+    filename = input("输入文件路径: ").strip()
+    if not filename:
+        print("❌ 未输入文件路径")
+        return
+    
+    chunk_size = input("每批写入条数（默认: 5000）: ").strip()
+    chunk_size = int(chunk_size) if chunk_size.isdigit() else 5000
+    
+    start_time = datetime.now()
+    
+    def show_progress(count):
+        elapsed = (datetime.now() - start_time).total_seconds()
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"\r  已导入 {count} 条（{rate:.0f} 条/秒）", end="", flush=True)
+    
+    skipped = []
+    
+    try:
+        count = database.bulk_import_questionnaires(
+            database.iter_submission_file(filename),
+            chunk_size=chunk_size,
+            progress_callback=show_progress,
+            invalid_callback=lambda position, record: skipped.append(position)
+        )
+        print(f"\n✅ 导入完成，共 {count} 条问卷")
+    except FileNotFoundError:
+        print(f"❌ 文件不存在: {filename}")
+    except Exception as e:
+        print(f"\n❌ 导入失败: {e}")
+        print("💡 已提交的批次会保留，失败批次已回滚")
+    if skipped:
+        shown = ', '.join(str(position) for position in skipped[:20])
+        print(f"⚠️ 跳过 {len(skipped)} 条缺少 nickname 的记录（第 {shown}{' ...' if len(skipped) > 20 else ''} 条）")
+
+def rebuild_statistics():
+    """按现有数据重建统计表"""
+    print("\n🔄 重建统计数据")
+    print("-" * 30)
+    
+    try:
+        database.rebuild_statistics()
+        print("✅ 统计数据已重建")
+        show_statistics()
+    except Exception as e:
+        print(f"❌ 重建失败: {e}")
+
+def clear_legacy_answer_json():
+    """清空已有压缩编码的旧问卷 JSON 答案列（先检查，确认后执行）"""
+    print("\n🧹 清理旧问卷的 JSON 答案列")
+    print("-" * 30)
+    print("只清理压缩编码能完整还原答案的问卷，其他问卷保留原 JSON")
+    
+    try:
+        result = database.clear_legacy_answer_json(dry_run=True)
+        print(f"检查 {result['checked']} 份问卷：可清理 {result['cleared']} 份，保留 {result['kept']} 份")
+        if result['cleared'] == 0:
+            return
+        
+        confirm = input("⚠️ 清理后无法恢复，请先备份数据库。输入 yes 确认清理: ").strip()
+        if confirm != 'yes':
+            print("已取消")
+            return
+        result = database.clear_legacy_answer_json()
+        print(f"✅ 已清理 {result['cleared']} 份问卷的 JSON 答案列")
+    except Exception as e:
+        print(f"❌ 清理失败: {e}")
+
 def main():
     """主函数"""
     # 初始化数据库
@@ -168,7 +258,7 @@ def main():
     
     while True:
         show_menu()
-        choice = input("\n请选择操作 (0-7): ").strip()
+        choice = input("\n请选择操作 (0-10): ").strip()
         
         if choice == '1':
             show_statistics()
@@ -184,6 +274,12 @@ def main():
             export_to_excel()
         elif choice == '7':
             show_database_info()
+        elif choice == '8':
+            bulk_import()
+        elif choice == '9':
+            rebuild_statistics()
+        elif choice == '10':
+            clear_legacy_answer_json()
         elif choice == '0':
             print("\n👋 感谢使用，再见！")
             break
@@ -1,58 +1,139 @@
 import sqlite3
 import json
+import os
 import threading
+import time
 from datetime import datetime
 from contextlib import contextmanager
+from urllib.parse import quote
+
+import columnar
+import exporter
+import logic
+import pagination
+from ttl_cache import TTLCache
+
+# 数据库文件路径，可通过环境变量修改（测试 / 多实例部署）
+DB_PATH = os.getenv('CYBERTCM_DB_PATH', 'cybertcm.db')
+
+# 昵称 -> 用户ID 缓存的条目数和有效期（秒）
+USER_CACHE_SIZE = int(os.getenv('CYBERTCM_USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.getenv('CYBERTCM_USER_CACHE_TTL', '300'))
+
+# ==================== 数据库连接池 ====================
+
+# 连接池大小、借出连接的最长等待秒数（超时抛出 PoolTimeout）
+POOL_MAX_CONNECTIONS = int(os.getenv('CYBERTCM_DB_POOL_SIZE', '5'))
+POOL_CHECKOUT_TIMEOUT = float(os.getenv('CYBERTCM_DB_POOL_TIMEOUT', '30'))
+# 空闲超过这么多秒的连接借出前检查一次是否可用（最近用过的连接不检查）
+POOL_HEALTH_CHECK_IDLE = float(os.getenv('CYBERTCM_DB_POOL_HEALTH_CHECK_IDLE', '60'))
+
+# 只读连接池（统计、列表、搜索、导出）：连接数，每个连接的页缓存（KiB）和内存映射大小（字节）
+READ_POOL_MAX_CONNECTIONS = int(os.getenv('CYBERTCM_DB_READ_POOL_SIZE', '3'))
+READ_CACHE_SIZE_KIB = int(os.getenv('CYBERTCM_DB_READ_CACHE_KIB', '65536'))
+READ_MMAP_SIZE = int(os.getenv('CYBERTCM_DB_READ_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+# SQLite 性能配置档，通过 CYBERTCM_SQLITE_PROFILE 选择
+# cache_size_kib: 每个连接的页缓存（KiB）；mmap_size: 内存映射读取的字节数（0 为关闭）
+# temp_store: 排序 / 临时索引放在内存还是临时文件；wal_autocheckpoint: WAL 达到多少页时自动检查点
+# checkpoint_interval: 后台 wal_checkpoint(TRUNCATE) + PRAGMA optimize 的间隔秒数（0 为不启动）
+SQLITE_PROFILES = {
+    'legacy': {  # 旧版行为：只用 SQLite 默认值，不做后台维护
+        'cache_size_kib': 2000, 'mmap_size': 0, 'temp_store': 'DEFAULT',
+        'wal_autocheckpoint': 1000, 'checkpoint_interval': 0
+    },
+    'balanced': {
+        'cache_size_kib': 16384, 'mmap_size': 64 * 1024 * 1024, 'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000, 'checkpoint_interval': 300
+    },
+    'throughput': {  # 内存充足、提交密集（集中填写问卷）时使用
+        'cache_size_kib': 65536, 'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000, 'checkpoint_interval': 60
+    },
+}
+SQLITE_PROFILE = os.getenv('CYBERTCM_SQLITE_PROFILE', 'balanced')
+
+
+def get_sqlite_profile(name=None):
+    """
+    获取性能配置档
+
+    Args:
+        name: 配置档名称，默认为 SQLITE_PROFILE
+
+    Raises:
+        ValueError: 没有这个配置档
+    """
+    name = name or SQLITE_PROFILE
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"未知的 SQLite 配置档: {name}（可选: {', '.join(SQLITE_PROFILES)}）")
+    return SQLITE_PROFILES[name]
+
+
+def apply_sqlite_profile(conn, profile, read_only=False):
+    """
+    在连接上设置配置档的 PRAGMA；只读连接只设置 temp_store（缓存和内存映射由只读连接池单独配置）
+    """
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    if read_only:
+        return
+    conn.execute(f"PRAGMA cache_size = -{int(profile['cache_size_kib'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(profile['wal_autocheckpoint'])}")
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """连接池已满，等待空闲连接超时"""
 
-# ==================== 数据库连接池单例模式 ====================
 
 class DatabasePool:
     """
-    数据库连接池单例类
-    使用单例模式管理数据库连接，避免频繁创建和销毁连接
+    SQLite 连接池
+
+    - 最多 max_connections 个连接，池满时阻塞等待，超过 timeout 秒抛出 PoolTimeout
+    - 同一线程嵌套借出时返回同一个连接（按引用计数），最外层归还时才放回池中，
+      内层归还不会把连接从外层手里收走
+    - 归还时回滚未提交的事务；空闲较久的连接借出前才检查是否可用
+    - stats() 记录借出、等待、创建等次数
+
+    read_only=True 时以 mode=ro URI 打开连接并设置 query_only，
+    配更大的页缓存和内存映射，供统计和导出等长时间读取使用；
+    WAL 模式下读连接不会阻塞写连接提交问卷。
+
+    profile 为性能配置档名称（见 SQLITE_PROFILES），默认为 SQLITE_PROFILE。
     """
-    _instance = None
-    _lock = threading.Lock()
-    _initialized = False
-    
-    def __new__(cls, db_path='cybertcm.db', max_connections=5):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-        return cls._instance
-    
-    def __init__(self, db_path='cybertcm.db', max_connections=5):
-        # 确保只初始化一次
-        if DatabasePool._initialized:
-            return
-        
-        with DatabasePool._lock:
-            if DatabasePool._initialized:
-                return
-            
-            self.db_path = db_path
-            self.max_connections = max_connections
-            self._pool = []
-            self._pool_lock = threading.Lock()
-            self._connection_count = 0
-            self._local = threading.local()
-            
-            # 预创建连接
-            self._initialize_pool()
-            
-            DatabasePool._initialized = True
-    
-    def _initialize_pool(self):
-        """初始化连接池，预创建连接"""
-        for _ in range(min(2, self.max_connections)):  # 预创建2个连接
-            conn = self._create_connection()
-            if conn:
-                self._pool.append(conn)
-    
+
+    def __init__(self, db_path='cybertcm.db', max_connections=POOL_MAX_CONNECTIONS,
+                 timeout=POOL_CHECKOUT_TIMEOUT, health_check_idle=POOL_HEALTH_CHECK_IDLE, read_only=False,
+                 profile=None):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.profile = get_sqlite_profile(profile)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self._idle = []  # [(连接, 归还时间)]，后进先出
+        self._size = 0  # 已创建（含正在创建）的连接数
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._closed = False
+        self._stats = {
+            'checkouts': 0, 'reentrant_checkouts': 0, 'waits': 0, 'wait_seconds': 0.0,
+            'timeouts': 0, 'creations': 0, 'discarded': 0
+        }
+
     def _create_connection(self):
         """创建新的数据库连接"""
         try:
+            if self.read_only:
+                uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute('PRAGMA query_only = ON')
+                conn.execute(f'PRAGMA cache_size = -{READ_CACHE_SIZE_KIB}')
+                conn.execute(f'PRAGMA mmap_size = {READ_MMAP_SIZE}')
+                apply_sqlite_profile(conn, self.profile, read_only=True)
+                return conn
             conn = sqlite3.connect(self.db_path, check_same_thread=False)
             conn.row_factory = sqlite3.Row
             # 启用外键约束
@@ -60,87 +141,279 @@ class DatabasePool:
             # 优化性能设置
             conn.execute('PRAGMA journal_mode = WAL')  # 使用WAL模式提高并发性能
             conn.execute('PRAGMA synchronous = NORMAL')  # 平衡性能和安全性
-            self._connection_count += 1
+            apply_sqlite_profile(conn, self.profile)
             return conn
         except sqlite3.Error as e:
             print(f"创建数据库连接失败: {e}")
-            return None
-    
+            raise
+
+    def _is_alive(self, conn, idle_since):
+        """检查空闲较久的连接是否可用"""
+        if time.monotonic() - idle_since < self.health_check_idle:
+            return True
+        try:
+            conn.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """关闭连接并腾出名额（调用方持有 self._cond）"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._size -= 1
+        self._stats['discarded'] += 1
+        self._cond.notify()
+
+    def _checkout(self):
+        """借出一个空闲连接，或在未满时创建新连接；池满时等待"""
+        deadline = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("连接池已关闭")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    if self._is_alive(conn, idle_since):
+                        return conn
+                    self._discard(conn)
+                    continue
+                if self._size < self.max_connections:
+                    self._size += 1  # 先占名额，在锁外创建连接
+                    self._stats['creations'] += 1
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"等待数据库连接超时（{self.timeout} 秒，连接池大小 {self.max_connections}）")
+                started = time.monotonic()
+                self._cond.wait(remaining)
+                self._stats['wait_seconds'] += time.monotonic() - started
+
+        try:
+            return self._create_connection()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
     def get_connection(self):
         """
-        从连接池获取连接
-        优先使用线程本地连接，避免线程冲突
+        借出连接：当前线程已借出连接时返回同一个连接（引用计数 +1）
+
+        Raises:
+            PoolTimeout: 连接池已满且等待超时
         """
-        # 检查线程本地连接
-        if hasattr(self._local, 'connection') and self._local.connection:
-            return self._local.connection
-        
-        with self._pool_lock:
-            # 从池中获取连接
-            if self._pool:
-                conn = self._pool.pop()
-                self._local.connection = conn
-                return conn
-            
-            # 池为空但未满，创建新连接
-            if self._connection_count < self.max_connections:
-                conn = self._create_connection()
-                if conn:
-                    self._local.connection = conn
-                    return conn
-            
-            # 池已满，创建临时连接（不推荐但保证可用性）
-            conn = self._create_connection()
-            self._local.connection = conn
-            return conn
-    
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            lease[1] += 1
+            with self._cond:
+                self._stats['reentrant_checkouts'] += 1
+            return lease[0]
+
+        conn = self._checkout()
+        self._local.lease = [conn, 1]
+        with self._cond:
+            self._stats['checkouts'] += 1
+        return conn
+
     def release_connection(self, conn):
-        """释放连接回连接池"""
+        """归还连接：引用计数归零时回滚未提交的事务并放回池中"""
         if conn is None:
             return
-        
-        # 清除线程本地引用
-        if hasattr(self._local, 'connection') and self._local.connection is conn:
-            self._local.connection = None
-        
-        with self._pool_lock:
-            # 检查连接是否有效
-            try:
-                conn.execute('SELECT 1')
-                if len(self._pool) < self.max_connections:
-                    self._pool.append(conn)
-                else:
-                    conn.close()
-                    self._connection_count -= 1
-            except sqlite3.Error:
-                conn.close()
-                self._connection_count -= 1
-    
+        lease = getattr(self._local, 'lease', None)
+        if lease is None or lease[0] is not conn:
+            raise sqlite3.ProgrammingError("归还的连接不是当前线程借出的连接")
+        lease[1] -= 1
+        if lease[1] > 0:
+            return
+        self._local.lease = None
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+
+        with self._cond:
+            if self._closed or not healthy:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def stats(self):
+        """
+        Returns:
+            dict: max_connections, open_connections, idle_connections, in_use_connections,
+                  checkouts, reentrant_checkouts, waits, wait_seconds, timeouts, creations, discarded
+        """
+        with self._cond:
+            return {
+                'max_connections': self.max_connections,
+                'open_connections': self._size,
+                'idle_connections': len(self._idle),
+                'in_use_connections': self._size - len(self._idle),
+                **self._stats
+            }
+
     def close_all(self):
-        """关闭所有连接"""
-        with self._pool_lock:
-            for conn in self._pool:
-                try:
-                    conn.close()
-                except:
-                    pass
-            self._pool.clear()
-            self._connection_count = 0
-            DatabasePool._initialized = False
-            DatabasePool._instance = None
-
-
-# 全局连接池实例（延迟初始化）
+        """关闭所有空闲连接；借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+
+class MaintenanceScheduler:
+    """
+    后台数据库维护：每隔 interval 秒执行一次 wal_checkpoint(TRUNCATE) 和 PRAGMA optimize
+
+    自动检查点只把 WAL 写回数据库、不截断文件，一直有连接打开时 WAL 文件会越来越大；
+    定期 TRUNCATE 检查点把它清空，optimize 按需更新查询规划器的统计信息。
+    维护使用单独的短连接，不占用连接池名额；有读事务未结束时检查点记为 busy，下次再试。
+    """
+
+    def __init__(self, db_path, interval):
+        self.db_path = db_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'busy': 0, 'errors': 0, 'checkpointed_pages': 0, 'last_run': None}
+
+    def run_once(self):
+        """
+        立即执行一次维护
+
+        Returns:
+            tuple: wal_checkpoint 的结果 (busy, WAL 页数, 已写回页数)
+        """
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            result = tuple(conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone())
+            # 0x10002：新连接上也检查所有表（旧版 SQLite 忽略 0x10000 位）
+            conn.execute('PRAGMA optimize = 0x10002')
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['busy'] += result[0]
+            self._stats['checkpointed_pages'] += max(result[2], 0)
+            self._stats['last_run'] = datetime.now().isoformat(timespec='seconds')
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                print(f"数据库维护失败: {e}")
+                with self._lock:
+                    self._stats['errors'] += 1
+
+    def start(self):
+        """启动后台线程（守护线程，不阻止进程退出）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sqlite-maintenance', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """停止后台线程（正在执行的维护会先完成）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: interval, runs, busy, errors, checkpointed_pages, last_run
+        """
+        with self._lock:
+            return {'interval': self.interval, **self._stats}
+
+
+_maintenance = None
+
+
+def start_maintenance():
+    """按当前配置档启动后台维护（checkpoint_interval 为 0 时不启动），重复调用不会重复启动"""
+    global _maintenance
+    interval = get_sqlite_profile()['checkpoint_interval']
+    with _db_pool_lock:
+        if _maintenance is not None and _maintenance.db_path == DB_PATH:
+            return _maintenance
+        if _maintenance is not None:
+            _maintenance.stop()
+            _maintenance = None
+        if interval > 0:
+            _maintenance = MaintenanceScheduler(DB_PATH, interval)
+            _maintenance.start()
+        return _maintenance
+
+
+def stop_maintenance():
+    """停止后台维护"""
+    global _maintenance
+    with _db_pool_lock:
+        if _maintenance is not None:
+            _maintenance.stop()
+            _maintenance = None
+
+
+# 全局连接池实例（延迟初始化）：写连接池和只读连接池
 _db_pool = None
+_read_pool = None
+_db_pool_lock = threading.Lock()
 
 def get_db_pool():
-    """获取数据库连接池实例"""
+    """获取数据库连接池实例（读写）"""
     global _db_pool
     if _db_pool is None:
-        _db_pool = DatabasePool()
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = DatabasePool(db_path=DB_PATH)
     return _db_pool
 
 
+def get_read_pool():
+    """获取只读连接池实例（统计、列表、搜索、导出）"""
+    global _read_pool
+    if _read_pool is None:
+        with _db_pool_lock:
+            if _read_pool is None:
+                _read_pool = DatabasePool(db_path=DB_PATH, max_connections=READ_POOL_MAX_CONNECTIONS,
+                                          read_only=True)
+    return _read_pool
+
+
+def get_pool_stats():
+    """
+    获取两个连接池的状态和借出统计（用于调试 / 管理后台）
+
+    Returns:
+        dict: write / read 为 DatabasePool.stats 的结果，profile 为配置档名称，
+              maintenance 为后台维护统计（未启动时为 None）
+    """
+    maintenance = _maintenance
+    return {
+        'write': get_db_pool().stats(),
+        'read': get_read_pool().stats(),
+        'profile': SQLITE_PROFILE,
+        'maintenance': maintenance.stats() if maintenance is not None else None
+    }
+
+
 @contextmanager
 def get_db_connection():
     """
@@ -158,110 +431,414 @@ def get_db_connection():
         pool.release_connection(conn)
 
 
-# ==================== 数据库操作函数 ====================
-
-def init_db():
+@contextmanager
+def get_read_connection():
     """
-    初始化数据库，创建必要的表结构和索引
+    从只读连接池获取连接（不能写入，只用于查询）
+    使用示例:
+        with get_read_connection() as conn:
+            conn.execute('SELECT ...')
     """
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        
-        # 创建用户表
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nickname TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # 为用户表创建索引
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_users_nickname ON users(nickname)
-        ''')
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)
-        ''')
-        
-        # 创建问卷表
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS questionnaires (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            type_code TEXT NOT NULL,
-            type_name TEXT NOT NULL,
-            radar_data TEXT NOT NULL,
-            energy_data TEXT NOT NULL,
-            answers TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-        ''')
-        
-        # 为问卷表创建索引
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_questionnaires_user_id ON questionnaires(user_id)
-        ''')
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_questionnaires_type_code ON questionnaires(type_code)
-        ''')
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_questionnaires_created_at ON questionnaires(created_at)
-        ''')
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_questionnaires_date ON questionnaires(DATE(created_at))
-        ''')
-        
-        # 创建管理员密码表
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS admin_password (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            password TEXT NOT NULL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # 创建完整问卷表（如果不存在）
+    pool = get_read_pool()
+    conn = pool.get_connection()
+    try:
+        yield conn
+    finally:
+        pool.release_connection(conn)
+
+
+# ==================== 数据库迁移 ====================
+
+def _migration_1_base_schema(c):
+    """基础表结构和索引"""
+    # 创建用户表
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nickname TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # 为用户表创建索引
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_users_nickname ON users(nickname)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)
+    ''')
+    
+    # 创建问卷表
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        type_code TEXT NOT NULL,
+        type_name TEXT NOT NULL,
+        radar_data TEXT NOT NULL,
+        energy_data TEXT NOT NULL,
+        answers TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''')
+    
+    # 为问卷表创建索引
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_questionnaires_user_id ON questionnaires(user_id)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_questionnaires_type_code ON questionnaires(type_code)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_questionnaires_created_at ON questionnaires(created_at)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_questionnaires_date ON questionnaires(DATE(created_at))
+    ''')
+    
+    # 创建管理员密码表
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS admin_password (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        password TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # 创建完整问卷表（如果不存在）
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS complete_questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        bagang_type_code TEXT,
+        bagang_type_name TEXT,
+        bagang_radar_data TEXT,
+        bagang_energy_data TEXT,
+        bagang_answers TEXT,
+        wjw_main_constitution TEXT,
+        wjw_main_score INTEGER,
+        wjw_main_result TEXT,
+        wjw_all_results TEXT,
+        wjw_scores TEXT,
+        wjw_answers TEXT,
+        raw_answers TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''')
+    
+    # 为完整问卷表创建索引
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_complete_user_id ON complete_questionnaires(user_id)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_complete_bagang_type ON complete_questionnaires(bagang_type_code)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_complete_wjw_main ON complete_questionnaires(wjw_main_constitution)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_complete_created_at ON complete_questionnaires(created_at)
+    ''')
+
+
+def _migration_2_complete_questionnaire_columns(c):
+    """旧版完整问卷表补充 wjw_scores / raw_answers 列"""
+    c.execute('PRAGMA table_info(complete_questionnaires)')
+    existing = {row[1] for row in c.fetchall()}
+    for col in ['wjw_scores', 'raw_answers']:
+        if col not in existing:
+            c.execute(f'ALTER TABLE complete_questionnaires ADD COLUMN {col} TEXT')
+
+
+def _migration_3_statistics_tables(c):
+    """由触发器维护的统计表，get_statistics 不再扫描全表"""
+    # 总数计数器：users / questionnaires
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    # 体质类型分布（类型为空时记为 ''）
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_type_counts (
+        type_code TEXT PRIMARY KEY,
+        type_name TEXT,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    # 每日新增问卷数，日期与 DATE(created_at) 一致
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_daily_counts (
+        day TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('users', 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+    END
+    ''')
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_questionnaires_insert AFTER INSERT ON complete_questionnaires
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('questionnaires', 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO stats_type_counts (type_code, type_name, count)
+        VALUES (IFNULL(NEW.bagang_type_code, ''), NEW.bagang_type_name, 1)
+        ON CONFLICT(type_code) DO UPDATE SET count = count + 1, type_name = excluded.type_name;
+        INSERT INTO stats_daily_counts (day, count)
+        SELECT DATE(NEW.created_at), 1 WHERE DATE(NEW.created_at) IS NOT NULL
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_questionnaires_delete AFTER DELETE ON complete_questionnaires
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'questionnaires';
+        UPDATE stats_type_counts SET count = count - 1 WHERE type_code = IFNULL(OLD.bagang_type_code, '');
+        UPDATE stats_daily_counts SET count = count - 1 WHERE day = DATE(OLD.created_at);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_questionnaires_update
+    AFTER UPDATE OF bagang_type_code, bagang_type_name, created_at ON complete_questionnaires
+    BEGIN
+        UPDATE stats_type_counts SET count = count - 1 WHERE type_code = IFNULL(OLD.bagang_type_code, '');
+        INSERT INTO stats_type_counts (type_code, type_name, count)
+        VALUES (IFNULL(NEW.bagang_type_code, ''), NEW.bagang_type_name, 1)
+        ON CONFLICT(type_code) DO UPDATE SET count = count + 1, type_name = excluded.type_name;
+        UPDATE stats_daily_counts SET count = count - 1 WHERE day = DATE(OLD.created_at);
+        INSERT INTO stats_daily_counts (day, count)
+        SELECT DATE(NEW.created_at), 1 WHERE DATE(NEW.created_at) IS NOT NULL
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    END
+    ''')
+
+    _rebuild_statistics(c)
+
+
+def _rebuild_statistics(c):
+    """按现有数据重新计算统计表（调用方负责事务）"""
+    c.execute('DELETE FROM stats_counters')
+    c.execute('DELETE FROM stats_type_counts')
+    c.execute('DELETE FROM stats_daily_counts')
+    c.execute('''
+    INSERT INTO stats_counters (name, value)
+    SELECT 'users', COUNT(*) FROM users
+    UNION ALL
+    SELECT 'questionnaires', COUNT(*) FROM complete_questionnaires
+    ''')
+    c.execute('''
+    INSERT INTO stats_type_counts (type_code, type_name, count)
+    SELECT IFNULL(bagang_type_code, ''), MAX(bagang_type_name), COUNT(*)
+    FROM complete_questionnaires
+    GROUP BY IFNULL(bagang_type_code, '')
+    ''')
+    c.execute('''
+    INSERT INTO stats_daily_counts (day, count)
+    SELECT DATE(created_at), COUNT(*)
+    FROM complete_questionnaires
+    WHERE DATE(created_at) IS NOT NULL
+    GROUP BY DATE(created_at)
+    ''')
+
+
+def _migration_4_users_fts(c):
+    """昵称子串搜索用的 FTS5 三元组索引，由触发器与 users 表同步"""
+    try:
         c.execute('''
-        CREATE TABLE IF NOT EXISTS complete_questionnaires (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            bagang_type_code TEXT,
-            bagang_type_name TEXT,
-            bagang_radar_data TEXT,
-            bagang_energy_data TEXT,
-            bagang_answers TEXT,
-            wjw_main_constitution TEXT,
-            wjw_main_score INTEGER,
-            wjw_main_result TEXT,
-            wjw_all_results TEXT,
-            wjw_scores TEXT,
-            wjw_answers TEXT,
-            raw_answers TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            nickname, content='users', content_rowid='id', tokenize='trigram'
         )
         ''')
-        
-        # 为完整问卷表创建索引
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_complete_user_id ON complete_questionnaires(user_id)
-        ''')
-        c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_complete_bagang_type ON complete_questionnaires(bagang_type_code)
-        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite 版本过旧（< 3.34）或未编译 FTS5，昵称搜索回退到 LIKE 扫描
+        print(f"创建昵称搜索索引失败，将使用 LIKE 搜索: {e}")
+        return
+    
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_users_fts_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO users_fts (rowid, nickname) VALUES (NEW.id, NEW.nickname);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_users_fts_delete AFTER DELETE ON users
+    BEGIN
+        INSERT INTO users_fts (users_fts, rowid, nickname) VALUES ('delete', OLD.id, OLD.nickname);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_users_fts_update AFTER UPDATE OF nickname ON users
+    BEGIN
+        INSERT INTO users_fts (users_fts, rowid, nickname) VALUES ('delete', OLD.id, OLD.nickname);
+        INSERT INTO users_fts (rowid, nickname) VALUES (NEW.id, NEW.nickname);
+    END
+    ''')
+    c.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+
+# 回填列式存储时每批处理的行数
+_BACKFILL_CHUNK_SIZE = 1000
+
+
+def _migration_5_columnar_storage(c):
+    """雷达维度、卫健委得分和答案改为列式存储，并从 JSON 文本列回填"""
+    c.execute('PRAGMA table_info(complete_questionnaires)')
+    existing = {row[1] for row in c.fetchall()}
+    column_types = (
+        [(col, 'REAL') for col in columnar.RADAR_COLUMNS] +
+        [(col, 'INTEGER') for col in columnar.WJW_SCORE_COLUMNS] +
+        [(columnar.ANSWER_CODES_COLUMN, 'BLOB')]
+    )
+    for col, col_type in column_types:
+        if col not in existing:
+            c.execute(f'ALTER TABLE complete_questionnaires ADD COLUMN {col} {col_type}')
+
+    # 按 id 分批回填，JSON 无法解析的行对应列保持 NULL
+    update = 'UPDATE complete_questionnaires SET {} WHERE id = ?'.format(
+        ', '.join(f'{col} = ?' for col in columnar.COLUMNS)
+    )
+    last_id = 0
+    while True:
         c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_complete_wjw_main ON complete_questionnaires(wjw_main_constitution)
-        ''')
+        SELECT id, bagang_radar_data, wjw_scores, raw_answers, bagang_answers, wjw_answers
+        FROM complete_questionnaires
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+        ''', (last_id, _BACKFILL_CHUNK_SIZE))
+        rows = c.fetchall()
+        if not rows:
+            break
+        c.executemany(update, [(*_published_column_values(row[1:]), row[0]) for row in rows])
+        last_id = rows[-1][0]
+
+
+def _published_column_values(json_values):
+    """迁移 5 发布时写入的列值：答案编码为每题 1 字节（分数 1-5，未作答为 0），由迁移 6 重新打包"""
+    values = columnar.column_values_from_json(*json_values)
+    if values[-1] is not None:
+        values[-1] = bytes(logic.answer_codes_to_matrix([values[-1]])[0].astype('uint8'))
+    return values
+
+
+def _migration_6_compact_answer_codes(c):
+    """
+    早期每题 1 字节的答案编码重新打包为压缩编码
+
+    旧行的 JSON 答案列原样保留；确认编码无损后可用 clear_legacy_answer_json 手动清理
+    """
+    last_id = 0
+    while True:
         c.execute('''
-        CREATE INDEX IF NOT EXISTS idx_complete_created_at ON complete_questionnaires(created_at)
-        ''')
-        
+        SELECT id, answer_codes FROM complete_questionnaires
+        WHERE id > ? AND length(answer_codes) = ?
+        ORDER BY id
+        LIMIT ?
+        ''', (last_id, len(logic.ANSWER_KEYS), _BACKFILL_CHUNK_SIZE))
+        rows = c.fetchall()
+        if not rows:
+            break
+        packed = logic.pack_answer_matrix(logic.answer_codes_to_matrix([row[1] for row in rows]))
+        c.executemany('UPDATE complete_questionnaires SET answer_codes = ? WHERE id = ?',
+                      [(codes, row[0]) for codes, row in zip(packed, rows)])
+        last_id = rows[-1][0]
+
+
+def _migration_7_unique_nickname(c):
+    """昵称唯一：合并重复昵称的用户（问卷归到最早创建的用户名下），普通索引换成唯一索引"""
+    duplicates = '''
+    SELECT u.id, (SELECT MIN(k.id) FROM users k WHERE k.nickname = u.nickname) AS keep_id
+    FROM users u
+    WHERE EXISTS (SELECT 1 FROM users k WHERE k.nickname = u.nickname AND k.id < u.id)
+    '''
+    c.execute(duplicates)
+    merge = c.fetchall()
+    if merge:
+        for table in ['complete_questionnaires', 'questionnaires']:
+            c.executemany(f'UPDATE {table} SET user_id = ? WHERE user_id = ?',
+                          [(keep_id, user_id) for user_id, keep_id in merge])
+        c.executemany('DELETE FROM users WHERE id = ?', [(user_id,) for user_id, _ in merge])
+    
+    c.execute('DROP INDEX IF EXISTS idx_users_nickname')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_users_nickname_unique ON users(nickname)')
+
+
+# 按顺序执行的迁移，数据库当前版本记录在 PRAGMA user_version 中
+# 新的表结构变更只能追加到末尾，不能修改已发布的迁移
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_complete_questionnaire_columns,
+    _migration_3_statistics_tables,
+    _migration_4_users_fts,
+    _migration_5_columnar_storage,
+    _migration_6_compact_answer_codes,
+    _migration_7_unique_nickname,
+]
+
+
+def migrate_db(conn):
+    """
+    执行尚未应用的迁移，每个迁移一个事务
+    
+    Args:
+        conn: 数据库连接
+    
+    Returns:
+        int: 迁移后的版本号
+    """
+    c = conn.cursor()
+    c.execute('PRAGMA user_version')
+    if c.fetchone()[0] >= len(MIGRATIONS):
+        return len(MIGRATIONS)
+    
+    if conn.in_transaction:
         conn.commit()
     
+    for target in range(1, len(MIGRATIONS) + 1):
+        # IMMEDIATE 事务先拿写锁，避免多个进程同时迁移
+        c.execute('BEGIN IMMEDIATE')
+        try:
+            c.execute('PRAGMA user_version')
+            if c.fetchone()[0] >= target:
+                conn.rollback()
+                continue
+            MIGRATIONS[target - 1](c)
+            c.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    return len(MIGRATIONS)
+
+
+# ==================== 数据库操作函数 ====================
+
+def init_db():
+    """
+    初始化数据库：执行表结构迁移（仅首次或升级时真正执行），并启动后台维护
+    """
+    with get_db_connection() as conn:
+        migrate_db(conn)
+    
     # 初始化默认密码
     init_admin_password()
+    start_maintenance()
 
 
 def init_admin_password():
@@ -332,32 +909,59 @@ def update_admin_password(current_password, new_password):
             return False, f"修改失败: {str(e)}"
 
 
+# 昵称 -> 用户ID 的进程内缓存（Streamlit 每次重跑都会调用 get_or_create_user）
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
 def get_or_create_user(nickname):
     """
     获取用户，如果不存在则创建
     
+    先查进程内缓存；未命中时查询，不存在再用 INSERT ... ON CONFLICT DO NOTHING RETURNING 创建，
+    昵称有唯一索引，多个会话同时首次登录同一昵称也只会创建一个用户。
+    
     Args:
         nickname: 用户昵称
     
     Returns:
         user_id: 用户ID
     """
+    user_id = _user_cache.get(nickname)
+    if user_id is not None:
+        return user_id
+    
     with get_db_connection() as conn:
         c = conn.cursor()
         
-        # 查找用户
+        # 查找用户（只读，不占写锁）
         c.execute('SELECT id FROM users WHERE nickname = ?', (nickname,))
         user = c.fetchone()
         
-        if user:
-            user_id = user[0]
-        else:
-            # 创建新用户
-            c.execute('INSERT INTO users (nickname) VALUES (?)', (nickname,))
-            user_id = c.lastrowid
+        if user is None:
+            # 创建新用户；并发时被其他连接抢先插入则不返回行，再查一次
+            c.execute(
+                'INSERT INTO users (nickname) VALUES (?) ON CONFLICT(nickname) DO NOTHING RETURNING id',
+                (nickname,)
+            )
+            user = c.fetchone()
             conn.commit()
-        
-        return user_id
+            if user is None:
+                c.execute('SELECT id FROM users WHERE nickname = ?', (nickname,))
+                user = c.fetchone()
+    
+    user_id = user[0]
+    _user_cache.set(nickname, user_id)
+    return user_id
+
+
+def get_user_cache_stats():
+    """
+    用户缓存的命中统计
+    
+    Returns:
+        dict: size, maxsize, ttl, hits, misses, evictions, hit_rate
+    """
+    return _user_cache.stats()
 
 
 def save_questionnaire(user_id, type_code, type_name, radar_data, energy_data, answers):
@@ -391,7 +995,49 @@ def save_questionnaire(user_id, type_code, type_name, radar_data, energy_data, a
         conn.commit()
 
 
-def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers):
+# 完整问卷插入语句（created_at 为空时使用当前时间）
+# 表结构由 init_db 的迁移保证，保存时只执行这一条 INSERT，
+# 相同的 SQL 文本会命中 sqlite3 连接内的预编译语句缓存
+_INSERT_COMPLETE_QUESTIONNAIRE = '''
+INSERT INTO complete_questionnaires (
+    user_id, 
+    bagang_type_code, bagang_type_name, bagang_radar_data, bagang_energy_data, bagang_answers,
+    wjw_main_constitution, wjw_main_score, wjw_main_result, wjw_all_results, wjw_scores, wjw_answers,
+    raw_answers, {columns}, created_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {placeholders}, COALESCE(?, CURRENT_TIMESTAMP))
+'''.format(columns=', '.join(columnar.COLUMNS), placeholders=', '.join('?' * len(columnar.COLUMNS)))
+
+
+def _complete_questionnaire_params(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                   created_at=None):
+    """
+    把计算结果转换为 complete_questionnaires 的插入参数
+    """
+    return (
+        user_id,
+        part1_result['user_info']['type_code'],
+        part1_result['user_info']['type_name'],
+        json.dumps(part1_result['radar_chart']),
+        json.dumps(part1_result['energy_bars']),
+        None,  # 答案只保存在 answer_codes 中
+        part2_result['main_constitution'],
+        part2_result['main_score'],
+        part2_result['main_result'],
+        json.dumps(part2_result['constitution_results']),
+        json.dumps(part2_result['constitution_scores']),
+        None,
+        None,
+        *columnar.column_values(
+            part1_result['radar_chart'],
+            part2_result['constitution_scores'],
+            columnar.merge_answers(raw_answers, part1_answers, part2_answers)
+        ),
+        created_at
+    )
+
+
+def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                created_at=None):
     """
     保存完整的问卷数据（包含八纲辨证和卫健委两部分）
     
@@ -402,69 +1048,243 @@ def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answe
         part1_answers: 八纲辨证答案
         part2_answers: 卫健委答案
         raw_answers: 所有61道题的原始选择
+        created_at: 提交时间（UTC，YYYY-MM-DD HH:MM:SS），默认为当前时间
     """
     with get_db_connection() as conn:
         c = conn.cursor()
         
-        # 创建新的表结构（如果不存在）
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS complete_questionnaires (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            -- 八纲辨证结果
-            bagang_type_code TEXT,
-            bagang_type_name TEXT,
-            bagang_radar_data TEXT,
-            bagang_energy_data TEXT,
-            bagang_answers TEXT,
-            -- 卫健委结果
-            wjw_main_constitution TEXT,
-            wjw_main_score INTEGER,
-            wjw_main_result TEXT,
-            wjw_all_results TEXT,
-            wjw_scores TEXT,
-            wjw_answers TEXT,
-            -- 原始答案
-            raw_answers TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-        ''')
-        
-        # 检查并添加缺失的列
-        columns_to_check = ['wjw_scores', 'raw_answers']
-        for col in columns_to_check:
-            try:
-                c.execute(f'SELECT {col} FROM complete_questionnaires LIMIT 1')
-            except sqlite3.OperationalError:
-                # 列不存在，添加它
-                c.execute(f'ALTER TABLE complete_questionnaires ADD COLUMN {col} TEXT')
-        
         # 存储完整数据
-        c.execute('''
-        INSERT INTO complete_questionnaires (
-            user_id, 
-            bagang_type_code, bagang_type_name, bagang_radar_data, bagang_energy_data, bagang_answers,
-            wjw_main_constitution, wjw_main_score, wjw_main_result, wjw_all_results, wjw_scores, wjw_answers,
-            raw_answers
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user_id,
-            part1_result['user_info']['type_code'],
-            part1_result['user_info']['type_name'],
-            json.dumps(part1_result['radar_chart']),
-            json.dumps(part1_result['energy_bars']),
-            json.dumps(part1_answers),
-            part2_result['main_constitution'],
-            part2_result['main_score'],
-            part2_result['main_result'],
-            json.dumps(part2_result['constitution_results']),
-            json.dumps(part2_result['constitution_scores']),
-            json.dumps(part2_answers),
-            json.dumps(raw_answers)
+        c.execute(_INSERT_COMPLETE_QUESTIONNAIRE, _complete_questionnaire_params(
+            user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers, created_at
         ))
-        
+
+        conn.commit()
+
+
+def save_complete_questionnaires(records):
+    """
+    在一个事务内保存多份完整问卷（供后台写入队列使用）
+
+    Args:
+        records: 记录字典列表，键同 save_complete_questionnaire 的参数
+    """
+    with get_db_connection() as conn:
+        try:
+            conn.executemany(_INSERT_COMPLETE_QUESTIONNAIRE, [
+                _complete_questionnaire_params(**record) for record in records
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+# ==================== 批量导入 ====================
+
+# 完整问卷表中以 JSON 文本存储的列
+_JSON_COLUMNS = [
+    'bagang_radar_data', 'bagang_energy_data', 'bagang_answers',
+    'wjw_all_results', 'wjw_scores', 'wjw_answers', 'raw_answers'
+]
+
+# SQLite 单条语句的参数个数上限（保守值）
+_MAX_SQL_VARIABLES = 500
+
+
+def _iter_chunks(items, size):
+    """把可迭代对象切分为固定大小的列表"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _get_or_create_users(c, nicknames):
+    """
+    在当前事务中批量获取或创建用户（不提交）
+    
+    Returns:
+        dict: 昵称 -> 用户ID
+    """
+    nicknames = list(dict.fromkeys(nicknames))
+    user_ids = {}
+    
+    def lookup(names):
+        for chunk in _iter_chunks(names, _MAX_SQL_VARIABLES):
+            placeholders = ', '.join('?' * len(chunk))
+            c.execute(f'''
+            SELECT nickname, id FROM users
+            WHERE nickname IN ({placeholders})
+            ''', chunk)
+            user_ids.update(c.fetchall())
+    
+    lookup(nicknames)
+    missing = [n for n in nicknames if n not in user_ids]
+    if missing:
+        c.executemany('INSERT INTO users (nickname) VALUES (?) ON CONFLICT(nickname) DO NOTHING',
+                      [(n,) for n in missing])
+        lookup(missing)
+    
+    return user_ids
+
+
+def get_or_create_users(nicknames):
+    """
+    批量获取用户，不存在的一次性创建（get_or_create_user 的批量版本）
+    
+    Args:
+        nicknames: 昵称列表（可重复）
+    
+    Returns:
+        dict: 昵称 -> 用户ID
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        user_ids = _get_or_create_users(c, nicknames)
         conn.commit()
+        return user_ids
+
+
+def _submission_params(record, user_id):
+    """
+    把一条待导入的问卷记录转换为插入参数
+    
+    支持两种格式：
+    - save_complete_questionnaire 的参数（part1_result, part2_result, ...）
+    - complete_questionnaires 表的列（bagang_type_code, ..., created_at），JSON 列可为字符串或对象
+    """
+    if 'part1_result' in record:
+        return _complete_questionnaire_params(
+            user_id,
+            record['part1_result'],
+            record['part2_result'],
+            record.get('part1_answers', {}),
+            record.get('part2_answers', {}),
+            record.get('raw_answers', {}),
+            created_at=record.get('created_at')
+        )
+    
+    def column(name):
+        value = record.get(name)
+        if name in _JSON_COLUMNS and value is not None and not isinstance(value, str):
+            return json.dumps(value)
+        return value if value != '' else None
+    
+    return (
+        user_id,
+        column('bagang_type_code'),
+        column('bagang_type_name'),
+        column('bagang_radar_data'),
+        column('bagang_energy_data'),
+        None,  # 答案只保存在 answer_codes 中
+        column('wjw_main_constitution'),
+        column('wjw_main_score'),
+        column('wjw_main_result'),
+        column('wjw_all_results'),
+        column('wjw_scores'),
+        None,
+        None,
+        *columnar.column_values_from_json(
+            record.get('bagang_radar_data'),
+            record.get('wjw_scores'),
+            record.get('raw_answers'),
+            record.get('bagang_answers'),
+            record.get('wjw_answers')
+        ),
+        column('created_at')
+    )
+
+
+def bulk_import_questionnaires(submissions, chunk_size=5000, progress_callback=None, invalid_callback=None):
+    """
+    批量导入历史问卷（回填数据 / 从其他 CyberTCM 实例迁移）
+    
+    每 chunk_size 条记录一个事务：先批量获取或创建用户，再用 executemany 写入问卷。
+    缺少 nickname 的记录跳过并继续导入，不会因一条坏记录中断在半途。
+    某一批写入失败时该批回滚，之前的批次保留，抛出的异常说明已导入多少条。
+    
+    Args:
+        submissions: 可迭代的问卷记录（字典），每条必须包含 nickname，
+                     其余字段格式见 _submission_params
+        chunk_size: 每个事务写入的记录数
+        progress_callback: 每提交一个事务后调用 progress_callback(已导入条数)
+        invalid_callback: 跳过记录时调用 invalid_callback(序号, 记录)，序号从 1 开始；
+                          不传时在导入结束后打印跳过的条数
+    
+    Returns:
+        int: 导入的问卷数量
+    
+    Raises:
+        RuntimeError: 某一批写入失败（原始异常见 __cause__）
+    """
+    imported = 0
+    skipped = 0
+    
+    def valid_records():
+        nonlocal skipped
+        for position, record in enumerate(submissions, 1):
+            if record.get('nickname'):
+                yield record
+                continue
+            skipped += 1
+            if invalid_callback:
+                invalid_callback(position, record)
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        for chunk in _iter_chunks(valid_records(), chunk_size):
+            try:
+                user_ids = _get_or_create_users(c, [r['nickname'] for r in chunk])
+                c.executemany(_INSERT_COMPLETE_QUESTIONNAIRE, [
+                    _submission_params(r, user_ids[r['nickname']]) for r in chunk
+                ])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise RuntimeError(
+                    f"第 {imported + 1}-{imported + len(chunk)} 条有效记录写入失败（该批已回滚），"
+                    f"已导入 {imported} 条: {e}"
+                ) from e
+            
+            imported += len(chunk)
+            if progress_callback:
+                progress_callback(imported)
+    
+    if skipped and not invalid_callback:
+        print(f"跳过 {skipped} 条缺少 nickname 的问卷记录")
+    return imported
+
+
+def iter_submission_file(filename):
+    """
+    逐条读取问卷导出文件（.jsonl 或 .csv），供 bulk_import_questionnaires 使用
+    
+    Args:
+        filename: 文件路径。CSV 可以是本应用导出的文件（表头见 exporter.EXPORT_HEADERS），
+                  也可以直接以 nickname 和 complete_questionnaires 的列名为表头
+    
+    Yields:
+        dict: 问卷记录
+    """
+    import csv
+    
+    if filename.endswith('.csv'):
+        with open(filename, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            is_export = '用户昵称' in (reader.fieldnames or [])
+            for row in reader:
+                yield exporter.parse_export_row(row) if is_export else row
+    else:
+        with open(filename, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
 
 
 def get_user_questionnaires(user_id):
@@ -477,7 +1297,7 @@ def get_user_questionnaires(user_id):
     Returns:
         问卷历史列表
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
         
         c.execute('''
@@ -509,7 +1329,7 @@ def get_questionnaire_detail(questionnaire_id):
     Returns:
         问卷详细信息
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
         
         c.execute('''
@@ -541,7 +1361,7 @@ def get_all_users():
     Returns:
         用户列表，包含用户ID、昵称、创建时间和问卷数量
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
         
         c.execute('''
@@ -570,62 +1390,180 @@ def get_all_questionnaires(limit=None, offset=0):
     
     Args:
         limit: 限制返回数量
-        offset: 偏移量
+        offset: 偏移量（翻页请使用 get_questionnaires_page）
     
     Returns:
         问卷列表
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
         
-        query = '''
-        SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
-        FROM complete_questionnaires q
-        JOIN users u ON q.user_id = u.id
-        ORDER BY q.created_at DESC
-        '''
+        query = _QUESTIONNAIRE_LIST_QUERY + ' ORDER BY q.created_at DESC, q.id DESC'
+        params = []
         
         if limit:
-            query += f' LIMIT {limit} OFFSET {offset}'
+            query += ' LIMIT ? OFFSET ?'
+            params += [int(limit), int(offset)]
+        
+        c.execute(query, params)
+        return [_questionnaire_summary(row) for row in c.fetchall()]
+
+
+# ==================== 分页查询 ====================
+
+# 问卷列表查询（后面拼接 WHERE / ORDER BY）
+_QUESTIONNAIRE_FROM = '''
+FROM complete_questionnaires q
+JOIN users u ON q.user_id = u.id
+'''
+_QUESTIONNAIRE_LIST_QUERY = '''
+SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
+''' + _QUESTIONNAIRE_FROM
+
+
+def _questionnaire_summary(row):
+    return {
+        'id': row[0],
+        'nickname': row[1],
+        'type_code': row[2],
+        'type_name': row[3],
+        'created_at': row[4]
+    }
+
+
+def _nickname_condition(c, nickname):
+    """
+    昵称子串筛选条件：3 个字符以上走 users_fts 三元组索引，
+    更短的关键词无法用三元组索引，只能 LIKE 扫描 users 表（不扫描问卷表）
+    
+    Returns:
+        tuple: (条件, 参数)
+    """
+    if len(nickname) >= 3:
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+        if c.fetchone():
+            # 加双引号作为短语查询，即子串匹配（不区分大小写）
+            return ('q.user_id IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)',
+                    '"' + nickname.replace('"', '""') + '"')
+    # 先扫描较小的 users 表得到用户ID，再按 idx_complete_user_id 取问卷
+    return ("q.user_id IN (SELECT id FROM users WHERE nickname LIKE ? ESCAPE '\\')",
+            pagination.like_pattern(nickname))
+
+
+def _questionnaire_filters(c, nickname=None, type_code=None, start_date=None, end_date=None):
+    """
+    生成问卷筛选条件
+    
+    Returns:
+        tuple: (WHERE 子句, 参数列表)
+    """
+    conditions = []
+    params = []
+    
+    if nickname:
+        condition, param = _nickname_condition(c, nickname)
+        conditions.append(condition)
+        params.append(param)
+    
+    if type_code:
+        conditions.append('q.bagang_type_code = ?')
+        params.append(type_code)
+    
+    # 按天筛选转换为半开区间，走 created_at 索引
+    start, end = pagination.date_range_bounds(start_date, end_date)
+    if start:
+        conditions.append('q.created_at >= ?')
+        params.append(start)
+    
+    if end:
+        conditions.append('q.created_at < ?')
+        params.append(end)
+    
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    return where, params
+
+
+def get_questionnaires_page(page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None,
+                            nickname=None, type_code=None, start_date=None, end_date=None):
+    """
+    按提交时间倒序分页获取问卷（游标分页，翻到多深都只读一页）
+    
+    Args:
+        page_size: 每页条数（最多 pagination.MAX_PAGE_SIZE）
+        cursor: 上一页返回的 next_cursor，第一页为 None
+        nickname / type_code / start_date / end_date: 筛选条件，同 search_questionnaires
+    
+    Returns:
+        dict: items（问卷列表）、next_cursor（没有下一页时为 None）、
+              total / total_is_estimate（符合条件的总数，只在第一页计算）
+    """
+    page_size = pagination.clamp_page_size(page_size)
+    
+    with get_read_connection() as conn:
+        c = conn.cursor()
+        where, params = _questionnaire_filters(c, nickname, type_code, start_date, end_date)
         
-        c.execute(query)
+        total = None
+        total_is_estimate = False
+        if cursor is None:
+            total, total_is_estimate = _count_questionnaires(c, where, params)
         
-        questionnaires = []
-        for row in c.fetchall():
-            questionnaires.append({
-                'id': row[0],
-                'nickname': row[1],
-                'type_code': row[2],
-                'type_name': row[3],
-                'created_at': row[4]
-            })
+        page_where, page_params = where, list(params)
+        if cursor is not None:
+            created_at, questionnaire_id = pagination.decode_cursor(cursor)
+            page_where += (' AND ' if page_where else ' WHERE ') + '(q.created_at, q.id) < (?, ?)'
+            page_params += [created_at, questionnaire_id]
         
-        return questionnaires
+        c.execute(
+            _QUESTIONNAIRE_LIST_QUERY + page_where + ' ORDER BY q.created_at DESC, q.id DESC LIMIT ?',
+            page_params + [page_size + 1]
+        )
+        rows = [_questionnaire_summary(row) for row in c.fetchall()]
+    
+    return pagination.make_page(rows, page_size, total, total_is_estimate)
+
+
+def _count_questionnaires(c, where, params):
+    """
+    统计符合条件的问卷数：无筛选时读统计表，有筛选时最多数到 COUNT_LIMIT
+    
+    Returns:
+        tuple: (总数, 是否为估计值)
+    """
+    if not where:
+        c.execute("SELECT value FROM stats_counters WHERE name = 'questionnaires'")
+        row = c.fetchone()
+        return (row[0] if row else 0), False
+    
+    c.execute(
+        f'SELECT COUNT(*) FROM (SELECT 1 {_QUESTIONNAIRE_FROM} {where} LIMIT ?)',
+        params + [pagination.COUNT_LIMIT + 1]
+    )
+    count = c.fetchone()[0]
+    if count > pagination.COUNT_LIMIT:
+        return pagination.COUNT_LIMIT, True
+    return count, False
 
 
 def get_statistics():
     """
-    获取数据统计信息
+    获取数据统计信息（读取触发器维护的统计表，与数据量无关）
     
     Returns:
         统计信息字典
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
         
-        # 总用户数
-        c.execute('SELECT COUNT(*) FROM users')
-        total_users = c.fetchone()[0]
-        
-        # 总问卷数
-        c.execute('SELECT COUNT(*) FROM complete_questionnaires')
-        total_questionnaires = c.fetchone()[0]
+        # 总用户数 / 总问卷数
+        c.execute('SELECT name, value FROM stats_counters')
+        counters = dict(c.fetchall())
         
         # 体质类型分布
         c.execute('''
-        SELECT bagang_type_code, bagang_type_name, COUNT(*) as count
-        FROM complete_questionnaires
-        GROUP BY bagang_type_code
+        SELECT NULLIF(type_code, ''), type_name, count
+        FROM stats_type_counts
+        WHERE count > 0
         ORDER BY count DESC
         ''')
         
@@ -637,211 +1575,191 @@ def get_statistics():
                 'count': row[2]
             })
         
-        # 今日新增
-        today = datetime.now().strftime('%Y-%m-%d')
-        c.execute('''
-        SELECT COUNT(*) FROM complete_questionnaires
-        WHERE DATE(created_at) = ?
-        ''', (today,))
-        today_count = c.fetchone()[0]
+        # 今日新增：触发器按 DATE(created_at)（UTC）记录，这里同样用 SQLite 的 UTC 日期
+        c.execute("SELECT count FROM stats_daily_counts WHERE day = date('now')")
+        row = c.fetchone()
         
         return {
-            'total_users': total_users,
-            'total_questionnaires': total_questionnaires,
-            'today_count': today_count,
+            'total_users': counters.get('users', 0),
+            'total_questionnaires': counters.get('questionnaires', 0),
+            'today_count': row[0] if row else 0,
             'type_distribution': type_distribution
         }
 
 
-def export_to_csv(filename='cybertcm_export.csv'):
+def rebuild_statistics():
     """
-    导出所有数据到CSV文件
+    按现有数据重建统计表（手工修改过数据库、或怀疑统计不准时使用）
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        try:
+            _rebuild_statistics(c)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def clear_legacy_answer_json(dry_run=False, progress_callback=None):
+    """
+    清空旧问卷的 JSON 答案列（bagang_answers / wjw_answers / raw_answers），答案只保留压缩编码
+
+    只清理编码能完整还原 JSON 内容的行（见 columnar.codes_preserve_json），
+    含有其他键、非标准答案或无法解析的行保留原 JSON。清空后无法恢复，请先备份数据库。
+
+    Args:
+        dry_run: 只检查并统计，不修改数据
+        progress_callback: 进度回调，参数为已检查行数
+
+    Returns:
+        dict: checked（检查的行数）, cleared（已清空 / 可清空的行数）, kept（保留 JSON 的行数）
+    """
+    result = {'checked': 0, 'cleared': 0, 'kept': 0}
+    last_id = 0
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        while True:
+            c.execute('''
+            SELECT id, answer_codes, raw_answers, bagang_answers, wjw_answers
+            FROM complete_questionnaires
+            WHERE id > ? AND answer_codes IS NOT NULL
+              AND (bagang_answers IS NOT NULL OR wjw_answers IS NOT NULL OR raw_answers IS NOT NULL)
+            ORDER BY id
+            LIMIT ?
+            ''', (last_id, _BACKFILL_CHUNK_SIZE))
+            rows = c.fetchall()
+            if not rows:
+                break
+            clear = [(row[0],) for row in rows if columnar.codes_preserve_json(*row[1:])]
+            if clear and not dry_run:
+                c.executemany('''
+                UPDATE complete_questionnaires
+                SET bagang_answers = NULL, wjw_answers = NULL, raw_answers = NULL
+                WHERE id = ?
+                ''', clear)
+                conn.commit()
+            last_id = rows[-1][0]
+            result['checked'] += len(rows)
+            result['cleared'] += len(clear)
+            result['kept'] += len(rows) - len(clear)
+            if progress_callback:
+                progress_callback(result['checked'])
+    return result
+
+
+# 各雷达维度 / 卫健委体质得分的平均值（直接对数值列聚合）
+_SCORE_AVERAGES_QUERY = 'SELECT COUNT({}), {} FROM complete_questionnaires'.format(
+    columnar.ANSWER_CODES_COLUMN, ', '.join(f'AVG({col})' for col in columnar.SCORE_COLUMNS)
+)
+
+
+def get_score_averages():
+    """
+    获取各雷达维度和卫健委体质得分的平均值
+
+    Returns:
+        dict: count（有列式数据的问卷数）, radar {维度: 平均分}, wjw_scores {体质: 平均分}
+    """
+    with get_read_connection() as conn:
+        c = conn.cursor()
+        c.execute(_SCORE_AVERAGES_QUERY)
+        row = c.fetchone()
+        return columnar.score_averages(row[0], row[1:])
+
+
+# ==================== 数据导出 ====================
+
+# 完整问卷导出查询，列顺序与 exporter.EXPORT_SOURCE_COLUMNS 一致
+_EXPORT_QUERY = '''
+SELECT {}
+FROM complete_questionnaires c
+JOIN users u ON c.user_id = u.id
+ORDER BY c.created_at DESC, c.id DESC
+'''.format(', '.join('u.nickname' if col == 'nickname' else f'c.{col}' for col in exporter.EXPORT_SOURCE_COLUMNS))
+
+# 导出时每次从游标取出的行数
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _fetch_in_chunks(cursor, size=EXPORT_CHUNK_SIZE):
+    """按块从游标取数据，避免 fetchall 一次读入全表"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def export_questionnaires(filename, progress_callback=None):
+    """
+    流式导出完整问卷数据，格式由扩展名决定（.csv 或 .xlsx）
     
     Args:
         filename: 导出文件名
+        progress_callback: 进度回调，参数为已导出行数
     
     Returns:
-        导出的文件路径
+        导出的文件路径；没有问卷数据时不保留文件，返回 None（三个后端一致）
     """
-    import csv
-    
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
+        c.execute(_EXPORT_QUERY)
+        count = exporter.write_export(filename, _fetch_in_chunks(c), progress_callback)
         
-        # 查询所有问卷数据
-        c.execute('''
-        SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
-        FROM complete_questionnaires q
-        JOIN users u ON q.user_id = u.id
-        ORDER BY q.created_at DESC
-        ''')
-        
-        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            # 写入表头
-            writer.writerow(['ID', '用户昵称', '体质代码', '体质名称', '提交时间'])
-            
-            # 写入数据
-            for row in c.fetchall():
-                writer.writerow([
-                    row[0],
-                    row[1],
-                    row[2],
-                    row[3],
-                    row[4]
-                ])
+        if count == 0:
+            # 如果没有完整问卷数据，导出旧版问卷数据（只有 SQLite 有旧版问卷表）
+            c.execute('''
+            SELECT q.id, u.nickname, q.type_code, q.type_name, q.radar_data, q.energy_data, q.created_at
+            FROM questionnaires q
+            JOIN users u ON q.user_id = u.id
+            ORDER BY q.created_at DESC, q.id DESC
+            ''')
+            count = exporter.write_rows(
+                filename,
+                ['ID', '用户昵称', '体质代码', '体质名称', '雷达数据', '能量数据', '提交时间'],
+                (list(row) for row in _fetch_in_chunks(c)),
+                progress_callback
+            )
+    
+    return exporter.discard_empty_export(filename, count)
+
+
+def export_to_csv(filename='cybertcm_export.csv', progress_callback=None):
+    """
+    导出所有数据到CSV文件（列与 Excel 导出一致）
+    
+    Args:
+        filename: 导出文件名
+        progress_callback: 进度回调，参数为已导出行数
     
-    return filename
+    Returns:
+        导出的文件路径
+    """
+    return export_questionnaires(filename, progress_callback)
 
 
-def export_to_excel(filename='cybertcm_export.xlsx'):
+def export_to_excel(filename='cybertcm_export.xlsx', progress_callback=None):
     """
     导出所有数据到Excel文件（包含八纲辨证和卫健委两部分结果）
     
     Args:
         filename: 导出文件名
+        progress_callback: 进度回调，参数为已导出行数
     
     Returns:
         导出的文件路径
     """
     try:
-        import pandas as pd
-        import json
-        
-        with get_db_connection() as conn:
-            # 查询完整问卷数据（包含两部分）
-            df = pd.read_sql_query('''
-            SELECT 
-                c.id, u.nickname, 
-                c.bagang_type_code, c.bagang_type_name, c.bagang_radar_data, c.bagang_energy_data,
-                c.wjw_main_constitution, c.wjw_main_score, c.wjw_main_result, c.wjw_all_results, c.wjw_scores,
-                c.raw_answers,
-                c.created_at
-            FROM complete_questionnaires c
-            JOIN users u ON c.user_id = u.id
-            ORDER BY c.created_at DESC
-            ''', conn)
-            
-            if len(df) == 0:
-                # 如果没有完整问卷数据，尝试查询旧版问卷数据
-                df = pd.read_sql_query('''
-                SELECT q.id, u.nickname, q.type_code, q.type_name, q.radar_data, q.energy_data, q.created_at
-                FROM questionnaires q
-                JOIN users u ON q.user_id = u.id
-                ORDER BY q.created_at DESC
-                ''', conn)
-                
-                # 重命名列
-                df.columns = ['ID', '用户昵称', '体质代码', '体质名称', '雷达数据', '能量数据', '提交时间']
-            else:
-                # 处理完整问卷数据
-                # 解析雷达数据
-                def parse_radar(radar_json):
-                    try:
-                        radar = json.loads(radar_json) if radar_json else {}
-                        return ', '.join([f"{k}:{v}" for k, v in radar.items()])
-                    except:
-                        return radar_json
-                
-                # 解析卫健委所有体质结果
-                def parse_wjw_results(wjw_json):
-                    try:
-                        results = json.loads(wjw_json) if wjw_json else {}
-                        return ', '.join([f"{k}({v['score']}分-{v['result']})" for k, v in results.items()])
-                    except:
-                        return wjw_json
-                
-                # 解析卫健委9维度原始分数
-                def parse_wjw_scores(scores_json):
-                    try:
-                        scores = json.loads(scores_json) if scores_json else {}
-                        return scores
-                    except:
-                        return {}
-                
-                # 解析原始答案（确保中文正常显示，按题号排序）
-                def parse_raw_answers(raw_json):
-                    try:
-                        answers = json.loads(raw_json) if raw_json else {}
-                        
-                        # 分离两组题目
-                        q_items = []  # 八纲辨证题目 (q_1 到 q_28)
-                        w_items = []  # 卫健委题目 (wjw_q_1 到 wjw_q_33)
-                        
-                        for key, value in answers.items():
-                            if key.startswith('q_'):
-                                q_num = int(key.replace('q_', ''))
-                                q_items.append((q_num, f"Q{q_num}:{value}"))
-                            elif key.startswith('wjw_q_'):
-                                q_num = int(key.replace('wjw_q_', ''))
-                                w_items.append((q_num, f"W{q_num}:{value}"))
-                        
-                        # 按数字排序
-                        q_items.sort(key=lambda x: x[0])
-                        w_items.sort(key=lambda x: x[0])
-                        
-                        # 合并结果（先Q后W）
-                        formatted = [item[1] for item in q_items] + [item[1] for item in w_items]
-                        
-                        return '; '.join(formatted)
-                    except:
-                        return raw_json
-                
-                # 应用解析函数
-                df['八纲雷达数据'] = df['bagang_radar_data'].apply(parse_radar)
-                df['八纲能量数据'] = df['bagang_energy_data'].apply(parse_radar)
-                df['卫健委各体质结果'] = df['wjw_all_results'].apply(parse_wjw_results)
-                
-                # 处理原始答案列
-                if 'raw_answers' in df.columns:
-                    df['原始答案'] = df['raw_answers'].apply(parse_raw_answers)
-                
-                # 展开卫健委9维度分数
-                wjw_scores_df = df['wjw_scores'].apply(parse_wjw_scores).apply(pd.Series)
-                
-                # 重命名列
-                df = df.rename(columns={
-                    'id': 'ID',
-                    'nickname': '用户昵称',
-                    'bagang_type_code': '八纲体质代码',
-                    'bagang_type_name': '八纲体质名称',
-                    'wjw_main_constitution': '卫健委主要体质',
-                    'wjw_main_score': '卫健委主要体质得分',
-                    'wjw_main_result': '卫健委主要体质判定',
-                    'created_at': '提交时间'
-                })
-                
-                # 合并数据
-                df = pd.concat([df, wjw_scores_df], axis=1)
-                
-                # 选择要导出的列（包含9维度分数）
-                columns = ['ID', '用户昵称', '八纲体质代码', '八纲体质名称', '八纲雷达数据', '八纲能量数据',
-                           '卫健委主要体质', '卫健委主要体质得分', '卫健委主要体质判定']
-                
-                # 添加9维度分数列（如果存在）
-                constitution_types = ['气虚质', '阳虚质', '阴虚质', '痰湿质', '湿热质', '血瘀质', '气郁质', '特禀质', '平和质']
-                for ctype in constitution_types:
-                    if ctype in df.columns:
-                        columns.append(ctype)
-                
-                columns.extend(['卫健委各体质结果', '原始答案', '提交时间'])
-                
-                # 只选择存在的列
-                existing_columns = [c for c in columns if c in df.columns]
-                df = df[existing_columns]
-            
-            # 保存到Excel
-            df.to_excel(filename, index=False, engine='openpyxl')
-            
-            return filename
+        return export_questionnaires(filename, progress_callback)
     except ImportError:
-        print("请先安装pandas和openpyxl: pip install pandas openpyxl")
+        print("请先安装openpyxl: pip install openpyxl")
         return None
 
 
 def search_questionnaires(nickname=None, type_code=None, start_date=None, end_date=None):
     """
-    搜索问卷数据
+    搜索问卷数据（返回全部匹配结果，分页显示请使用 get_questionnaires_page）
     
     Args:
         nickname: 用户昵称（模糊搜索）
@@ -852,48 +1770,11 @@ def search_questionnaires(nickname=None, type_code=None, start_date=None, end_da
     Returns:
         符合条件的问卷列表
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         c = conn.cursor()
-        
-        query = '''
-        SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
-        FROM complete_questionnaires q
-        JOIN users u ON q.user_id = u.id
-        WHERE 1=1
-        '''
-        params = []
-        
-        if nickname:
-            query += ' AND u.nickname LIKE ?'
-            params.append(f'%{nickname}%')
-        
-        if type_code:
-            query += ' AND q.bagang_type_code = ?'
-            params.append(type_code)
-        
-        if start_date:
-            query += ' AND DATE(q.created_at) >= ?'
-            params.append(start_date)
-        
-        if end_date:
-            query += ' AND DATE(q.created_at) <= ?'
-            params.append(end_date)
-        
-        query += ' ORDER BY q.created_at DESC'
-        
-        c.execute(query, params)
-        
-        questionnaires = []
-        for row in c.fetchall():
-            questionnaires.append({
-                'id': row[0],
-                'nickname': row[1],
-                'type_code': row[2],
-                'type_name': row[3],
-                'created_at': row[4]
-            })
-        
-        return questionnaires
+        where, params = _questionnaire_filters(c, nickname, type_code, start_date, end_date)
+        c.execute(_QUESTIONNAIRE_LIST_QUERY + where + ' ORDER BY q.created_at DESC, q.id DESC', params)
+        return [_questionnaire_summary(row) for row in c.fetchall()]
 
 
 def get_database_info():
@@ -903,15 +1784,13 @@ def get_database_info():
     Returns:
         数据库信息字典
     """
-    import os
-    
-    db_path = 'cybertcm.db'
+    db_path = DB_PATH
     
     if os.path.exists(db_path):
         file_size = os.path.getsize(db_path)
         file_size_mb = file_size / (1024 * 1024)
         
-        with get_db_connection() as conn:
+        with get_read_connection() as conn:
             c = conn.cursor()
             
             # 获取表信息
@@ -934,7 +1813,13 @@ def close_db_pool():
     关闭数据库连接池
     在应用退出时调用，释放所有连接资源
     """
-    global _db_pool
+    global _db_pool, _read_pool
+    stop_maintenance()
     if _db_pool is not None:
         _db_pool.close_all()
         _db_pool = None
+    if _read_pool is not None:
+        _read_pool.close_all()
+        _read_pool = None
+    # 缓存的用户ID只对当前数据库有效
+    _user_cache.clear()
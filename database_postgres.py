@@ -1,8 +1,16 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 import json
 import os
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+
+import columnar
+import exporter
+import pagination
+from ttl_cache import TTLCache
 
 # 兼容 Streamlit Cloud 和本地环境的配置读取
 def get_db_config():
@@ -76,8 +84,78 @@ def _get_cached_config():
         _db_config = get_db_config()
     return _db_config
 
-def get_connection():
-    """获取数据库连接"""
+# ==================== 连接池 ====================
+
+# 连接池配置（可通过环境变量调整）
+POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX', '5'))
+# psycopg2 连接池归还连接时最多保留 minconn 个空闲连接（其余直接关闭），启动时也会先建立这么多连接；
+# 默认 1 个，不在启动时占用数据库的连接名额，并发较高时可调大以减少反复建连
+POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN', '1'))
+# 连接池满时等待空闲连接的秒数
+POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# 连接空闲超过该秒数后，借出前先执行 SELECT 1 检查是否仍然可用
+POOL_HEALTH_CHECK_IDLE = float(os.getenv('DB_POOL_HEALTH_CHECK_IDLE', '30'))
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """记录建立或最近一次归还时间的连接（用于判断是否需要健康检查）"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 刚建立的连接不需要 SELECT 1
+        self.last_used = time.monotonic()
+
+
+class _BoundedConnectionPool(ThreadedConnectionPool):
+    """
+    psycopg2 连接池加上借出名额：池满时 getconn 直接抛出 PoolError，
+    这里先等待名额（最多 POOL_CHECKOUT_TIMEOUT 秒），只使用 getconn / putconn 公开接口
+    """
+    
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, connection_factory=_PooledConnection, **kwargs)
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self._in_use = 0
+        self._count_lock = threading.Lock()
+    
+    def checkout(self, timeout):
+        """借出连接，池满时等待；超时抛出 PoolError"""
+        if not self.slots.acquire(timeout=timeout):
+            raise PoolError(f"等待数据库连接超时（{timeout} 秒）")
+        try:
+            conn = self.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        with self._count_lock:
+            self._in_use += 1
+        return conn
+    
+    def release(self, conn, close=False):
+        """归还连接并交还名额（conn 为 None 时只交还名额）；连接池已关闭时直接关闭连接"""
+        try:
+            if conn is not None:
+                try:
+                    self.putconn(conn, close=close)
+                except PoolError:
+                    # 借出期间连接池已被 close_pool 关闭
+                    conn.close()
+        finally:
+            with self._count_lock:
+                self._in_use -= 1
+            self.slots.release()
+    
+    def in_use(self):
+        with self._count_lock:
+            return self._in_use
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect_kwargs():
+    """从配置生成 psycopg2.connect 参数，配置缺失时报错"""
     db_config = _get_cached_config()
     
     DB_USER = db_config['DB_USER']
@@ -86,11 +164,6 @@ def get_connection():
     DB_PORT = db_config['DB_PORT']
     DB_NAME = db_config['DB_NAME']
     
-    print(f"[DB DEBUG] 尝试连接数据库...")
-    print(f"[DB DEBUG]   Host: {DB_HOST}:{DB_PORT}")
-    print(f"[DB DEBUG]   Database: {DB_NAME}")
-    print(f"[DB DEBUG]   User: {DB_USER}")
-    
     if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
         missing = []
         if not DB_USER: missing.append('USER')
@@ -100,27 +173,138 @@ def get_connection():
         if not DB_NAME: missing.append('NAME')
         raise ValueError(f"数据库配置缺失：{', '.join(missing)}")
     
+    return {
+        'user': DB_USER,
+        'password': DB_PASSWORD,
+        'host': DB_HOST,
+        'port': DB_PORT,
+        'dbname': DB_NAME,
+        'connect_timeout': 10
+    }
+
+
+def _get_pool():
+    """获取连接池，首次调用时创建"""
+    global _pool
+    pool = _pool
+    if pool is None:
+        with _pool_lock:
+            if _pool is None:
+                kwargs = _connect_kwargs()
+                try:
+                    _pool = _BoundedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **kwargs)
+                except psycopg2.OperationalError as e:
+                    print(f"[DB DEBUG] ✗ 数据库连接失败！")
+                    print(f"[DB DEBUG]   错误详情：{e}")
+                    print(f"[DB DEBUG]   Host: {kwargs['host']}:{kwargs['port']}")
+                    print(f"[DB DEBUG]   Database: {kwargs['dbname']}")
+                    print(f"[DB DEBUG]   User: {kwargs['user']}")
+                    raise
+                print(f"[DB DEBUG] ✓ 连接池已创建（{POOL_MIN_CONNECTIONS}-{POOL_MAX_CONNECTIONS} 个连接）")
+            pool = _pool
+    return pool
+
+
+def _is_healthy(conn):
+    """检查连接是否可用，最近用过的连接跳过 SELECT 1"""
+    if conn.closed:
+        return False
+    if time.monotonic() - conn.last_used < POOL_HEALTH_CHECK_IDLE:
+        return True
     try:
-        conn = psycopg2.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME
-        )
-        print(f"[DB DEBUG] ✓ 数据库连接成功！")
-        return conn
-    except psycopg2.OperationalError as e:
-        print(f"[DB DEBUG] ✗ 数据库连接失败！")
-        print(f"[DB DEBUG]   错误类型：psycopg2.OperationalError")
-        print(f"[DB DEBUG]   错误详情：{e}")
-        print(f"[DB DEBUG] 连接参数:")
-        print(f"[DB DEBUG]   Host: {DB_HOST}:{DB_PORT}")
-        print(f"[DB DEBUG]   Database: {DB_NAME}")
-        print(f"[DB DEBUG]   User: {DB_USER}")
-        print(f"[DB DEBUG]   Password: {'*' * len(str(DB_PASSWORD))}")
+        with conn.cursor() as c:
+            c.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    """
+    从连接池借出一个可用连接，池满时阻塞等待
+    
+    Returns:
+        tuple: (连接池, 连接)，归还时使用借出时的连接池（期间可能已调用 close_pool）
+    
+    Raises:
+        psycopg2.OperationalError: 丢弃失效连接后新建的连接仍不可用
+    """
+    pool = _get_pool()
+    conn = pool.checkout(POOL_CHECKOUT_TIMEOUT)
+    try:
+        # 连接已断开（服务端超时 / 网络中断）时丢弃后换一个（名额不变）；换来的可能是同样失效的空闲连接，
+        # 也要检查。空闲连接最多 minconn 个，都丢弃后 getconn 只会新建连接
+        replacements = pool.minconn + 1
+        while not _is_healthy(conn):
+            if replacements == 0:
+                raise psycopg2.OperationalError("数据库连接不可用：丢弃失效连接后新建的连接仍无法使用")
+            replacements -= 1
+            print("[DB DEBUG] 连接已失效，重新连接")
+            pool.putconn(conn, close=True)
+            conn = None
+            conn = pool.getconn()
+        return pool, conn
+    except Exception:
+        pool.release(conn, close=True)
         raise
 
+
+def _release(pool, conn, broken=False):
+    """归还连接，断开的连接直接关闭"""
+    if broken or conn.closed:
+        pool.release(conn, close=True)
+    else:
+        # 未提交的事务由连接池回滚
+        conn.last_used = time.monotonic()
+        pool.release(conn)
+
+
+@contextmanager
+def get_connection():
+    """
+    从连接池借出数据库连接，退出时自动归还
+    
+    使用示例:
+        with get_connection() as conn:
+            with conn.cursor() as c:
+                c.execute(...)
+    """
+    pool, conn = _checkout()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        _release(pool, conn, broken)
+
+
+def get_pool_status():
+    """
+    获取连接池状态（用于调试）
+    
+    Returns:
+        dict: 最大连接数、保留的空闲连接数上限、借出中的连接数
+    """
+    pool = _pool
+    return {
+        'max_connections': POOL_MAX_CONNECTIONS,
+        'retained_idle_connections': POOL_MIN_CONNECTIONS,
+        'in_use_connections': 0 if pool is None else pool.in_use()
+    }
+
+
+def close_pool():
+    """关闭连接池（应用退出时调用），借出中的连接也会被关闭；之后的 get_connection 会新建连接池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
 def init_db():
     """初始化数据库连接（创建表结构）"""
     print("数据库已就绪")
@@ -158,62 +342,130 @@ def update_admin_password(current_password, new_password):
     except Exception as e:
         return False, f"修改失败: {str(e)}"
 
+# 昵称 -> 用户ID 的进程内缓存（Streamlit 每次重跑都会调用 get_or_create_user）
+USER_CACHE_SIZE = int(os.getenv('CYBERTCM_USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.getenv('CYBERTCM_USER_CACHE_TTL', '300'))
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# 一次往返完成查找或创建（依赖 users.nickname 唯一索引）：
+# 新昵称由 INSERT 返回 id，已存在的昵称由后半段 SELECT 返回
+_UPSERT_USER = '''
+    WITH inserted AS (
+        INSERT INTO users (nickname) VALUES (%(nickname)s)
+        ON CONFLICT (nickname) DO NOTHING
+        RETURNING id
+    )
+    SELECT id FROM inserted
+    UNION ALL
+    SELECT id FROM users WHERE nickname = %(nickname)s
+    LIMIT 1
+'''
+
 def get_or_create_user(nickname):
-    """获取用户，如果不存在则创建"""
+    """获取用户，如果不存在则创建（先查进程内缓存）"""
+    user_id = _user_cache.get(nickname)
+    if user_id is not None:
+        return user_id
+    
     with get_connection() as conn:
         with conn.cursor() as c:
-            c.execute('SELECT id FROM users WHERE nickname = %s', (nickname,))
-            user = c.fetchone()
-            if user:
-                return user[0]
-            else:
-                c.execute('INSERT INTO users (nickname) VALUES (%s) RETURNING id', (nickname,))
-                user_id = c.fetchone()[0]
+            # 另一个事务正在插入同一昵称时，本语句的快照看不到它提交的行，重试一次即可
+            for _ in range(2):
+                c.execute(_UPSERT_USER, {'nickname': nickname})
+                row = c.fetchone()
                 conn.commit()
-                return user_id
+                if row:
+                    break
+    
+    user_id = row[0]
+    _user_cache.set(nickname, user_id)
+    return user_id
+
+def get_user_cache_stats():
+    """用户缓存的命中统计"""
+    return _user_cache.stats()
 
-def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers):
-    """保存完整的问卷数据"""
+_INSERT_COMPLETE_QUESTIONNAIRES = '''
+    INSERT INTO complete_questionnaires (
+        user_id,
+        bagang_type_code, bagang_type_name, bagang_radar_data, bagang_energy_data, bagang_answers,
+        wjw_main_constitution, wjw_main_score, wjw_main_result, wjw_all_results, wjw_scores, wjw_answers,
+        raw_answers, {}, created_at
+    ) VALUES %s
+'''.format(', '.join(columnar.COLUMNS))
+
+# created_at 为空时使用当前时间；没有时区的时间按 UTC 解释（与 SQLite 的 CURRENT_TIMESTAMP 一致）
+_COMPLETE_QUESTIONNAIRE_TEMPLATE = '({}, COALESCE((%s::timestamp AT TIME ZONE \'UTC\'), NOW()))'.format(
+    ', '.join(['%s'] * (13 + len(columnar.COLUMNS)))
+)
+
+
+def _complete_questionnaire_params(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                   created_at=None):
+    """把计算结果转换为 complete_questionnaires 的插入参数"""
+    return (
+        user_id,
+        part1_result['user_info']['type_code'],
+        part1_result['user_info']['type_name'],
+        json.dumps(part1_result['radar_chart']),
+        json.dumps(part1_result['energy_bars']),
+        None,  # 答案只保存在 answer_codes 中
+        part2_result['main_constitution'],
+        part2_result['main_score'],
+        part2_result['main_result'],
+        json.dumps(part2_result['constitution_results']),
+        json.dumps(part2_result['constitution_scores']),
+        None,
+        None,
+        *columnar.column_values(
+            part1_result['radar_chart'],
+            part2_result['constitution_scores'],
+            columnar.merge_answers(raw_answers, part1_answers, part2_answers)
+        ),
+        created_at
+    )
+
+
+def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                created_at=None):
+    """保存完整的问卷数据（created_at: UTC 提交时间，默认为当前时间）"""
+    save_complete_questionnaires([{
+        'user_id': user_id,
+        'part1_result': part1_result,
+        'part2_result': part2_result,
+        'part1_answers': part1_answers,
+        'part2_answers': part2_answers,
+        'raw_answers': raw_answers,
+        'created_at': created_at
+    }])
+
+
+def save_complete_questionnaires(records):
+    """在一个事务内保存多份完整问卷（一次往返的多行 INSERT）"""
     with get_connection() as conn:
         with conn.cursor() as c:
-            c.execute('''
-                INSERT INTO complete_questionnaires (
-                    user_id, 
-                    bagang_type_code, bagang_type_name, bagang_radar_data, bagang_energy_data, bagang_answers,
-                    wjw_main_constitution, wjw_main_score, wjw_main_result, wjw_all_results, wjw_scores, wjw_answers,
-                    raw_answers
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                user_id,
-                part1_result['user_info']['type_code'],
-                part1_result['user_info']['type_name'],
-                json.dumps(part1_result['radar_chart']),
-                json.dumps(part1_result['energy_bars']),
-                json.dumps(part1_answers),
-                part2_result['main_constitution'],
-                part2_result['main_score'],
-                part2_result['main_result'],
-                json.dumps(part2_result['constitution_results']),
-                json.dumps(part2_result['constitution_scores']),
-                json.dumps(part2_answers),
-                json.dumps(raw_answers)
-            ))
+            execute_values(c, _INSERT_COMPLETE_QUESTIONNAIRES, [
+                _complete_questionnaire_params(**record) for record in records
+            ], template=_COMPLETE_QUESTIONNAIRE_TEMPLATE)
             conn.commit()
 
 def get_statistics():
-    """获取数据统计信息"""
+    """获取数据统计信息（读取触发器维护的统计表，与数据量无关）"""
     with get_connection() as conn:
         with conn.cursor() as c:
-            c.execute('SELECT COUNT(*) FROM users')
-            total_users = c.fetchone()[0]
-            
-            c.execute('SELECT COUNT(*) FROM complete_questionnaires')
-            total_questionnaires = c.fetchone()[0]
+            try:
+                c.execute('SELECT name, value FROM stats_counters')
+            except psycopg2.errors.UndefinedTable:
+                # 还没有执行 SUPABASE_CREATE_TABLES.sql 中的统计表部分
+                print("统计表不存在，回退到全表统计（请执行 SUPABASE_CREATE_TABLES.sql）")
+                conn.rollback()
+                return _get_statistics_by_scan(c)
+            counters = dict(c.fetchall())
             
             c.execute('''
-                SELECT bagang_type_code, bagang_type_name, COUNT(*) as count
-                FROM complete_questionnaires
-                GROUP BY bagang_type_code, bagang_type_name
+                SELECT NULLIF(type_code, ''), type_name, count
+                FROM stats_type_counts
+                WHERE count > 0
                 ORDER BY count DESC
             ''')
             
@@ -225,150 +477,316 @@ def get_statistics():
                     'count': row[2]
                 })
             
-            today = datetime.now().strftime('%Y-%m-%d')
-            c.execute('''
-                SELECT COUNT(*) FROM complete_questionnaires
-                WHERE DATE(created_at) = %s
-            ''', (today,))
-            today_count = c.fetchone()[0]
+            # 统计表按数据库时区记录日期
+            c.execute('SELECT count FROM stats_daily_counts WHERE day = CURRENT_DATE')
+            row = c.fetchone()
             
             return {
-                'total_users': total_users,
-                'total_questionnaires': total_questionnaires,
-                'today_count': today_count,
+                'total_users': counters.get('users', 0),
+                'total_questionnaires': counters.get('questionnaires', 0),
+                'today_count': row[0] if row else 0,
                 'type_distribution': type_distribution
             }
 
+def _get_statistics_by_scan(c):
+    """直接扫描问卷表统计（统计表不存在时使用）"""
+    c.execute('SELECT COUNT(*) FROM users')
+    total_users = c.fetchone()[0]
+    
+    c.execute('SELECT COUNT(*) FROM complete_questionnaires')
+    total_questionnaires = c.fetchone()[0]
+    
+    c.execute('''
+        SELECT bagang_type_code, bagang_type_name, COUNT(*) as count
+        FROM complete_questionnaires
+        GROUP BY bagang_type_code, bagang_type_name
+        ORDER BY count DESC
+    ''')
+    
+    type_distribution = []
+    for row in c.fetchall():
+        type_distribution.append({
+            'type_code': row[0],
+            'type_name': row[1],
+            'count': row[2]
+        })
+    
+    # 今天的半开区间，走 created_at 索引；与统计表一样按数据库时区取今天
+    c.execute('''
+        SELECT COUNT(*) FROM complete_questionnaires
+        WHERE created_at >= CURRENT_DATE AND created_at < CURRENT_DATE + 1
+    ''')
+    today_count = c.fetchone()[0]
+    
+    return {
+        'total_users': total_users,
+        'total_questionnaires': total_questionnaires,
+        'today_count': today_count,
+        'type_distribution': type_distribution
+    }
+
+def rebuild_statistics():
+    """按现有数据重建统计表"""
+    with get_connection() as conn:
+        with conn.cursor() as c:
+            c.execute('SELECT rebuild_statistics()')
+            conn.commit()
+
+# 各雷达维度 / 卫健委体质得分的平均值（直接对数值列聚合）
+_SCORE_AVERAGES_QUERY = 'SELECT COUNT({}), {} FROM complete_questionnaires'.format(
+    columnar.ANSWER_CODES_COLUMN, ', '.join(f'AVG({col})' for col in columnar.SCORE_COLUMNS)
+)
+
+def get_score_averages():
+    """获取各雷达维度和卫健委体质得分的平均值"""
+    with get_connection() as conn:
+        with conn.cursor() as c:
+            c.execute(_SCORE_AVERAGES_QUERY)
+            row = c.fetchone()
+            return columnar.score_averages(row[0], row[1:])
+
+# 回填列式存储时每批处理的行数
+BACKFILL_CHUNK_SIZE = 1000
+
+def backfill_columnar_storage(progress_callback=None):
+    """
+    从 JSON 文本列回填列式存储（执行 SUPABASE_CREATE_TABLES.sql 新增列之后运行一次）
+    
+    只处理 answer_codes 为空的行，每批一个事务，中断后重新运行会从剩余的行继续；
+    JSON 无法解析的行对应列保持 NULL。
+    
+    Returns:
+        int: 处理的行数
+    """
+    # JSON 答案列原样保留，确认编码无损后可用 clear_legacy_answer_json 手动清理
+    update = '''
+        UPDATE complete_questionnaires AS q SET {}
+        FROM (VALUES %s) AS v (id, {})
+        WHERE q.id = v.id
+    '''.format(
+        ', '.join(f'{col} = v.{col}' for col in columnar.COLUMNS),
+        ', '.join(columnar.COLUMNS)
+    )
+    template = '(%s, {})'.format(', '.join(
+        ['%s::double precision'] * len(columnar.RADAR_COLUMNS) + ['%s::integer'] * len(columnar.WJW_SCORE_COLUMNS) + ['%s::bytea']
+    ))
+    
+    processed = 0
+    last_id = 0
+    with get_connection() as conn:
+        with conn.cursor() as c:
+            while True:
+                c.execute('''
+                    SELECT id, bagang_radar_data, wjw_scores, raw_answers, bagang_answers, wjw_answers
+                    FROM complete_questionnaires
+                    WHERE id > %s AND answer_codes IS NULL
+                    ORDER BY id
+                    LIMIT %s
+                ''', (last_id, BACKFILL_CHUNK_SIZE))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                execute_values(c, update, [
+                    (row[0], *columnar.column_values_from_json(*row[1:])) for row in rows
+                ], template=template)
+                conn.commit()
+                
+                last_id = rows[-1][0]
+                processed += len(rows)
+                if progress_callback:
+                    progress_callback(processed)
+    return processed
+
+def clear_legacy_answer_json(dry_run=False, progress_callback=None):
+    """
+    清空旧问卷的 JSON 答案列，答案只保留压缩编码（在 backfill_columnar_storage 之后手动运行）
+
+    只清理编码能完整还原 JSON 内容的行（见 columnar.codes_preserve_json），
+    其他行保留原 JSON。清空后无法恢复，请先备份数据库。
+
+    Returns:
+        dict: checked, cleared（已清空 / 可清空的行数）, kept
+    """
+    result = {'checked': 0, 'cleared': 0, 'kept': 0}
+    last_id = 0
+    with get_connection() as conn:
+        with conn.cursor() as c:
+            while True:
+                c.execute('''
+                    SELECT id, answer_codes, raw_answers, bagang_answers, wjw_answers
+                    FROM complete_questionnaires
+                    WHERE id > %s AND answer_codes IS NOT NULL
+                      AND (bagang_answers IS NOT NULL OR wjw_answers IS NOT NULL OR raw_answers IS NOT NULL)
+                    ORDER BY id
+                    LIMIT %s
+                ''', (last_id, BACKFILL_CHUNK_SIZE))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                clear = [row[0] for row in rows if columnar.codes_preserve_json(*row[1:])]
+                if clear and not dry_run:
+                    c.execute('''
+                        UPDATE complete_questionnaires
+                        SET bagang_answers = NULL, wjw_answers = NULL, raw_answers = NULL
+                        WHERE id = ANY(%s)
+                    ''', (clear,))
+                    conn.commit()
+                last_id = rows[-1][0]
+                result['checked'] += len(rows)
+                result['cleared'] += len(clear)
+                result['kept'] += len(rows) - len(clear)
+                if progress_callback:
+                    progress_callback(result['checked'])
+    return result
+
 def search_questionnaires(nickname=None, type_code=None, start_date=None, end_date=None):
-    """搜索问卷数据"""
+    """搜索问卷数据（返回全部匹配结果，分页显示请使用 get_questionnaires_page）"""
+    where, params = _questionnaire_filters(nickname, type_code, start_date, end_date)
     with get_connection() as conn:
         with conn.cursor() as c:
-            query = '''
-                SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
-                FROM complete_questionnaires q
-                JOIN users u ON q.user_id = u.id
-                WHERE 1=1
-            '''
-            params = []
-            
-            if nickname:
-                query += ' AND u.nickname LIKE %s'
-                params.append(f'%{nickname}%')
-            
-            if type_code:
-                query += ' AND q.bagang_type_code = %s'
-                params.append(type_code)
-            
-            if start_date:
-                query += ' AND DATE(q.created_at) >= %s'
-                params.append(start_date)
-            
-            if end_date:
-                query += ' AND DATE(q.created_at) <= %s'
-                params.append(end_date)
-            
-            query += ' ORDER BY q.created_at DESC'
-            
-            c.execute(query, params)
+            c.execute(_QUESTIONNAIRE_LIST_QUERY + where + ' ORDER BY q.created_at DESC, q.id DESC', params)
+            return [_questionnaire_summary(row) for row in c.fetchall()]
+
+# 问卷列表查询（后面拼接 WHERE / ORDER BY）
+_QUESTIONNAIRE_FROM = '''
+    FROM complete_questionnaires q
+    JOIN users u ON q.user_id = u.id
+'''
+_QUESTIONNAIRE_LIST_QUERY = '''
+    SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
+''' + _QUESTIONNAIRE_FROM
+
+def _questionnaire_summary(row):
+    return {
+        'id': row[0],
+        'nickname': row[1],
+        'type_code': row[2],
+        'type_name': row[3],
+        'created_at': row[4]
+    }
+
+def _questionnaire_filters(nickname=None, type_code=None, start_date=None, end_date=None):
+    """生成问卷筛选条件，返回 (WHERE 子句, 参数列表)"""
+    conditions = []
+    params = []
+    
+    if nickname:
+        # pg_trgm GIN 索引（idx_users_nickname_trgm）支持前后都带 % 的 LIKE
+        conditions.append("u.nickname LIKE %s ESCAPE '\\'")
+        params.append(pagination.like_pattern(nickname))
+    
+    if type_code:
+        conditions.append('q.bagang_type_code = %s')
+        params.append(type_code)
+    
+    # 按天筛选转换为半开区间，走 created_at 索引
+    start, end = pagination.date_range_bounds(start_date, end_date)
+    if start:
+        conditions.append('q.created_at >= %s::timestamptz')
+        params.append(start)
+    
+    if end:
+        conditions.append('q.created_at < %s::timestamptz')
+        params.append(end)
+    
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    return where, params
+
+def get_questionnaires_page(page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None,
+                            nickname=None, type_code=None, start_date=None, end_date=None):
+    """按提交时间倒序分页获取问卷（游标分页），返回值见 database.get_questionnaires_page"""
+    page_size = pagination.clamp_page_size(page_size)
+    where, params = _questionnaire_filters(nickname, type_code, start_date, end_date)
+    
+    with get_connection() as conn:
+        with conn.cursor() as c:
+            total = None
+            total_is_estimate = False
+            if cursor is None:
+                total, total_is_estimate = _count_questionnaires(conn, c, where, params)
             
-            questionnaires = []
-            for row in c.fetchall():
-                questionnaires.append({
-                    'id': row[0],
-                    'nickname': row[1],
-                    'type_code': row[2],
-                    'type_name': row[3],
-                    'created_at': row[4]
-                })
+            page_where, page_params = where, list(params)
+            if cursor is not None:
+                created_at, questionnaire_id = pagination.decode_cursor(cursor)
+                page_where += (' AND ' if page_where else ' WHERE ') + '(q.created_at, q.id) < (%s::timestamptz, %s)'
+                page_params += [created_at, questionnaire_id]
             
-            return questionnaires
+            c.execute(
+                _QUESTIONNAIRE_LIST_QUERY + page_where + ' ORDER BY q.created_at DESC, q.id DESC LIMIT %s',
+                page_params + [page_size + 1]
+            )
+            rows = [_questionnaire_summary(row) for row in c.fetchall()]
+    
+    return pagination.make_page(rows, page_size, total, total_is_estimate)
 
-def export_to_excel(filename='cybertcm_export.xlsx'):
+def _count_questionnaires(conn, c, where, params):
+    """统计符合条件的问卷数：无筛选时读统计表，有筛选时最多数到 COUNT_LIMIT，返回 (总数, 是否为估计值)"""
+    if not where:
+        try:
+            c.execute("SELECT value FROM stats_counters WHERE name = 'questionnaires'")
+            row = c.fetchone()
+            return (row[0] if row else 0), False
+        except psycopg2.errors.UndefinedTable:
+            conn.rollback()
+    
+    c.execute(
+        f'SELECT COUNT(*) FROM (SELECT 1 {_QUESTIONNAIRE_FROM} {where} LIMIT %s) AS matched',
+        params + [pagination.COUNT_LIMIT + 1]
+    )
+    count = c.fetchone()[0]
+    if count > pagination.COUNT_LIMIT:
+        return pagination.COUNT_LIMIT, True
+    return count, False
+
+# 完整问卷导出查询，列顺序与 exporter.EXPORT_SOURCE_COLUMNS 一致
+_EXPORT_QUERY = '''
+    SELECT {}
+    FROM complete_questionnaires c
+    JOIN users u ON c.user_id = u.id
+    ORDER BY c.created_at DESC, c.id DESC
+'''.format(', '.join(
+    ['u.nickname' if col == 'nickname' else f'c.{col}' for col in exporter.EXPORT_SOURCE_COLUMNS] +
+    # 尚未回填列式存储的行附带 JSON 文本列，由导出时临时计算；已回填的行只多传几个 NULL
+    [f'CASE WHEN c.answer_codes IS NULL THEN c.{col} END' for col in exporter.EXPORT_LEGACY_COLUMNS]
+))
+
+# 导出时服务端游标每次取回的行数
+EXPORT_CHUNK_SIZE = 1000
+
+def export_questionnaires(filename, progress_callback=None):
+    """流式导出完整问卷数据，格式由扩展名决定（.csv 或 .xlsx），没有数据时不保留文件，返回 None"""
+    with get_connection() as conn:
+        # 命名游标在服务端执行查询，每次只取回 itersize 行
+        with conn.cursor(name='cybertcm_export') as c:
+            c.itersize = EXPORT_CHUNK_SIZE
+            c.execute(_EXPORT_QUERY)
+            count = exporter.write_export(filename, c, progress_callback)
+        conn.rollback()
+    
+    return exporter.discard_empty_export(filename, count)
+
+def export_to_csv(filename='cybertcm_export.csv', progress_callback=None):
+    """导出数据到CSV（列与 Excel 导出一致）"""
+    return export_questionnaires(filename, progress_callback)
+
+def export_to_excel(filename='cybertcm_export.xlsx', progress_callback=None):
     """导出数据到Excel"""
     try:
-        import pandas as pd
-        
-        with get_connection() as conn:
-            df = pd.read_sql_query('''
-                SELECT 
-                    c.id, u.nickname, 
-                    c.bagang_type_code, c.bagang_type_name, c.bagang_radar_data, c.bagang_energy_data,
-                    c.wjw_main_constitution, c.wjw_main_score, c.wjw_main_result, c.wjw_all_results, c.wjw_scores,
-                    c.raw_answers,
-                    c.created_at
-                FROM complete_questionnaires c
-                JOIN users u ON c.user_id = u.id
-                ORDER BY c.created_at DESC
-            ''', conn)
-            
-            if len(df) == 0:
-                return None
-            
-            def parse_radar(radar_json):
-                try:
-                    radar = json.loads(radar_json) if radar_json else {}
-                    return ', '.join([f"{k}:{v}" for k, v in radar.items()])
-                except:
-                    return radar_json
-            
-            def parse_wjw_results(wjw_json):
-                try:
-                    results = json.loads(wjw_json) if wjw_json else {}
-                    return ', '.join([f"{k}({v['score']}分-{v['result']})" for k, v in results.items()])
-                except:
-                    return wjw_json
-            
-            df['八纲雷达数据'] = df['bagang_radar_data'].apply(parse_radar)
-            df['八纲能量数据'] = df['bagang_energy_data'].apply(parse_radar)
-            df['卫健委各体质结果'] = df['wjw_all_results'].apply(parse_wjw_results)
-            
-            df = df.rename(columns={
-                'id': 'ID',
-                'nickname': '用户昵称',
-                'bagang_type_code': '八纲体质代码',
-                'bagang_type_name': '八纲体质名称',
-                'wjw_main_constitution': '卫健委主要体质',
-                'wjw_main_score': '卫健委主要体质得分',
-                'wjw_main_result': '卫健委主要体质判定',
-                'created_at': '提交时间'
-            })
-            
-            columns = ['ID', '用户昵称', '八纲体质代码', '八纲体质名称', '八纲雷达数据', '八纲能量数据',
-                       '卫健委主要体质', '卫健委主要体质得分', '卫健委主要体质判定', '卫健委各体质结果', '提交时间']
-            
-            existing_columns = [c for c in columns if c in df.columns]
-            df = df[existing_columns]
-            
-            df.to_excel(filename, index=False, engine='openpyxl')
-            return filename
+        return export_questionnaires(filename, progress_callback)
     except ImportError:
-        print("请先安装pandas和openpyxl: pip install pandas openpyxl")
+        print("请先安装openpyxl: pip install openpyxl")
         return None
 
 def get_all_questionnaires(limit=None, offset=0):
-    """获取所有问卷数据"""
+    """获取所有问卷数据（翻页请使用 get_questionnaires_page）"""
     with get_connection() as conn:
         with conn.cursor() as c:
-            query = '''
-                SELECT q.id, u.nickname, q.bagang_type_code, q.bagang_type_name, q.created_at
-                FROM complete_questionnaires q
-                JOIN users u ON q.user_id = u.id
-                ORDER BY q.created_at DESC
-            '''
+            query = _QUESTIONNAIRE_LIST_QUERY + ' ORDER BY q.created_at DESC, q.id DESC'
+            params = []
             
             if limit:
-                query += f' LIMIT {limit} OFFSET {offset}'
-            
-            c.execute(query)
+                query += ' LIMIT %s OFFSET %s'
+                params += [int(limit), int(offset)]
             
-            questionnaires = []
-            for row in c.fetchall():
-                questionnaires.append({
-                    'id': row[0],
-                    'nickname': row[1],
-                    'type_code': row[2],
-                    'type_name': row[3],
-                    'created_at': row[4]
-                })
-            
-            return questionnaires
+            c.execute(query, params)
+            return [_questionnaire_summary(row) for row in c.fetchall()]
@@ -1,21 +1,44 @@
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+
+import columnar
+import exporter
+import pagination
+from request_batcher import RequestBatcher
+from ttl_cache import TTLCache
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# 批量写入：每个请求最多插入的问卷数；并发登录的用户查询攒批的条数和等待秒数
+SUPABASE_INSERT_BATCH_SIZE = int(os.getenv('CYBERTCM_SUPABASE_INSERT_BATCH_SIZE', '500'))
+USER_BATCH_SIZE = int(os.getenv('CYBERTCM_USER_BATCH_SIZE', '50'))
+USER_BATCH_WAIT = float(os.getenv('CYBERTCM_USER_BATCH_WAIT', '0.02'))
+# 登录时等待用户查询结果的最长秒数（网络请求卡住时报错，而不是一直等待）
+USER_BATCH_TIMEOUT = float(os.getenv('CYBERTCM_USER_BATCH_TIMEOUT', '60'))
+
 supabase: Client = None
 
+def create_http_client():
+    """所有请求共用的 HTTP/2 连接（一个 TCP/TLS 连接上并发多个请求）"""
+    return httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        follow_redirects=True
+    )
+
 def init_supabase():
     global supabase
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("请在 .env 文件中配置 SUPABASE_URL 和 SUPABASE_KEY")
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(httpx_client=create_http_client()))
 
 def init_db():
     init_supabase()
@@ -51,48 +74,148 @@ def update_admin_password(current_password, new_password):
     except Exception as e:
         return False, f"修改失败: {str(e)}"
 
+# 昵称 -> 用户ID 的进程内缓存（Streamlit 每次重跑都会调用 get_or_create_user）
+USER_CACHE_SIZE = int(os.getenv('CYBERTCM_USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.getenv('CYBERTCM_USER_CACHE_TTL', '300'))
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def _resolve_user_ids(nicknames):
+    """
+    批量查询 / 创建用户：已有用户一次 select，新用户一次数组 upsert
+
+    依赖 users.nickname 唯一索引：并发首次登录时只有一个请求插入成功，
+    插入时被忽略的昵称再查询一次。
+
+    Returns:
+        dict: 昵称 -> 用户ID
+    """
+    user_ids = {}
+    for start in range(0, len(nicknames), USER_BATCH_SIZE):
+        chunk = nicknames[start:start + USER_BATCH_SIZE]
+        response = supabase.table('users').select('id', 'nickname').in_('nickname', chunk).execute()
+        user_ids.update((row['nickname'], row['id']) for row in response.data)
+
+        missing = [nickname for nickname in chunk if nickname not in user_ids]
+        if missing:
+            response = supabase.table('users').upsert(
+                [{'nickname': nickname} for nickname in missing], on_conflict='nickname', ignore_duplicates=True
+            ).execute()
+            user_ids.update((row['nickname'], row['id']) for row in response.data)
+
+        missing = [nickname for nickname in chunk if nickname not in user_ids]
+        if missing:
+            response = supabase.table('users').select('id', 'nickname').in_('nickname', missing).execute()
+            user_ids.update((row['nickname'], row['id']) for row in response.data)
+    return user_ids
+
+# 同时登录的多个会话合并为一次查询（见 request_batcher.py）
+_user_batcher = RequestBatcher(_resolve_user_ids, max_batch=USER_BATCH_SIZE, max_wait=USER_BATCH_WAIT,
+                               timeout=USER_BATCH_TIMEOUT)
+
 def get_or_create_user(nickname):
+    user_id = _user_cache.get(nickname)
+    if user_id is not None:
+        return user_id
     try:
-        response = supabase.table('users').select('id').eq('nickname', nickname).execute()
-        if response.data:
-            return response.data[0]['id']
-        else:
-            response = supabase.table('users').insert({'nickname': nickname}).execute()
-            return response.data[0]['id']
+        user_id = _user_batcher.submit(nickname)
     except Exception as e:
         print(f"获取/创建用户失败: {e}")
         raise
+    _user_cache.set(nickname, user_id)
+    return user_id
+
+def get_user_cache_stats():
+    """用户缓存的命中统计"""
+    return _user_cache.stats()
 
-def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers):
+def _questionnaire_row(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                       created_at=None):
+    """完整问卷 -> PostgREST 插入用的行字典（created_at 为 UTC 时间，默认为当前时间）"""
+    data = {
+        'user_id': user_id,
+        'bagang_type_code': part1_result['user_info']['type_code'],
+        'bagang_type_name': part1_result['user_info']['type_name'],
+        'bagang_radar_data': json.dumps(part1_result['radar_chart']),
+        'bagang_energy_data': json.dumps(part1_result['energy_bars']),
+        'bagang_answers': None,  # 答案只保存在 answer_codes 中
+        'wjw_main_constitution': part2_result['main_constitution'],
+        'wjw_main_score': part2_result['main_score'],
+        'wjw_main_result': part2_result['main_result'],
+        'wjw_all_results': json.dumps(part2_result['constitution_results']),
+        'wjw_scores': json.dumps(part2_result['constitution_scores']),
+        'wjw_answers': None,
+        'raw_answers': None
+    }
+    values = columnar.column_values(
+        part1_result['radar_chart'],
+        part2_result['constitution_scores'],
+        columnar.merge_answers(raw_answers, part1_answers, part2_answers)
+    )
+    data.update(zip(columnar.COLUMNS, values))
+    # bytea 列通过 PostgREST 以十六进制文本写入
+    data[columnar.ANSWER_CODES_COLUMN] = columnar.to_hex(data[columnar.ANSWER_CODES_COLUMN])
+    # 数组 insert 要求每行的键相同，所以总是带上 created_at
+    data['created_at'] = f"{created_at}+00:00" if created_at else datetime.now(timezone.utc).isoformat()
+    return data
+
+def save_complete_questionnaire(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                created_at=None):
     try:
-        data = {
-            'user_id': user_id,
-            'bagang_type_code': part1_result['user_info']['type_code'],
-            'bagang_type_name': part1_result['user_info']['type_name'],
-            'bagang_radar_data': json.dumps(part1_result['radar_chart']),
-            'bagang_energy_data': json.dumps(part1_result['energy_bars']),
-            'bagang_answers': json.dumps(part1_answers),
-            'wjw_main_constitution': part2_result['main_constitution'],
-            'wjw_main_score': part2_result['main_score'],
-            'wjw_main_result': part2_result['main_result'],
-            'wjw_all_results': json.dumps(part2_result['constitution_results']),
-            'wjw_scores': json.dumps(part2_result['constitution_scores']),
-            'wjw_answers': json.dumps(part2_answers),
-            'raw_answers': json.dumps(raw_answers)
-        }
+        data = _questionnaire_row(user_id, part1_result, part2_result, part1_answers, part2_answers, raw_answers,
+                                  created_at)
         supabase.table('complete_questionnaires').insert(data).execute()
     except Exception as e:
         print(f"保存问卷失败: {e}")
         raise
 
+def save_complete_questionnaires(records):
+    """
+    批量保存完整问卷（供后台写入队列使用），每 SUPABASE_INSERT_BATCH_SIZE 份一个数组 insert 请求
+
+    每个请求在数据库中是一条 INSERT 语句（同一事务）；超过一个请求时，
+    失败前已发出的请求不会回滚，由写入队列重试整批时可能重复写入这部分问卷。
+    写入队列每批不超过 SUPABASE_INSERT_BATCH_SIZE 份时只发一个请求。
+
+    Args:
+        records: 记录字典列表，键同 save_complete_questionnaire 的参数
+    """
+    rows = [_questionnaire_row(**record) for record in records]
+    try:
+        for start in range(0, len(rows), SUPABASE_INSERT_BATCH_SIZE):
+            chunk = rows[start:start + SUPABASE_INSERT_BATCH_SIZE]
+            supabase.table('complete_questionnaires').insert(chunk, returning='minimal').execute()
+    except Exception as e:
+        print(f"批量保存问卷失败: {e}")
+        raise
+
 def get_statistics():
+    """
+    调用 get_statistics_summary（见 SUPABASE_CREATE_TABLES.sql），
+    由数据库读取触发器维护的统计表，一次往返只返回汇总结果
+    """
+    try:
+        # 不传 for_day：由数据库按统计触发器所用的时区取"今天"
+        summary = supabase.rpc('get_statistics_summary', {}).execute().data
+        return {
+            'total_users': summary['total_users'],
+            'total_questionnaires': summary['total_questionnaires'],
+            'today_count': summary['today_count'],
+            'type_distribution': summary['type_distribution']
+        }
+    except Exception as e:
+        print(f"调用统计函数失败，回退到直接统计: {e}")
+        return _get_statistics_by_scan()
+
+def _get_statistics_by_scan():
+    """直接统计问卷表（统计函数不存在时使用）；计数只发 HEAD 请求，不下载数据行"""
     try:
-        users_response = supabase.table('users').select('*', count='exact').execute()
-        total_users = users_response.count if hasattr(users_response, 'count') else len(users_response.data)
+        users_response = supabase.table('users').select('id', count='exact', head=True).execute()
+        total_users = users_response.count or 0
         
-        q_response = supabase.table('complete_questionnaires').select('*', count='exact').execute()
-        total_questionnaires = q_response.count if hasattr(q_response, 'count') else len(q_response.data)
+        q_response = supabase.table('complete_questionnaires').select('id', count='exact', head=True).execute()
+        total_questionnaires = q_response.count or 0
         
+        # 类型分布只下载两个类型列
         type_distribution = []
         q_detail = supabase.table('complete_questionnaires').select('bagang_type_code', 'bagang_type_name').execute()
         type_counts = {}
@@ -110,9 +233,11 @@ def get_statistics():
             })
         type_distribution.sort(key=lambda x: x['count'], reverse=True)
         
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_q = supabase.table('complete_questionnaires').select('*', count='exact').gte('created_at', f'{today}T00:00:00').execute()
-        today_count = today_q.count if hasattr(today_q, 'count') else len([q for q in today_q.data if q['created_at'].startswith(today)])
+        # 与统计表一致按 UTC 日期计算今天
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        today_q = supabase.table('complete_questionnaires').select('id', count='exact', head=True) \
+            .gte('created_at', f'{today}T00:00:00+00:00').execute()
+        today_count = today_q.count or 0
         
         return {
             'total_users': total_users,
@@ -129,128 +254,108 @@ def get_statistics():
             'type_distribution': []
         }
 
+def rebuild_statistics():
+    """按现有数据重建统计表"""
+    supabase.rpc('rebuild_statistics').execute()
+
+def _questionnaire_query(nickname=None, type_code=None, start_date=None, end_date=None, count=None):
+    """按筛选条件构造问卷列表查询"""
+    query = supabase.table('complete_questionnaires').select(
+        'id, users!inner(nickname), bagang_type_code, bagang_type_name, created_at', count=count
+    )
+    if nickname:
+        query = query.ilike('users.nickname', pagination.like_pattern(nickname))
+    if type_code:
+        query = query.eq('bagang_type_code', type_code)
+    start, end = pagination.date_range_bounds(start_date, end_date)
+    if start:
+        query = query.gte('created_at', f'{start}T00:00:00')
+    if end:
+        query = query.lt('created_at', f'{end}T00:00:00')
+    return query
+
+def _questionnaire_summary(row):
+    return {
+        'id': row['id'],
+        'nickname': row['users']['nickname'],
+        'type_code': row['bagang_type_code'],
+        'type_name': row['bagang_type_name'],
+        'created_at': row['created_at']
+    }
+
 def search_questionnaires(nickname=None, type_code=None, start_date=None, end_date=None):
     try:
-        query = supabase.table('complete_questionnaires').select(
-            'complete_questionnaires.id, users!inner(nickname), bagang_type_code, bagang_type_name, created_at'
-        ).order('created_at', desc=True)
-        
-        if nickname:
-            query = query.ilike('users.nickname', f'%{nickname}%')
-        if type_code:
-            query = query.eq('bagang_type_code', type_code)
-        if start_date:
-            query = query.gte('created_at', f'{start_date}T00:00:00')
-        if end_date:
-            query = query.lte('created_at', f'{end_date}T23:59:59')
-            
-        response = query.execute()
-        
-        questionnaires = []
-        for row in response.data:
-            questionnaires.append({
-                'id': row['id'],
-                'nickname': row['users']['nickname'],
-                'type_code': row['bagang_type_code'],
-                'type_name': row['bagang_type_name'],
-                'created_at': row['created_at']
-            })
-        return questionnaires
+        response = _questionnaire_query(nickname, type_code, start_date, end_date) \
+            .order('created_at', desc=True).order('id', desc=True).execute()
+        return [_questionnaire_summary(row) for row in response.data]
     except Exception as e:
         print(f"搜索失败: {e}")
         return []
 
-def export_to_excel(filename='cybertcm_export.xlsx'):
+def get_questionnaires_page(page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None,
+                            nickname=None, type_code=None, start_date=None, end_date=None):
+    """按提交时间倒序分页获取问卷（游标分页），返回值见 database.get_questionnaires_page"""
+    page_size = pagination.clamp_page_size(page_size)
+    # 第一页顺带取总数：estimated 在数据量大时使用查询计划的估计值，不做全表计数
+    query = _questionnaire_query(nickname, type_code, start_date, end_date,
+                                 count='estimated' if cursor is None else None)
+    if cursor is not None:
+        created_at, questionnaire_id = pagination.decode_cursor(cursor)
+        query = query.or_(f'created_at.lt."{created_at}",'
+                          f'and(created_at.eq."{created_at}",id.lt.{questionnaire_id})')
+    response = query.order('created_at', desc=True).order('id', desc=True).limit(page_size + 1).execute()
+    
+    rows = [_questionnaire_summary(row) for row in response.data]
+    total = response.count if cursor is None else None
+    return pagination.make_page(rows, page_size, total, total_is_estimate=cursor is None)
+
+# 导出时每次请求的行数（PostgREST 默认单次最多返回 1000 行）
+EXPORT_PAGE_SIZE = 1000
+
+def _attach_legacy_json(rows):
+    """尚未回填列式存储的行（answer_codes 为空）补上 JSON 文本列，由导出时临时计算"""
+    pending = {row['id']: row for row in rows if row.get('answer_codes') is None}
+    if not pending:
+        return
+    legacy = supabase.table('complete_questionnaires').select(
+        'id, ' + ', '.join(exporter.EXPORT_LEGACY_COLUMNS)
+    ).in_('id', list(pending)).execute().data
+    for data in legacy:
+        pending[data.pop('id')].update(data)
+
+def _iter_export_rows(page_size=EXPORT_PAGE_SIZE):
+    """
+    按提交时间倒序分页读取问卷，顺序与 SQLite / PostgreSQL 导出一致（created_at DESC, id DESC）；
+    keyset 分页（与 get_questionnaires_page 的游标条件相同），每次只持有一页数据
+    """
+    columns = ', '.join(c for c in exporter.EXPORT_SOURCE_COLUMNS if c != 'nickname')
+    last = None
+    while True:
+        query = supabase.table('complete_questionnaires').select(f'{columns}, users!inner(nickname)')
+        if last is not None:
+            created_at, questionnaire_id = last
+            query = query.or_(f'created_at.lt."{created_at}",'
+                              f'and(created_at.eq."{created_at}",id.lt.{questionnaire_id})')
+        rows = query.order('created_at', desc=True).order('id', desc=True).limit(page_size).execute().data
+        _attach_legacy_json(rows)
+        for row in rows:
+            row['nickname'] = (row.pop('users') or {}).get('nickname')
+            yield row
+        if len(rows) < page_size:
+            return
+        last = (rows[-1]['created_at'], rows[-1]['id'])
+
+def export_questionnaires(filename, progress_callback=None):
+    """流式导出完整问卷数据，格式由扩展名决定（.csv 或 .xlsx），没有数据时不保留文件，返回 None"""
+    count = exporter.write_export(filename, _iter_export_rows(), progress_callback)
+    return exporter.discard_empty_export(filename, count)
+
+def export_to_csv(filename='cybertcm_export.csv', progress_callback=None):
+    return export_questionnaires(filename, progress_callback)
+
+def export_to_excel(filename='cybertcm_export.xlsx', progress_callback=None):
     try:
-        import pandas as pd
-        import json
-        
-        response = supabase.table('complete_questionnaires').select(
-            'complete_questionnaires.*, users!inner(nickname)'
-        ).order('created_at', desc=True).execute()
-        
-        if not response.data:
-            return None
-            
-        df = pd.DataFrame(response.data)
-        df['nickname'] = df['users'].apply(lambda x: x['nickname'])
-        
-        def parse_radar(radar_json):
-            try:
-                radar = json.loads(radar_json) if radar_json else {}
-                return ', '.join([f"{k}:{v}" for k, v in radar.items()])
-            except:
-                return radar_json
-                
-        def parse_wjw_results(wjw_json):
-            try:
-                results = json.loads(wjw_json) if wjw_json else {}
-                return ', '.join([f"{k}({v['score']}分-{v['result']})" for k, v in results.items()])
-            except:
-                return wjw_json
-                
-        def parse_wjw_scores(scores_json):
-            try:
-                scores = json.loads(scores_json) if scores_json else {}
-                return scores
-            except:
-                return {}
-                
-        def parse_raw_answers(raw_json):
-            try:
-                answers = json.loads(raw_json) if raw_json else {}
-                q_items = []
-                w_items = []
-                for key, value in answers.items():
-                    if key.startswith('q_'):
-                        q_num = int(key.replace('q_', ''))
-                        q_items.append((q_num, f"Q{q_num}:{value}"))
-                    elif key.startswith('wjw_q_'):
-                        q_num = int(key.replace('wjw_q_', ''))
-                        w_items.append((q_num, f"W{q_num}:{value}"))
-                q_items.sort(key=lambda x: x[0])
-                w_items.sort(key=lambda x: x[0])
-                formatted = [item[1] for item in q_items] + [item[1] for item in w_items]
-                return '; '.join(formatted)
-            except:
-                return raw_json
-        
-        df['八纲雷达数据'] = df['bagang_radar_data'].apply(parse_radar)
-        df['八纲能量数据'] = df['bagang_energy_data'].apply(parse_radar)
-        df['卫健委各体质结果'] = df['wjw_all_results'].apply(parse_wjw_results)
-        
-        if 'raw_answers' in df.columns:
-            df['原始答案'] = df['raw_answers'].apply(parse_raw_answers)
-            
-        wjw_scores_df = df['wjw_scores'].apply(parse_wjw_scores).apply(pd.Series)
-        
-        df = df.rename(columns={
-            'id': 'ID',
-            'nickname': '用户昵称',
-            'bagang_type_code': '八纲体质代码',
-            'bagang_type_name': '八纲体质名称',
-            'wjw_main_constitution': '卫健委主要体质',
-            'wjw_main_score': '卫健委主要体质得分',
-            'wjw_main_result': '卫健委主要体质判定',
-            'created_at': '提交时间'
-        })
-        
-        df = pd.concat([df, wjw_scores_df], axis=1)
-        
-        columns = ['ID', '用户昵称', '八纲体质代码', '八纲体质名称', '八纲雷达数据', '八纲能量数据',
-                   '卫健委主要体质', '卫健委主要体质得分', '卫健委主要体质判定']
-                   
-        constitution_types = ['气虚质', '阳虚质', '阴虚质', '痰湿质', '湿热质', '血瘀质', '气郁质', '特禀质', '平和质']
-        for ctype in constitution_types:
-            if ctype in df.columns:
-                columns.append(ctype)
-                
-        columns.extend(['卫健委各体质结果', '原始答案', '提交时间'])
-        existing_columns = [c for c in columns if c in df.columns]
-        df = df[existing_columns]
-        
-        df.to_excel(filename, index=False, engine='openpyxl')
-        return filename
+        return export_questionnaires(filename, progress_callback)
     except ImportError:
-        print("请先安装pandas和openpyxl: pip install pandas openpyxl")
+        print("请先安装openpyxl: pip install openpyxl")
         return None
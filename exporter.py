@@ -0,0 +1,346 @@
+"""
+问卷数据流式导出（三个数据库后端共用）
+
+各后端只负责按块读出数据库行，这里逐块整理成导出行并追加写入文件：
+- .xlsx 使用 openpyxl 的 write_only 模式，行数据直接写入临时文件
+- .csv 使用 csv.writer 逐行写入
+内存占用只和每块行数有关，与表的总行数无关。
+导出只读列式存储的数值列和答案编码（见 columnar.py），不解析 JSON 文本。
+"""
+
+import csv
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+import columnar
+import logic
+
+# 导出时从数据库读取的列（按此顺序）
+EXPORT_SOURCE_COLUMNS = [
+    'id', 'nickname', 'bagang_type_code', 'bagang_type_name',
+    *columnar.RADAR_COLUMNS,
+    'wjw_main_constitution', 'wjw_main_score', 'wjw_main_result',
+    *columnar.WJW_SCORE_COLUMNS,
+    columnar.ANSWER_CODES_COLUMN, 'created_at'
+]
+
+# 旧版 JSON 文本列（顺序同 columnar.column_values_from_json 的参数）：PostgreSQL / Supabase 的旧问卷
+# 可能还没有回填列式存储，导出查询在列式数据为空时附带这些列，放在 EXPORT_SOURCE_COLUMNS 之后
+EXPORT_LEGACY_COLUMNS = ['bagang_radar_data', 'wjw_scores', 'raw_answers', 'bagang_answers', 'wjw_answers']
+
+_COLUMNAR_POSITIONS = [EXPORT_SOURCE_COLUMNS.index(column) for column in columnar.COLUMNS]
+
+# 卫健委9种体质，导出为单独的分数列
+CONSTITUTION_TYPES = logic.WJW_CONSTITUTIONS
+
+# 导出文件表头
+EXPORT_HEADERS = [
+    'ID', '用户昵称', '八纲体质代码', '八纲体质名称', '八纲雷达数据', '八纲能量数据',
+    '卫健委主要体质', '卫健委主要体质得分', '卫健委主要体质判定',
+    *CONSTITUTION_TYPES,
+    '卫健委各体质结果', '原始答案', '提交时间'
+]
+
+# 每隔多少行回调一次进度
+PROGRESS_INTERVAL = 1000
+
+# 每次批量判定卫健委体质的行数
+JUDGE_CHUNK_SIZE = 1000
+
+# Excel 单元格不允许的控制字符
+_ILLEGAL_CHARACTERS = re.compile(r'[\000-\010\013\014\016-\037]')
+
+_N_RADAR = len(columnar.RADAR_COLUMNS)
+_N_WJW = len(columnar.WJW_SCORE_COLUMNS)
+
+
+def format_radar(radar):
+    """雷达数据：维度:分数, ..."""
+    if radar is None:
+        return ''
+    return ', '.join([f"{dim}:{radar[dim]}" for dim in logic.DIMENSIONS])
+
+
+def format_energy(radar):
+    """能量数据（由雷达数据计算）：标签:值, ..."""
+    if radar is None:
+        return ''
+    return ', '.join([f"{bar['label']}:{bar['val']}" for bar in logic.energy_bars(radar)])
+
+
+def format_wjw_results(scores, results):
+    """卫健委各体质结果：体质(分数分-判定), ..."""
+    if scores is None:
+        return ''
+    return ', '.join([
+        f"{ctype}({score}分-{result})" for ctype, score, result in zip(CONSTITUTION_TYPES, scores, results)
+    ])
+
+
+def format_answers(scores):
+    """原始答案（由答案编码解出的分数行）：先八纲 Q1..Q28，再卫健委 W1..W33"""
+    if scores is None:
+        return ''
+    items = []
+    for key, score in zip(logic.ANSWER_KEYS, scores):
+        if score:
+            label = f"Q{key[len('q_'):]}" if key.startswith('q_') else f"W{key[len('wjw_q_'):]}"
+            items.append(f"{label}:{logic.ANSWER_OPTIONS[5 - score]}")
+    return '; '.join(items)
+
+
+def _row_values(row):
+    """
+    按 EXPORT_SOURCE_COLUMNS 取出一行的值；行中带有 EXPORT_LEGACY_COLUMNS 时，
+    为空的列式数据由 JSON 文本列临时计算（尚未回填列式存储的旧问卷）
+    """
+    if isinstance(row, dict):
+        values = [row.get(column) for column in EXPORT_SOURCE_COLUMNS]
+        legacy = [row.get(column) for column in EXPORT_LEGACY_COLUMNS]
+    else:
+        values = list(row[:len(EXPORT_SOURCE_COLUMNS)])
+        legacy = row[len(EXPORT_SOURCE_COLUMNS):]
+    if any(value is not None for value in legacy):
+        for position, value in zip(_COLUMNAR_POSITIONS, columnar.column_values_from_json(*legacy)):
+            if values[position] is None:
+                values[position] = value
+    return values
+
+
+def export_row(row, wjw_results=None, answer_scores=None):
+    """
+    把一行数据库数据转换为导出行
+
+    Args:
+        row: 按 EXPORT_SOURCE_COLUMNS 顺序的元组（可在后面附带 EXPORT_LEGACY_COLUMNS），
+             或以列名为键的字典
+        wjw_results: 9种体质的判定结果
+        answer_scores: 由答案编码解出的 61 个分数
+                       （批量导出时这两项由 export_rows 按块计算，单行调用时省略即可）
+
+    Returns:
+        list: 与 EXPORT_HEADERS 对应的值
+    """
+    values = _row_values(row)
+    qid, nickname, type_code, type_name = values[:4]
+    radar_values = values[4:4 + _N_RADAR]
+    main_constitution, main_score, main_result = values[4 + _N_RADAR:7 + _N_RADAR]
+    scores = values[7 + _N_RADAR:7 + _N_RADAR + _N_WJW]
+    answer_codes, created_at = values[-2:]
+
+    radar = None if None in radar_values else dict(zip(logic.DIMENSIONS, radar_values))
+    if None in scores:
+        scores = None
+    elif wjw_results is None:
+        wjw_results = logic.judge_wjw_scores(np.array([scores]))[0]
+    if answer_scores is None:
+        answer_scores = _decode_answers([answer_codes])[0]
+
+    return [
+        qid, nickname, type_code, type_name, format_radar(radar), format_energy(radar),
+        main_constitution, main_score, main_result,
+        *(scores or [None] * _N_WJW),
+        format_wjw_results(scores, wjw_results), format_answers(answer_scores), created_at
+    ]
+
+
+def _decode_answers(codes):
+    """批量解码答案编码，缺失或长度不对的为 None"""
+    blobs = [columnar.to_bytes(value) for value in codes]
+    valid = [i for i, blob in enumerate(blobs)
+             if blob is not None and len(blob) in (logic.PACKED_ANSWERS_SIZE, len(logic.ANSWER_KEYS))]
+    decoded = [None] * len(blobs)
+    if valid:
+        for i, scores in zip(valid, logic.answer_codes_to_matrix([blobs[i] for i in valid])):
+            decoded[i] = scores
+    return decoded
+
+
+def export_rows(source_rows):
+    """
+    逐块把数据库行转换为导出行，每块的卫健委判定和答案解码各用一次矩阵运算完成
+
+    Args:
+        source_rows: 数据库行的迭代器，列顺序见 EXPORT_SOURCE_COLUMNS（可附带 EXPORT_LEGACY_COLUMNS）
+
+    Yields:
+        list: 与 EXPORT_HEADERS 对应的值
+    """
+    chunk = []
+    for row in source_rows:
+        chunk.append(_row_values(row))
+        if len(chunk) >= JUDGE_CHUNK_SIZE:
+            yield from _export_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _export_chunk(chunk)
+
+
+def _export_chunk(chunk):
+    start = 7 + _N_RADAR
+    sums = np.array([
+        [score or 0 for score in values[start:start + _N_WJW]] for values in chunk
+    ], dtype=np.int64)
+    answers = _decode_answers([values[-2] for values in chunk])
+    for values, results, answer_scores in zip(chunk, logic.judge_wjw_scores(sums), answers):
+        yield export_row(values, results, answer_scores)
+
+
+def _excel_value(value):
+    if isinstance(value, str):
+        return _ILLEGAL_CHARACTERS.sub('', value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel 不支持带时区的时间，转换为本地时间
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def write_rows(filename, headers, rows, progress_callback=None):
+    """
+    逐行写入导出文件，格式由扩展名决定（.csv 或 .xlsx）
+
+    Args:
+        filename: 导出文件名
+        headers: 表头
+        rows: 行的迭代器（每行是与表头对应的列表）
+        progress_callback: 进度回调，参数为已写入行数
+
+    Returns:
+        int: 写入的行数
+    """
+    count = 0
+    if filename.lower().endswith('.csv'):
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+                if progress_callback and count % PROGRESS_INTERVAL == 0:
+                    progress_callback(count)
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Sheet1')
+        sheet.append(headers)
+        for row in rows:
+            sheet.append([_excel_value(value) for value in row])
+            count += 1
+            if progress_callback and count % PROGRESS_INTERVAL == 0:
+                progress_callback(count)
+        workbook.save(filename)
+
+    if progress_callback and count % PROGRESS_INTERVAL != 0:
+        progress_callback(count)
+    return count
+
+
+def discard_empty_export(filename, count):
+    """
+    三个数据库后端统一的导出结果：没有导出任何问卷时删除只有表头的文件并返回 None，
+    否则返回文件名
+
+    Args:
+        filename: 导出文件名
+        count: 写入的行数
+    """
+    if count == 0:
+        os.remove(filename)
+        return None
+    return filename
+
+
+def write_export(filename, source_rows, progress_callback=None):
+    """
+    导出完整问卷数据
+
+    Args:
+        filename: 导出文件名（.csv 或 .xlsx）
+        source_rows: 数据库行的迭代器，列顺序见 EXPORT_SOURCE_COLUMNS（可附带 EXPORT_LEGACY_COLUMNS）
+        progress_callback: 进度回调，参数为已写入行数
+
+    Returns:
+        int: 导出的问卷数
+    """
+    return write_rows(filename, EXPORT_HEADERS, export_rows(source_rows), progress_callback)
+
+
+# 卫健委各体质结果中的一项：体质(分数分-判定)
+_WJW_RESULT_ITEM = re.compile(r'^(.+)\((-?\d+)分-(.+)\)$')
+
+
+def _blank_to_none(value):
+    return None if value is None or value == '' else value
+
+
+def _parse_radar(text):
+    """format_radar 的逆过程"""
+    if not text:
+        return None
+    radar = {}
+    for item in text.split(', '):
+        dim, _, score = item.rpartition(':')
+        radar[dim] = float(score)
+    return radar
+
+
+def _parse_wjw_results(text):
+    """format_wjw_results 的逆过程，格式同 calculate_wjw_results 的 constitution_results"""
+    if not text:
+        return None
+    results = {}
+    for item in text.split(', '):
+        match = _WJW_RESULT_ITEM.match(item)
+        if match is None:
+            raise ValueError(f"无法识别的卫健委体质结果: {item}")
+        results[match.group(1)] = {'score': int(match.group(2)), 'result': match.group(3)}
+    return results
+
+
+def _parse_answers(text):
+    """format_answers 的逆过程：Q1 -> q_1，W1 -> wjw_q_1"""
+    answers = {}
+    for item in (text or '').split('; '):
+        if not item:
+            continue
+        label, _, option = item.partition(':')
+        key = f"q_{label[1:]}" if label.startswith('Q') else f"wjw_q_{label[1:]}"
+        answers[key] = option
+    return answers
+
+
+def parse_export_row(row):
+    """
+    把导出文件的一行（以 EXPORT_HEADERS 为键的字典）还原为 complete_questionnaires 的列，
+    供 database.bulk_import_questionnaires 重新导入；ID 列不导入，由数据库重新分配
+
+    Args:
+        row: csv.DictReader 读出的一行
+
+    Returns:
+        dict: 问卷记录（nickname 和 complete_questionnaires 的列）
+    """
+    row = {header: _blank_to_none(row.get(header)) for header in EXPORT_HEADERS}
+    radar = _parse_radar(row['八纲雷达数据'])
+    scores = [row[ctype] for ctype in CONSTITUTION_TYPES]
+    main_score = row['卫健委主要体质得分']
+    return {
+        'nickname': row['用户昵称'],
+        'bagang_type_code': row['八纲体质代码'],
+        'bagang_type_name': row['八纲体质名称'],
+        'bagang_radar_data': radar,
+        'bagang_energy_data': logic.energy_bars(radar) if radar else None,
+        'wjw_main_constitution': row['卫健委主要体质'],
+        'wjw_main_score': int(main_score) if main_score is not None else None,
+        'wjw_main_result': row['卫健委主要体质判定'],
+        'wjw_all_results': _parse_wjw_results(row['卫健委各体质结果']),
+        'wjw_scores': None if None in scores else {
+            ctype: int(score) for ctype, score in zip(CONSTITUTION_TYPES, scores)
+        },
+        'raw_answers': _parse_answers(row['原始答案']),
+        'created_at': row['提交时间'],
+    }
@@ -1,26 +1,82 @@
 import pandas as pd
 import numpy as np
+import copy
 import math
 import io
 import os
+import pickle
+import threading
+
+from ttl_cache import TTLCache
 
 # --- 1. 数据加载模块 ---
 
+# Excel 题库的编译缓存目录（pickle），可通过环境变量修改
+CACHE_DIR = os.getenv("CYBERTCM_CACHE_DIR", ".cybertcm_cache")
+
+
+def read_workbook(path):
+    """
+    读取 Excel 工作簿的全部工作表（只打开一次），带磁盘缓存。
+    
+    缓存以 文件路径 + 大小 + 修改时间 为键，Excel 未改动时直接读取 pickle，
+    不再经过 openpyxl 解析。
+    
+    Args:
+        path: Excel 文件路径
+    
+    Returns:
+        dict: 工作表名 -> DataFrame
+    """
+    stat = os.stat(path)  # 文件不存在时抛出 FileNotFoundError
+    key = {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+    cache_file = os.path.join(CACHE_DIR, os.path.basename(path) + ".pkl")
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('key') == key:
+            return cached['sheets']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"题库缓存读取失败，重新解析 Excel: {e}")
+    
+    sheets = pd.read_excel(path, sheet_name=None)
+    
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'key': key, 'sheets': sheets}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        # 只读文件系统等情况下不缓存，不影响加载
+        print(f"题库缓存写入失败: {e}")
+    
+    return sheets
+
+
 def load_data():
     """
     加载问题库和文案库 (从 Excel 文件)。
     """
     try:
-        # 直接读取Excel文件的不同工作表
-        df_questions = pd.read_excel("database.xlsx", sheet_name="Questions")
-        df_types = pd.read_excel("database.xlsx", sheet_name="Types")
+        # 一次读取Excel文件的全部工作表
+        sheets = read_workbook("database.xlsx")
+        df_questions = sheets["Questions"]
+        df_types = sheets["Types"]
         
         # 数据清洗：将 type_code 设为索引
         if 'type_code' in df_types.columns:
             df_types['type_code'] = df_types['type_code'].astype(str).str.strip()
             df_types.set_index("type_code", inplace=True)
             
-        return df_questions, df_types
+        return _attach_scoring_plan(df_questions), df_types
         
     except FileNotFoundError:
         print("警告：未找到数据库文件，正在加载备用数据...")
@@ -34,7 +90,7 @@ def load_questions():
     仅加载问题库 (用于 app.py 初始化问卷)。
     """
     try:
-        return pd.read_excel("database.xlsx", sheet_name="Questions")
+        return _attach_scoring_plan(read_workbook("database.xlsx")["Questions"])
     except:
         return load_mock_data()[0]
 
@@ -43,7 +99,7 @@ def load_wjw_data():
     加载卫健委33道题数据 (database1.xlsx)
     """
     try:
-        df_questions = pd.read_excel("database1.xlsx", sheet_name="Questions")
+        df_questions = read_workbook("database1.xlsx")["Questions"]
         return df_questions
     except FileNotFoundError:
         print("警告：未找到卫健委数据库文件")
@@ -75,7 +131,7 @@ def load_mock_data():
         "weight": [1] * 28
     }
     
-    df_q = pd.DataFrame(q_data)
+    df_q = _attach_scoring_plan(pd.DataFrame(q_data))
     
     # 2. 模拟体质数据 (Types Fallback)
     csv_content = """type_code,name,slogan,simple_description,factory_setting,bug_warning,teammate_cp,keep,stop,start
@@ -89,8 +145,342 @@ SSR,天选之子,阴阳平和,六边形战士,你的身体是完美的平衡态,
     
     return df_q, df_t
 
+# --- 1.5 进程级题库 ---
+
+# 评分结果缓存条数（按答案指纹，每个题库一份）
+SCORE_CACHE_SIZE = int(os.getenv("CYBERTCM_SCORE_CACHE_SIZE", "4096"))
+
+class QuestionBank:
+    """
+    只读题库：八纲题目、体质文案、卫健委题目和计分方案各加载一次，
+    由同一进程内的所有会话共享。
+    
+    属性返回的是浅拷贝视图（pandas 写时复制），调用方修改视图不会影响共享数据。
+    """
+    
+    def __init__(self, questions, types, wjw_questions):
+        """
+        Raises:
+            ValueError: 题号与答案编码的题目（ANSWER_KEYS）不一致
+        """
+        check_question_ids(questions, wjw_questions)
+        self._questions = questions
+        self._types = types
+        self._wjw_questions = wjw_questions
+        self._scoring_plan = get_scoring_plan(questions)
+        for value in self._scoring_plan.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        # 结果只由答案和题库决定，不需要过期；重新加载题库时随旧题库一起丢弃
+        self._score_cache = TTLCache(maxsize=SCORE_CACHE_SIZE, ttl=math.inf)
+    
+    @staticmethod
+    def _view(df):
+        return None if df is None else df.copy(deep=False)
+    
+    @property
+    def questions(self):
+        """八纲题目（28题）"""
+        return self._view(self._questions)
+    
+    @property
+    def types(self):
+        """体质文案（以 type_code 为索引）"""
+        return self._view(self._types)
+    
+    @property
+    def wjw_questions(self):
+        """卫健委题目（33题），文件缺失时为 None"""
+        return self._view(self._wjw_questions)
+    
+    @property
+    def scoring_plan(self):
+        """八纲计分方案（只读数组）"""
+        return self._scoring_plan
+    
+    def score(self, answers):
+        """
+        计算八纲和卫健委两部分结果，按答案指纹缓存
+        
+        同一份答案（重复提交、其他用户答得完全一样）只计算一次。
+        总是按传入的答案计算，指纹只作缓存键，结果与直接调用 calculate_results /
+        calculate_wjw_results 一致；有分数超出编码范围（0-5）的答案时指纹不能
+        区分不同答案，这种答案不经过缓存。
+        
+        Args:
+            answers: 含 q_* / wjw_q_* 键的答案字典（可直接传 session_state）
+        
+        Returns:
+            tuple: (指纹, 八纲结果, 卫健委结果)，结果是副本，调用方可以修改
+        """
+        fingerprint = answer_fingerprint(answers)
+        cacheable = all(0 <= parse_answer_score(answers.get(key)) <= 5 for key in ANSWER_KEYS)
+        cached = self._score_cache.get(fingerprint) if cacheable else None
+        if cached is None:
+            cached = (calculate_results(answers, self._questions, self._types),
+                      calculate_wjw_results(answers, self._wjw_questions))
+            if cacheable:
+                self._score_cache.set(fingerprint, cached)
+        return (fingerprint,) + copy.deepcopy(cached)
+    
+    def score_cache_stats(self):
+        """评分结果缓存的命中统计（见 TTLCache.stats）"""
+        return self._score_cache.stats()
+
+
+_question_bank = None
+_question_bank_lock = threading.Lock()
+
+
+def get_question_bank(reload=False):
+    """
+    获取进程级题库（首次调用时加载）
+    
+    Args:
+        reload: 强制重新加载（Excel 更新后使用）
+    
+    Returns:
+        QuestionBank
+    """
+    global _question_bank
+    if _question_bank is None or reload:
+        with _question_bank_lock:
+            if _question_bank is None or reload:
+                df_questions, df_types = load_data()
+                _question_bank = QuestionBank(df_questions, df_types, load_wjw_data())
+    return _question_bank
+
+
 # --- 2. 核心算法模块 ---
 
+# 八纲辨证的8个维度（顺序即雷达图顺序）
+DIMENSIONS = ['cold', 'heat', 'void', 'solid', 'dry', 'wet', 'qi', 'blood']
+
+# 答题选项: A=5分, B=4分, C=3分, D=2分, E=1分
+ANSWER_OPTIONS = ["A. 非常符合", "B. 比较符合", "C. 一般", "D. 不太符合", "E. 完全不符"]
+
+# 选项代码查找表: 选项 -> 代码 (0-4)，代码 -> 分数
+ANSWER_CODES = {option: i for i, option in enumerate(ANSWER_OPTIONS)}
+CODE_SCORES = np.array([5, 4, 3, 2, 1])
+_OPTION_SCORES = {option: int(CODE_SCORES[code]) for option, code in ANSWER_CODES.items()}
+
+# 四个对立轴: 左维度列号, 右维度列号, 左字母, 右字母
+_CODE_AXES = [(0, 1, 'C', 'H'), (2, 3, 'V', 'S'), (4, 5, 'D', 'W'), (6, 7, 'Q', 'B')]
+
+
+def parse_answer_score(ans):
+    """
+    单个答案 -> 分数，无法识别时返回 0（与不作答等价）
+    """
+    if ans is None or isinstance(ans, bool):
+        return 0
+    if isinstance(ans, (int, np.integer)):
+        return int(ans)
+    if isinstance(ans, (float, np.floating)):
+        return 0 if math.isnan(ans) else int(ans)
+    score = _OPTION_SCORES.get(ans)
+    if score is not None:
+        return score
+    try:
+        # 兼容带分数的格式，如 "A. 非常符合 (5分)"
+        score_part = str(ans).replace('（', '(').split('(')[1]
+        return int(score_part.split('分')[0])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _column_scores(column):
+    """把一列答案（选项文本或分数）转换为整数分数数组"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.fillna(0).to_numpy(dtype=np.int64)
+    scores = column.map(_OPTION_SCORES)
+    unmatched = scores.isna() & column.notna()
+    if unmatched.any():
+        # 少量非标准格式逐个解析
+        scores[unmatched] = column[unmatched].map(parse_answer_score)
+    return scores.fillna(0).to_numpy(dtype=np.int64)
+
+
+def answers_to_matrix(answers, question_ids, prefix="q_"):
+    """
+    把答案统一转换为 N×题数 的分数矩阵（未作答记 0 分）
+    
+    Args:
+        answers: 单份答案字典 / 答案字典列表 / 含 q_* 列的 DataFrame / 现成的分数矩阵
+        question_ids: 题目ID顺序（决定矩阵列顺序）
+        prefix: 答案键前缀，八纲为 "q_"，卫健委为 "wjw_q_"
+    
+    Returns:
+        np.ndarray: int64 分数矩阵
+    """
+    question_ids = list(question_ids)
+    if isinstance(answers, np.ndarray):
+        matrix = np.atleast_2d(answers).astype(np.int64)
+        if matrix.shape[1] != len(question_ids):
+            raise ValueError(f"答案矩阵应有 {len(question_ids)} 列，实际为 {matrix.shape[1]} 列")
+        return matrix
+    
+    if hasattr(answers, 'items') and not isinstance(answers, pd.DataFrame):
+        # 单份答案直接查表，避免构造 DataFrame 的开销
+        row = [parse_answer_score(answers.get(f"{prefix}{qid}")) for qid in question_ids]
+        return np.array([row], dtype=np.int64)
+
+    if isinstance(answers, pd.DataFrame):
+        df = answers
+    else:
+        df = pd.DataFrame(list(answers))
+    
+    matrix = np.zeros((len(df), len(question_ids)), dtype=np.int64)
+    for j, qid in enumerate(question_ids):
+        col = f"{prefix}{qid}"
+        if col in df.columns:
+            matrix[:, j] = _column_scores(df[col])
+    return matrix
+
+
+def compile_scoring_plan(df_questions):
+    """
+    把题库编译为计分方案（加载题库时调用一次）
+    
+    Args:
+        df_questions: 八纲题库（id, dimension, weight 列）
+    
+    Returns:
+        dict:
+            question_ids: 题目ID顺序（即分数矩阵的列顺序）
+            weights: 8×题数 维度权重矩阵
+            lower / upper: 各维度原始分的下限 / 上限（全选E / 全选A）
+            answer_codes / code_scores: 选项代码查找表
+    """
+    question_ids = df_questions['id'].tolist()
+    if 'weight' in df_questions.columns:
+        question_weights = pd.to_numeric(df_questions['weight'], errors='coerce').fillna(1).to_numpy(dtype=float)
+    else:
+        question_weights = np.ones(len(question_ids))
+    
+    weights = np.zeros((len(DIMENSIONS), len(question_ids)))
+    for i, dim in enumerate(df_questions['dimension']):
+        if dim in DIMENSIONS:
+            weights[DIMENSIONS.index(dim), i] = question_weights[i]
+    
+    low_score, high_score = CODE_SCORES.min(), CODE_SCORES.max()
+    lower = np.minimum(weights * low_score, weights * high_score).sum(axis=1)
+    upper = np.maximum(weights * low_score, weights * high_score).sum(axis=1)
+    
+    return {
+        'question_ids': question_ids,
+        'weights': weights,
+        'lower': lower,
+        'upper': upper,
+        'answer_codes': ANSWER_CODES,
+        'code_scores': CODE_SCORES
+    }
+
+
+def _attach_scoring_plan(df_questions):
+    """编译计分方案并挂在题库的 attrs 上"""
+    df_questions.attrs['scoring_plan'] = compile_scoring_plan(df_questions)
+    return df_questions
+
+
+def get_scoring_plan(df_questions):
+    """
+    获取题库的计分方案，题目与加载时不一致（或未预编译）时重新编译
+    """
+    plan = df_questions.attrs.get('scoring_plan')
+    if plan is None or plan['question_ids'] != df_questions['id'].tolist():
+        plan = compile_scoring_plan(df_questions)
+    return plan
+
+
+def _bagang_kernel(scores, plan):
+    """
+    八纲计算内核，单份与批量计算共用
+    
+    Args:
+        scores: N×题数 分数矩阵
+        plan: compile_scoring_plan 生成的计分方案
+    
+    Returns:
+        dict: norm(N×8), codes, magnitude, is_ssr, health_level
+    """
+    raw = scores.astype(float) @ plan['weights'].T
+    span = plan['upper'] - plan['lower']
+    safe_span = np.where(span > 0, span, 1)
+    norm = np.where(span > 0, (raw - plan['lower']) / safe_span * 100, 0)
+    norm = np.clip(norm, 0, 100)
+    
+    codes = np.full(len(norm), '', dtype='<U4')
+    peaks = []
+    for left, right, left_code, right_code in _CODE_AXES:
+        pick_left = norm[:, left] >= norm[:, right]
+        codes = np.char.add(codes, np.where(pick_left, left_code, right_code))
+        peaks.append(np.maximum(norm[:, left], norm[:, right]))
+    
+    magnitude = np.sqrt(peaks[0]**2 + peaks[1]**2 + peaks[2]**2 + peaks[3]**2)
+    is_ssr = magnitude < 35
+    health_level = np.where(is_ssr, 1, np.where(magnitude >= 90, 3, 2))
+    codes = np.where(is_ssr, 'SSR', codes)
+    
+    return {
+        'norm': norm,
+        'codes': codes,
+        'magnitude': magnitude,
+        'is_ssr': is_ssr,
+        'health_level': health_level
+    }
+
+
+def calculate_results_batch(answers, df_questions, df_types=None):
+    """
+    批量计算八纲体质（用于历史数据重算）
+    
+    Args:
+        answers: N×28 分数矩阵，或含 q_* 列的 DataFrame / 答案字典列表
+        df_questions: 题库
+        df_types: 文案库（可选，提供时附带 type_name 列）
+    
+    Returns:
+        DataFrame: type_code, [type_name], is_ssr, health_level, magnitude 及8个维度的归一化分数
+    """
+    plan = get_scoring_plan(df_questions)
+    scores = answers_to_matrix(answers, plan['question_ids'], prefix="q_")
+    k = _bagang_kernel(scores, plan)
+    
+    index = answers.index if isinstance(answers, pd.DataFrame) else None
+    result = pd.DataFrame({'type_code': k['codes'].astype(object)}, index=index)
+    if df_types is not None:
+        names = result['type_code'].map(df_types['name'])
+        fallback = np.where(result['type_code'] == 'SSR', "天选之子 (平和质)",
+                            "未收录 (" + result['type_code'] + ")")
+        result['type_name'] = names.fillna(pd.Series(fallback, index=result.index))
+    result['is_ssr'] = k['is_ssr']
+    result['health_level'] = k['health_level']
+    result['magnitude'] = k['magnitude']
+    for j, dim in enumerate(DIMENSIONS):
+        result[dim] = k['norm'][:, j]
+    return result
+
+
+# 能量条: 标签, 左端, 右端, 左维度, 右维度（值 = 右维度 - 左维度）
+ENERGY_AXES = [
+    ("温度", "❄️ 寒", "🔥 热", 'cold', 'heat'),
+    ("能量", "☁️ 虚", "💎 实", 'void', 'solid'),
+    ("环境", "🌵 燥", "💧 湿", 'dry', 'wet'),
+    ("通畅", "🌀 郁", "🩸 瘀", 'qi', 'blood'),
+]
+
+
+def energy_bars(norm_scores):
+    """
+    由雷达图分数计算4条能量条
+    """
+    return [
+        {"label": label, "left": left, "right": right, "val": norm_scores[right_dim] - norm_scores[left_dim]}
+        for label, left, right, left_dim, right_dim in ENERGY_AXES
+    ]
+
+
 def calculate_results(session_state, df_questions, df_types):
     """
     计算逻辑
@@ -101,64 +491,16 @@ def calculate_results(session_state, df_questions, df_types):
         if key.startswith("q_"):
             user_answers[key] = value
 
-    # 2. 初始化分数
-    dimensions = ['cold', 'heat', 'void', 'solid', 'dry', 'wet', 'qi', 'blood']
-    raw_scores = {dim: 0 for dim in dimensions}
-    
-    # 3. 计算原始分
-    options = ["A. 非常符合", "B. 比较符合", "C. 一般", "D. 不太符合", "E. 完全不符"]
-    for index, row in df_questions.iterrows():
-        qid = row['id']
-        dim = row['dimension']
-        ans_str = user_answers.get(f"q_{qid}")
-        if ans_str:
-            try:
-                # 根据选项位置计算分数: A=5分, B=4分, C=3分, D=2分, E=1分
-                if ans_str in options:
-                    score = 5 - options.index(ans_str)
-                else:
-                    # 兼容带分数的格式
-                    score_part = ans_str.replace('（', '(').split('(')[1]
-                    score = int(score_part.split('分')[0])
-                raw_scores[dim] += score
-            except:
-                pass
-
-    # 4. 归一化 (0-100)
-    norm_scores = {}
-    for dim, raw in raw_scores.items():
-        if dim in ['cold', 'heat', 'solid', 'dry']: 
-            n_score = (raw - 3) / 12 * 100
-        else: 
-            n_score = (raw - 4) / 16 * 100
-        norm_scores[dim] = max(0, min(100, n_score))
-
-    # 5. 生成代码
-    code_T = 'C' if norm_scores['cold'] >= norm_scores['heat'] else 'H'
-    max_T = max(norm_scores['cold'], norm_scores['heat'])
-    
-    code_E = 'V' if norm_scores['void'] >= norm_scores['solid'] else 'S'
-    max_E = max(norm_scores['void'], norm_scores['solid'])
-    
-    code_H = 'D' if norm_scores['dry'] >= norm_scores['wet'] else 'W'
-    max_H = max(norm_scores['dry'], norm_scores['wet'])
-    
-    code_C = 'Q' if norm_scores['qi'] >= norm_scores['blood'] else 'B'
-    max_C = max(norm_scores['qi'], norm_scores['blood'])
-    
-    final_code = code_T + code_E + code_H + code_C
-
-    # 6. 计算模长 (健康度)
-    magnitude = math.sqrt(max_T**2 + max_E**2 + max_H**2 + max_C**2)
-    is_ssr = False
-    health_level = 2
-    
-    if magnitude < 35:
-        is_ssr = True
-        health_level = 1
-        final_code = "SSR" 
-    elif magnitude >= 90:
-        health_level = 3
+    # 2. 计算（与批量计算共用同一内核）
+    plan = get_scoring_plan(df_questions)
+    scores = answers_to_matrix(user_answers, plan['question_ids'], prefix="q_")
+    k = _bagang_kernel(scores, plan)
+    
+    norm_scores = {dim: float(k['norm'][0, j]) for j, dim in enumerate(DIMENSIONS)}
+    final_code = str(k['codes'][0])
+    magnitude = float(k['magnitude'][0])
+    is_ssr = bool(k['is_ssr'][0])
+    health_level = int(k['health_level'][0])
 
     # 7. 组装结果
     # 确保 final_code 存在于表中
@@ -199,12 +541,7 @@ def calculate_results(session_state, df_questions, df_types):
             "teammate": type_data.get("teammate_cp", "")
         },
         "radar_chart": norm_scores, 
-        "energy_bars": [
-            {"label": "温度", "left": "❄️ 寒", "right": "🔥 热", "val": norm_scores['heat'] - norm_scores['cold']},
-            {"label": "能量", "left": "☁️ 虚", "right": "💎 实", "val": norm_scores['solid'] - norm_scores['void']},
-            {"label": "环境", "left": "🌵 燥", "right": "💧 湿", "val": norm_scores['wet'] - norm_scores['dry']},
-            {"label": "通畅", "left": "🌀 郁", "right": "🩸 瘀", "val": norm_scores['blood'] - norm_scores['qi']},
-        ],
+        "energy_bars": energy_bars(norm_scores),
         "action_guide": {
             "keep": parse_list(type_data.get("keep", "")),
             "stop": parse_list(type_data.get("stop", "")),
@@ -234,6 +571,109 @@ WJW_CONSTITUTION_MAP = {
 # 平和质反向计分的题目
 PINGHE_REVERSE_SCORES = [2, 4, 5, 13]
 
+# 卫健委题目ID（分数矩阵的列顺序）与9种体质顺序
+WJW_QUESTION_IDS = list(range(1, 34))
+WJW_CONSTITUTIONS = list(WJW_CONSTITUTION_MAP.keys())
+
+
+def _wjw_weight_matrices():
+    """
+    生成 9×33 的正向 / 反向计分矩阵
+    """
+    forward = np.zeros((len(WJW_CONSTITUTIONS), len(WJW_QUESTION_IDS)), dtype=np.int64)
+    reverse = np.zeros_like(forward)
+    for i, constitution in enumerate(WJW_CONSTITUTIONS):
+        for qid in WJW_CONSTITUTION_MAP[constitution]:
+            j = WJW_QUESTION_IDS.index(qid)
+            if constitution == '平和质' and qid in PINGHE_REVERSE_SCORES:
+                reverse[i, j] += 1
+            else:
+                forward[i, j] += 1
+    return forward, reverse
+
+
+_WJW_FORWARD, _WJW_REVERSE = _wjw_weight_matrices()
+_PINGHE_INDEX = WJW_CONSTITUTIONS.index('平和质')
+_WJW_OTHER_INDEX = [i for i in range(len(WJW_CONSTITUTIONS)) if i != _PINGHE_INDEX]
+
+
+def judge_wjw_scores(sums):
+    """
+    由9种体质得分判定结果（判定只依赖得分，数据库中存了得分列即可重新判定）
+    
+    Args:
+        sums: N×9 得分矩阵，列顺序同 WJW_CONSTITUTIONS
+    
+    Returns:
+        np.ndarray: N×9 判定结果
+    """
+    sums = np.atleast_2d(sums)
+    
+    # 偏颇体质：≥11 是，9-10 倾向是，≤8 否
+    results = np.where(sums >= 11, '是', np.where(sums >= 9, '倾向是', '否')).astype('<U3')
+    
+    # 平和质：≥17 且其他都 ≤8 为是，≥17 且其他都 ≤10 为基本是
+    max_other = sums[:, _WJW_OTHER_INDEX].max(axis=1)
+    pinghe = sums[:, _PINGHE_INDEX]
+    results[:, _PINGHE_INDEX] = np.where(
+        (pinghe >= 17) & (max_other <= 8), '是',
+        np.where((pinghe >= 17) & (max_other <= 10), '基本是', '否')
+    )
+    return results
+
+
+def _wjw_kernel(scores):
+    """
+    卫健委计算内核，单份与批量计算共用
+    
+    Args:
+        scores: N×33 分数矩阵（未作答为 0）
+    
+    Returns:
+        dict: sums(N×9), results(N×9 判定), main_index, main_score, main_result
+    """
+    # 反向计分：1→5, 2→4, 3→3, 4→2, 5→1（未作答仍为0）
+    reversed_scores = np.where(scores > 0, 6 - scores, 0)
+    sums = scores @ _WJW_FORWARD.T + reversed_scores @ _WJW_REVERSE.T
+    results = judge_wjw_scores(sums)
+    
+    # 主要体质：偏颇体质中分数最高的（并列取靠前的）
+    main_index = np.array(_WJW_OTHER_INDEX)[sums[:, _WJW_OTHER_INDEX].argmax(axis=1)]
+    rows = np.arange(len(sums))
+    
+    return {
+        'sums': sums,
+        'results': results,
+        'main_index': main_index,
+        'main_score': sums[rows, main_index],
+        'main_result': results[rows, main_index]
+    }
+
+
+def calculate_wjw_results_batch(answers):
+    """
+    批量计算卫健委9种体质（用于队列报告）
+    
+    Args:
+        answers: N×33 分数矩阵，或含 wjw_q_* 列的 DataFrame / 答案字典列表
+                 （数据库中的 wjw_answers 需先 json.loads）
+    
+    Returns:
+        DataFrame: 9种体质得分、"<体质>判定" 列，以及 main_constitution, main_score, main_result
+    """
+    scores = answers_to_matrix(answers, WJW_QUESTION_IDS, prefix="wjw_q_")
+    k = _wjw_kernel(scores)
+    
+    index = answers.index if isinstance(answers, pd.DataFrame) else None
+    result = pd.DataFrame(k['sums'], columns=WJW_CONSTITUTIONS, index=index)
+    for i, constitution in enumerate(WJW_CONSTITUTIONS):
+        result[f"{constitution}判定"] = k['results'][:, i].astype(object)
+    result['main_constitution'] = np.array(WJW_CONSTITUTIONS, dtype=object)[k['main_index']]
+    result['main_score'] = k['main_score']
+    result['main_result'] = k['main_result'].astype(object)
+    return result
+
+
 def calculate_wjw_results(session_state, df_questions):
     """
     计算卫健委9种体质结果
@@ -254,72 +694,160 @@ def calculate_wjw_results(session_state, df_questions):
         if key.startswith("wjw_q_"):
             user_answers[key] = value
     
-    # 2. 计算各体质得分
-    constitution_scores = {}
-    
-    # 选项列表用于计算分数
-    options = ["A. 非常符合", "B. 比较符合", "C. 一般", "D. 不太符合", "E. 完全不符"]
-    
-    for constitution, question_ids in WJW_CONSTITUTION_MAP.items():
-        total_score = 0
-        for qid in question_ids:
-            ans_str = user_answers.get(f"wjw_q_{qid}")
-            if ans_str:
-                try:
-                    # 根据选项位置计算分数: A=5分, B=4分, C=3分, D=2分, E=1分
-                    if ans_str in options:
-                        score = 5 - options.index(ans_str)
-                    else:
-                        # 兼容带分数的格式
-                        score_part = ans_str.replace('（', '(').split('(')[1]
-                        score = int(score_part.split('分')[0])
-                    
-                    # 平和质的反向计分
-                    if constitution == '平和质' and qid in PINGHE_REVERSE_SCORES:
-                        # 反向计分：1→5, 2→4, 3→3, 4→2, 5→1
-                        score = 6 - score
-                    
-                    total_score += score
-                except:
-                    pass
-        
-        constitution_scores[constitution] = total_score
-    
-    # 3. 判定各体质类型
-    constitution_results = {}
-    for constitution, score in constitution_scores.items():
-        if constitution == '平和质':
-            continue  # 平和质单独处理
-        
-        if score >= 11:
-            constitution_results[constitution] = {'score': score, 'result': '是'}
-        elif score >= 9:
-            constitution_results[constitution] = {'score': score, 'result': '倾向是'}
-        else:
-            constitution_results[constitution] = {'score': score, 'result': '否'}
+    # 2. 计算（与批量计算共用同一内核）
+    scores = answers_to_matrix(user_answers, WJW_QUESTION_IDS, prefix="wjw_q_")
+    k = _wjw_kernel(scores)
     
-    # 4. 平和质特殊判定
-    pinghe_score = constitution_scores.get('平和质', 0)
-    other_scores = [constitution_scores.get(c, 0) for c in WJW_CONSTITUTION_MAP.keys() if c != '平和质']
+    constitution_scores = {c: int(k['sums'][0, i]) for i, c in enumerate(WJW_CONSTITUTIONS)}
     
-    if pinghe_score >= 17 and all(s <= 8 for s in other_scores):
-        constitution_results['平和质'] = {'score': pinghe_score, 'result': '是'}
-    elif pinghe_score >= 17 and all(s <= 10 for s in other_scores):
-        constitution_results['平和质'] = {'score': pinghe_score, 'result': '基本是'}
-    else:
-        constitution_results['平和质'] = {'score': pinghe_score, 'result': '否'}
+    # 3. 判定结果（偏颇体质在前，平和质在后）
+    constitution_results = {}
+    for i in _WJW_OTHER_INDEX + [_PINGHE_INDEX]:
+        constitution_results[WJW_CONSTITUTIONS[i]] = {
+            'score': int(k['sums'][0, i]),
+            'result': str(k['results'][0, i])
+        }
     
-    # 5. 确定主要体质（分数最高的）
-    non_pinghe = {k: v for k, v in constitution_results.items() if k != '平和质'}
-    if non_pinghe:
-        main_constitution = max(non_pinghe.items(), key=lambda x: x[1]['score'])
-    else:
-        main_constitution = ('平和质', constitution_results['平和质'])
+    main_constitution = WJW_CONSTITUTIONS[int(k['main_index'][0])]
     
     return {
         'constitution_scores': constitution_scores,
         'constitution_results': constitution_results,
-        'main_constitution': main_constitution[0],
-        'main_score': main_constitution[1]['score'],
-        'main_result': main_constitution[1]['result']
-    }
\ No newline at end of file
+        'main_constitution': main_constitution,
+        'main_score': int(k['main_score'][0]),
+        'main_result': str(k['main_result'][0])
+    }
+
+
+# --- 4. 答案编码（数据库存储） ---
+
+# 答案顺序：八纲 q_1..q_28，然后卫健委 wjw_q_1..wjw_q_33
+BAGANG_QUESTION_IDS = list(range(1, 29))
+ANSWER_KEYS = [f"q_{qid}" for qid in BAGANG_QUESTION_IDS] + [f"wjw_q_{qid}" for qid in WJW_QUESTION_IDS]
+
+def _id_mismatch(label, df, expected):
+    ids = [int(qid) for qid in df['id']]
+    missing = sorted(set(expected) - set(ids))
+    extra = sorted(set(ids) - set(expected))
+    duplicated = sorted({qid for qid in ids if ids.count(qid) > 1})
+    if not (missing or extra or duplicated):
+        return None
+    return f"{label}缺少 {missing}，多出 {extra}，重复 {duplicated}"
+
+
+def check_question_ids(df_questions, df_wjw=None):
+    """
+    检查题库题号与答案编码的题目一致
+
+    答案编码、评分缓存的指纹和分页问卷都按 ANSWER_KEYS 定位题目，
+    题库增删或重新编号的题目会被当作未作答，因此在加载题库时直接报错。
+
+    Raises:
+        ValueError: 题号不一致（需要同时更新 BAGANG_QUESTION_IDS / WJW_QUESTION_IDS 和答案编码格式）
+    """
+    problems = [_id_mismatch("八纲题目", df_questions, BAGANG_QUESTION_IDS)]
+    if df_wjw is not None:
+        problems.append(_id_mismatch("卫健委题目", df_wjw, WJW_QUESTION_IDS))
+    problems = [p for p in problems if p]
+    if problems:
+        raise ValueError(
+            "题库题号与答案编码不一致：" + "；".join(problems) +
+            "。修改题目需要同时更新 logic.BAGANG_QUESTION_IDS / WJW_QUESTION_IDS 和答案编码格式"
+        )
+
+
+# 每个答案占 3 位，存分数 1-5（E..A），0 表示未作答或无法识别；
+# 61 道题共 183 位，按高位在前打包为 23 字节
+ANSWER_CODE_BITS = 3
+PACKED_ANSWERS_SIZE = (len(ANSWER_KEYS) * ANSWER_CODE_BITS + 7) // 8
+_CODE_SHIFTS = np.arange(ANSWER_CODE_BITS - 1, -1, -1, dtype=np.uint8)
+
+
+def _answer_score_code(ans):
+    score = parse_answer_score(ans)
+    return score if 1 <= score <= 5 else 0
+
+
+def pack_answer_matrix(scores):
+    """
+    N×61 分数矩阵 -> N 份压缩答案编码
+    
+    Returns:
+        list[bytes]: 每份 PACKED_ANSWERS_SIZE 字节
+    """
+    codes = np.atleast_2d(np.asarray(scores, dtype=np.uint8))
+    bits = (codes[:, :, None] >> _CODE_SHIFTS) & 1
+    packed = np.packbits(bits.reshape(len(codes), -1), axis=1)
+    return [row.tobytes() for row in packed]
+
+
+def encode_answer_codes(answers):
+    """
+    答案字典 -> 压缩答案编码（23 字节，原来的 JSON 约 1.5 KB）
+    
+    Args:
+        answers: 含 q_* / wjw_q_* 键的答案字典，其他键忽略
+    
+    Returns:
+        bytes: 压缩答案编码
+    """
+    return pack_answer_matrix([[_answer_score_code(answers.get(key)) for key in ANSWER_KEYS]])[0]
+
+
+def answer_fingerprint(answers):
+    """
+    答案指纹：压缩答案编码的十六进制字符串（46 个字符）
+    
+    61 道题的分数决定全部计算结果，编码本身就是无冲突的键，不需要再做哈希；
+    选项文本和分数两种写法得到同一个指纹。
+    """
+    return encode_answer_codes(answers).hex()
+
+
+def answer_codes_to_matrix(blobs):
+    """
+    批量解码答案编码为 N×61 分数矩阵（未作答为 0）
+    
+    兼容早期每题 1 字节、未打包的 61 字节编码（按长度区分）
+    
+    Raises:
+        ValueError: 编码长度不正确
+    """
+    blobs = [bytes(blob) for blob in blobs]
+    n = len(ANSWER_KEYS)
+    matrix = np.zeros((len(blobs), n), dtype=np.int64)
+    packed_rows = [i for i, blob in enumerate(blobs) if len(blob) == PACKED_ANSWERS_SIZE]
+    if packed_rows:
+        packed = np.frombuffer(b''.join(blobs[i] for i in packed_rows), dtype=np.uint8)
+        bits = np.unpackbits(packed.reshape(len(packed_rows), -1), axis=1)[:, :n * ANSWER_CODE_BITS]
+        matrix[packed_rows] = (bits.reshape(-1, n, ANSWER_CODE_BITS) << _CODE_SHIFTS).sum(axis=2)
+    for i, blob in enumerate(blobs):
+        if len(blob) == n:
+            matrix[i] = np.frombuffer(blob, dtype=np.uint8)
+        elif len(blob) != PACKED_ANSWERS_SIZE:
+            raise ValueError(f"答案编码长度应为 {PACKED_ANSWERS_SIZE} 字节，实际为 {len(blob)} 字节")
+    return np.where(matrix <= 5, matrix, 0)
+
+
+def decode_answer_codes(blob):
+    """
+    答案编码 -> 答案字典（选项文本），未作答的题目不出现
+    """
+    scores = answer_codes_to_matrix([blob])[0]
+    return {key: ANSWER_OPTIONS[5 - score] for key, score in zip(ANSWER_KEYS, scores) if score}
+
+
+def answer_codes_to_matrices(blobs):
+    """
+    批量把答案编码转换为分数矩阵，不经过答案字典
+    
+    Args:
+        blobs: 答案编码列表
+    
+    Returns:
+        tuple: (N×28 八纲分数矩阵, N×33 卫健委分数矩阵)，
+               可直接传给 calculate_results_batch / calculate_wjw_results_batch
+    """
+    matrix = answer_codes_to_matrix(blobs)
+    split = len(BAGANG_QUESTION_IDS)
+    return matrix[:, :split], matrix[:, split:]
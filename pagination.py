@@ -0,0 +1,130 @@
+"""
+问卷列表的游标（keyset）分页和日期筛选工具（三个数据库后端共用）
+
+列表按 (created_at, id) 倒序排列，下一页的条件是
+(created_at, id) < 上一页最后一行的 (created_at, id)，
+无论翻到第几页都只需按索引读取一页数据，不会像 OFFSET 一样越翻越慢；
+翻页期间插入新问卷也不会导致重复或漏行。
+
+游标对调用方是不透明的字符串，只能原样传回。
+"""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+# 每页默认条数和上限
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# 带筛选条件时最多精确计数到这么多条，超过后只返回下限估计
+COUNT_LIMIT = 10000
+
+
+def clamp_page_size(page_size):
+    """把每页条数限制在 1 ~ MAX_PAGE_SIZE 之间"""
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_at, questionnaire_id):
+    """
+    由一页最后一行生成下一页的游标
+
+    Args:
+        created_at: 提交时间（字符串或 datetime）
+        questionnaire_id: 问卷ID
+
+    Returns:
+        str: 不透明游标
+    """
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, questionnaire_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, questionnaire_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor!r}")
+    if not isinstance(created_at, str) or not isinstance(questionnaire_id, int):
+        raise ValueError(f"无效的分页游标: {cursor!r}")
+    return created_at, questionnaire_id
+
+
+def make_page(rows, page_size, total=None, total_is_estimate=False):
+    """
+    把按 page_size + 1 条查询的结果整理成一页
+
+    Args:
+        rows: 问卷字典列表（最多 page_size + 1 条，多出的一条只用于判断是否有下一页）
+        page_size: 每页条数
+        total: 符合条件的总数（只在第一页计算）
+        total_is_estimate: total 是否只是估计值
+
+    Returns:
+        dict: items, next_cursor, total, total_is_estimate
+    """
+    items = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = items[-1]
+        next_cursor = encode_cursor(last['created_at'], last['id'])
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'total': total,
+        'total_is_estimate': total_is_estimate
+    }
+
+
+def date_range_bounds(start_date=None, end_date=None):
+    """
+    把按天的筛选条件转换为半开区间 [start, end)，
+    查询写成 created_at >= start AND created_at < end，可以直接走 created_at 索引
+    （DATE(created_at) >= ? 这种对列做函数运算的写法用不上索引）
+
+    Args:
+        start_date: 开始日期（YYYY-MM-DD，包含当天）
+        end_date: 结束日期（YYYY-MM-DD，包含当天）
+
+    Returns:
+        tuple: (开始日期, 结束日期的下一天)，均为 YYYY-MM-DD 字符串，未指定时为 None
+
+    Raises:
+        ValueError: 日期格式错误
+    """
+    start = _parse_day(start_date).isoformat() if start_date else None
+    end = (_parse_day(end_date) + timedelta(days=1)).isoformat() if end_date else None
+    return start, end
+
+
+def _parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def like_pattern(term):
+    """
+    子串匹配的 LIKE 模式，转义用户输入中的 % _ \\（配合 ESCAPE '\\' 使用）
+    """
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
@@ -0,0 +1,156 @@
+"""
+问卷渲染：分页模式（默认）和整张表单模式
+
+整张表单一次渲染 61 个单选框和 61 条分隔线，每次重跑都要序列化约 180 个元素，
+低端手机上非常卡。分页模式每页只渲染 QUESTIONS_PER_PAGE 道题（一个表单），
+翻页时才重跑一次；答案保存在 session_state 中的 AnswerSheet 里（每题 1 字节），
+不依赖已经不在页面上的单选框状态。
+
+两种模式提交时都返回同样的答案字典（答案键 -> 选项文本），
+可直接传给 QuestionBank.score / calculate_results / calculate_wjw_results。
+"""
+
+import os
+
+import streamlit as st
+
+import logic
+
+# 问卷模式：paged（分页）/ form（整张表单）
+QUESTIONNAIRE_MODE = os.getenv("CYBERTCM_QUESTIONNAIRE_MODE", "paged")
+QUESTIONS_PER_PAGE = int(os.getenv("CYBERTCM_QUESTIONS_PER_PAGE", "10"))
+
+# 初始默认选 "C. 一般"
+DEFAULT_OPTION_INDEX = 2
+
+SHEET_KEY = "answer_sheet"
+PAGE_KEY = "questionnaire_page"
+
+_KEY_INDEX = {key: i for i, key in enumerate(logic.ANSWER_KEYS)}
+
+
+class AnswerSheet:
+    """
+    61 道题的答案，每题 1 字节分数（5..1 对应 A..E，0 表示未作答）
+
+    初始为默认选项，与整张表单的默认值一致。
+    """
+
+    def __init__(self):
+        default_score = int(logic.CODE_SCORES[DEFAULT_OPTION_INDEX])
+        self.scores = bytearray([default_score] * len(logic.ANSWER_KEYS))
+
+    def set(self, key, answer):
+        """记录一道题的答案（选项文本或分数），无法识别时记为未作答"""
+        score = logic.parse_answer_score(answer)
+        self.scores[_KEY_INDEX[key]] = score if 1 <= score <= 5 else 0
+
+    def option_index(self, key):
+        """单选框的选中位置，未作答时为默认选项"""
+        score = self.scores[_KEY_INDEX[key]]
+        return 5 - score if score else DEFAULT_OPTION_INDEX
+
+    def answers(self):
+        """答案字典（答案键 -> 选项文本），未作答的题目不出现"""
+        return {
+            key: logic.ANSWER_OPTIONS[5 - score]
+            for key, score in zip(logic.ANSWER_KEYS, self.scores) if score
+        }
+
+
+def question_list(df_questions, df_wjw):
+    """
+    两组题目按顺序合并（题号连续，不显示来源）
+
+    Returns:
+        list[tuple]: [(答案键, 题目文本)]，先八纲 q_*，后卫健委 wjw_q_*
+    """
+    return (
+        [(f"q_{qid}", text) for qid, text in zip(df_questions['id'], df_questions['question'])]
+        + [(f"wjw_q_{qid}", text) for qid, text in zip(df_wjw['id'], df_wjw['question'])]
+    )
+
+
+def page_count(total, per_page=None):
+    """题目总页数（至少 1 页）"""
+    per_page = per_page or QUESTIONS_PER_PAGE
+    return max(1, -(-total // per_page))
+
+
+def _render_question(number, text, widget_key, index):
+    st.write(f"**{number}. {text}**")
+    st.radio(
+        "请选择程度:",
+        logic.ANSWER_OPTIONS,
+        key=widget_key,
+        index=index,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+    st.markdown("---")
+
+
+def render_questionnaire_form(questions):
+    """
+    整张表单（原有模式）：一次渲染全部题目，单选框的键就是答案键
+
+    Returns:
+        dict | None: 提交时返回答案字典，否则 None
+    """
+    with st.form("combined_quiz_form"):
+        for number, (key, text) in enumerate(questions, 1):
+            _render_question(number, text, key, DEFAULT_OPTION_INDEX)
+        submitted = st.form_submit_button("🚀 提交问卷", type="primary")
+
+    if not submitted:
+        return None
+    return {key: st.session_state[key] for key, _ in questions if key in st.session_state}
+
+
+def render_questionnaire_page(questions, per_page=None):
+    """
+    分页问卷：只渲染当前页的题目，翻页或提交时把本页答案写入 AnswerSheet
+
+    Returns:
+        dict | None: 在最后一页提交时返回全部答案，否则 None
+    """
+    per_page = per_page or QUESTIONS_PER_PAGE
+    sheet = st.session_state.setdefault(SHEET_KEY, AnswerSheet())
+    pages = page_count(len(questions), per_page)
+    page = min(st.session_state.get(PAGE_KEY, 0), pages - 1)
+    start = page * per_page
+    page_questions = questions[start:start + per_page]
+
+    st.progress((page + 1) / pages, text=f"第 {page + 1} / {pages} 页")
+    with st.form(f"quiz_page_{page}"):
+        for number, (key, text) in enumerate(page_questions, start + 1):
+            _render_question(number, text, f"page_{key}", sheet.option_index(key))
+
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            previous = st.form_submit_button("⬅️ 上一页", disabled=page == 0)
+        with col_next:
+            if page == pages - 1:
+                submitted = st.form_submit_button("🚀 提交问卷", type="primary")
+                following = False
+            else:
+                following = st.form_submit_button("下一页 ➡️", type="primary")
+                submitted = False
+
+    if not (previous or following or submitted):
+        return None
+
+    for key, _ in page_questions:
+        sheet.set(key, st.session_state.get(f"page_{key}"))
+    if submitted:
+        return sheet.answers()
+
+    st.session_state[PAGE_KEY] = page - 1 if previous else page + 1
+    st.rerun()
+
+
+def render_questionnaire(questions):
+    """按 QUESTIONNAIRE_MODE 渲染问卷，提交时返回答案字典，否则 None"""
+    if QUESTIONNAIRE_MODE == "form":
+        return render_questionnaire_form(questions)
+    return render_questionnaire_page(questions)
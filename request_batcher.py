@@ -0,0 +1,103 @@
+"""
+请求合并：把多个线程在短时间内发起的同类请求合并为一次批量调用
+
+Supabase 后端的每个请求都是一次 HTTPS 往返。一个班级同时登录时，
+各线程的查询在 max_wait 秒内攒成一批，由这一批中第一个到达的线程统一发出，
+其他线程等待结果；攒够 max_batch 个键时立即发出。
+一批发出后，新到达的请求开始攒下一批，与正在进行的请求互不阻塞。
+批量处理在后台线程中执行，包括发出请求的线程在内，每个请求最多等待 timeout 秒。
+"""
+
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class RequestBatcher:
+    """
+    合并并发请求的批处理器
+
+    使用示例:
+        batcher = RequestBatcher(resolve_user_ids, max_batch=50, max_wait=0.02)
+        user_id = batcher.submit("昵称")
+    """
+
+    def __init__(self, handler, max_batch=50, max_wait=0.02, timeout=60.0):
+        """
+        Args:
+            handler: 批量处理函数，参数为去重后的键列表，返回 {键: 结果}
+            max_batch: 攒够这么多个不同的键后立即发出
+            max_wait: 一批中第一个请求最多等待的秒数（0 表示不等待）
+            timeout: 每个请求等待结果的最长秒数（None 表示一直等待）
+        """
+        self._handler = handler
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._timeout = timeout
+        self._pending = {}  # 键 -> [Future]，同一个键的重复请求共用一次查询
+        self._cond = threading.Condition()
+        self._collecting = False
+        self._stats = {'requests': 0, 'batches': 0, 'timeouts': 0}
+
+    def submit(self, key):
+        """
+        提交一个键并等待结果
+
+        Raises:
+            批量处理函数抛出的异常（同一批的请求都收到同一个异常）；
+            结果中缺少这个键时抛出 KeyError；
+            超过 timeout 秒仍没有结果时抛出 TimeoutError（批量处理仍在后台继续）
+        """
+        future = Future()
+        with self._cond:
+            self._stats['requests'] += 1
+            self._pending.setdefault(key, []).append(future)
+            if len(self._pending) >= self._max_batch:
+                self._cond.notify_all()
+            leader = not self._collecting
+            self._collecting = True
+        if leader:
+            # 在后台线程中攒批和处理，批量处理卡住时发起请求的线程也能按时返回
+            threading.Thread(target=self._flush, name='request-batcher', daemon=True).start()
+        try:
+            return future.result(timeout=self._timeout)
+        except FutureTimeout:
+            with self._cond:
+                self._stats['timeouts'] += 1
+            raise TimeoutError(f"批量请求等待超时（{self._timeout} 秒）: {key}") from None
+
+    def _flush(self):
+        """等待攒批（数量或时间达到阈值），然后发出这一批"""
+        with self._cond:
+            deadline = time.monotonic() + self._max_wait
+            while len(self._pending) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, {}
+            self._collecting = False
+            self._stats['batches'] += 1
+
+        try:
+            results = self._handler(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            for future in futures:
+                if key in results:
+                    future.set_result(results[key])
+                else:
+                    future.set_exception(KeyError(key))
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests（提交次数）, batches（实际发出的批数）, timeouts（等待超时的请求数）
+        """
+        with self._cond:
+            return dict(self._stats)
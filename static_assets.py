@@ -0,0 +1,75 @@
+"""
+静态资源（吉祥物动图、公众号二维码）
+
+图片放在 static/ 目录，由 Streamlit 静态文件服务（server.enableStaticServing）
+以 app/static/<文件名> 提供，页面里只写一个带内容哈希的 URL：
+浏览器按 URL 缓存图片（ETag 校验，文件更新后哈希变化，URL 随之改变），
+每次重跑只发送几十字节的 URL，而不是整张图片的 base64。
+
+静态文件服务未开启时退回 data URI，编码结果按进程缓存，只读文件、编码一次。
+"""
+
+import base64
+import functools
+import hashlib
+import mimetypes
+import os
+from urllib.parse import quote
+
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL_PREFIX = "app/static"
+
+
+@functools.lru_cache(maxsize=None)
+def _read_asset(name):
+    """读取资源文件，返回 (内容, 内容哈希)；每个进程只读一次"""
+    with open(os.path.join(STATIC_DIR, name), "rb") as f:
+        data = f.read()
+    return data, hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_url(name):
+    """
+    静态文件服务的 URL，带内容哈希参数
+
+    Raises:
+        FileNotFoundError: static/ 下没有这个文件
+    """
+    _, digest = _read_asset(name)
+    return f"{STATIC_URL_PREFIX}/{quote(name)}?v={digest}"
+
+
+@functools.lru_cache(maxsize=None)
+def data_uri(name):
+    """base64 data URI（静态文件服务未开启时使用）"""
+    data, _ = _read_asset(name)
+    mime = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def static_serving_enabled():
+    """是否开启了 Streamlit 静态文件服务（.streamlit/config.toml 中 server.enableStaticServing）"""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except RuntimeError:
+        return False
+
+
+def asset_url(name):
+    """
+    页面中引用资源用的 URL
+
+    Args:
+        name: static/ 下的文件名，如 "doro.gif"
+
+    Returns:
+        str: 开启静态文件服务时为带哈希的 URL，否则为 data URI
+
+    Raises:
+        FileNotFoundError: static/ 下没有这个文件
+    """
+    if static_serving_enabled():
+        return hashed_url(name)
+    return data_uri(name)
@@ -0,0 +1,303 @@
+"""
+问卷提交的后台写入队列（write-behind）
+
+提交问卷时只需计算结果并入队，由后台线程批量写入数据库：
+- 入队时先写入本地 spool 目录，进程重启后未写入的问卷会自动恢复
+- 后台线程按条数 / 时间攒批，优先调用后端的批量保存接口
+- 写入失败按指数退避重试，多次失败的问卷移到 spool/failed 目录等待人工处理
+- 提交时间（created_at，UTC）在入队时记录，重试、恢复后写入的问卷日期不变
+
+注意：spool 目录假定只由一个进程使用。
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+# 本地 spool 目录，可通过环境变量修改
+SPOOL_DIR = os.getenv('CYBERTCM_SPOOL_DIR', '.cybertcm_spool')
+
+
+def _json_default(value):
+    """numpy 标量等无法直接序列化的值"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def utc_timestamp(seconds=None):
+    """提交时间文本：UTC，格式同 SQLite 的 CURRENT_TIMESTAMP（YYYY-MM-DD HH:MM:SS）"""
+    moment = datetime.now(timezone.utc) if seconds is None else datetime.fromtimestamp(seconds, timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class SubmissionQueue:
+    """
+    问卷后台写入队列
+
+    使用示例:
+        queue = SubmissionQueue(save_complete_questionnaire, save_many=save_complete_questionnaires)
+        queue.enqueue(user_id=..., part1_result=..., ...)
+    """
+
+    def __init__(self, save_one, save_many=None, spool_dir=SPOOL_DIR, batch_size=50,
+                 flush_interval=0.5, retry_delay=1.0, max_retry_delay=60.0, max_attempts=8):
+        """
+        Args:
+            save_one: 单条保存函数，参数同 save_complete_questionnaire（含 created_at）
+            save_many: 批量保存函数（可选），参数为记录字典列表，须在一个事务内全部写入
+            spool_dir: 本地 spool 目录
+            batch_size: 每批最多写入条数
+            flush_interval: 攒批的最长等待秒数
+            retry_delay / max_retry_delay: 失败重试的初始 / 最大等待秒数
+            max_attempts: 单条问卷最多尝试次数，超过后移入 failed 目录
+        """
+        self._save_one = save_one
+        self._save_many = save_many
+        self._spool_dir = spool_dir
+        self._failed_dir = os.path.join(spool_dir, 'failed')
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._max_attempts = max_attempts
+
+        self._pending = deque()
+        self._attempts = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._stats = {
+            'enqueued': 0, 'recovered': 0, 'saved': 0, 'retries': 0, 'dead_lettered': 0, 'worker_errors': 0
+        }
+        self._last_error = None
+
+        os.makedirs(self._failed_dir, exist_ok=True)
+        self._recover()
+
+        self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+        self._thread.start()
+
+    # ---------- spool 文件 ----------
+
+    def _spool_path(self, item_id):
+        return os.path.join(self._spool_dir, f"{item_id}.json")
+
+    def _write_spool(self, item_id, record):
+        path = self._spool_path(item_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _remove_spool(self, item_id):
+        try:
+            os.remove(self._spool_path(item_id))
+        except FileNotFoundError:
+            pass
+
+    def _recover(self):
+        """加载上次未写入的问卷（按入队顺序）"""
+        for filename in sorted(os.listdir(self._spool_dir)):
+            if not filename.endswith('.json'):
+                continue
+            item_id = filename[:-len('.json')]
+            try:
+                with open(self._spool_path(item_id), encoding='utf-8') as f:
+                    record = json.load(f)
+                # 早期的 spool 文件没有 created_at，按条目ID中的入队时间补上
+                record.setdefault('created_at', utc_timestamp(int(item_id.split('-')[0]) / 1e9))
+                self._pending.append((item_id, record))
+                self._stats['recovered'] += 1
+            except (OSError, ValueError) as e:
+                print(f"恢复待写入问卷失败 {filename}: {e}")
+                os.replace(self._spool_path(item_id), os.path.join(self._failed_dir, filename))
+        if self._stats['recovered']:
+            print(f"恢复 {self._stats['recovered']} 份待写入问卷")
+
+    # ---------- 对外接口 ----------
+
+    def enqueue(self, **record):
+        """
+        问卷入队（先落盘再返回）
+
+        Args:
+            **record: save_complete_questionnaire 的参数；没有 created_at 时记为当前时间
+
+        Returns:
+            str: 队列条目ID
+
+        Raises:
+            RuntimeError: 队列已停止，或后台写入线程已退出（问卷不会被写入）
+        """
+        if not self._stopping and not self._thread.is_alive():
+            raise RuntimeError("后台写入线程已停止，问卷无法写入")
+        now = time.time_ns()
+        item_id = f"{now}-{uuid.uuid4().hex[:8]}"
+        record.setdefault('created_at', utc_timestamp(now / 1e9))
+        self._write_spool(item_id, record)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("写入队列已停止")
+            self._pending.append((item_id, record))
+            self._stats['enqueued'] += 1
+            self._cond.notify_all()
+        return item_id
+
+    def flush(self, timeout=None):
+        """
+        等待队列中的问卷全部写入
+
+        Returns:
+            bool: 是否在超时前写完
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """停止后台线程，未写入的问卷保留在 spool 目录中"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def get_stats(self):
+        """
+        获取队列统计
+
+        Returns:
+            dict: pending, enqueued, recovered, saved, retries, dead_lettered,
+                  worker_errors（后台线程的意外错误次数）, last_error, worker_alive
+        """
+        with self._cond:
+            return {
+                'pending': len(self._pending) + self._in_flight,
+                **self._stats,
+                'last_error': self._last_error,
+                'worker_alive': self._thread.is_alive()
+            }
+
+    # ---------- 后台线程 ----------
+
+    def _next_batch(self):
+        """等待并取出下一批，停止时返回 None"""
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return None
+
+            # 攒批：最多等待 flush_interval 秒
+            deadline = time.monotonic() + self._flush_interval
+            while len(self._pending) < self._batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [self._pending.popleft() for _ in range(min(self._batch_size, len(self._pending)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _write_batch(self, batch):
+        """
+        写入一批问卷
+
+        Returns:
+            list: 写入失败的条目
+        """
+        if self._save_many is not None:
+            try:
+                self._save_many([record for _, record in batch])
+                return []
+            except Exception as e:
+                print(f"批量写入问卷失败（{len(batch)} 条）: {e}")
+                if len(batch) == 1:
+                    return batch
+                # 整批失败时逐条重试，找出有问题的问卷
+
+        failed = []
+        for item in batch:
+            item_id, record = item
+            try:
+                self._save_one(**record)
+                self._remove_spool(item_id)
+            except Exception as e:
+                print(f"写入问卷失败 {item_id}: {e}")
+                failed.append(item)
+        return failed
+
+    def _process_batch(self, batch):
+        """
+        写入一批问卷并处理 spool 文件
+
+        Returns:
+            tuple: (写入成功条数, 需要重试的条目)
+        """
+        failed = self._write_batch(batch)
+        failed_ids = {item_id for item_id, _ in failed}
+        for item_id, _ in batch:
+            if item_id not in failed_ids:
+                self._remove_spool(item_id)
+                self._attempts.pop(item_id, None)
+
+        retry = []
+        for item_id, record in failed:
+            attempts = self._attempts.get(item_id, 0) + 1
+            if attempts >= self._max_attempts:
+                print(f"问卷 {item_id} 重试 {attempts} 次仍失败，移入 failed 目录")
+                try:
+                    os.replace(self._spool_path(item_id), os.path.join(self._failed_dir, f"{item_id}.json"))
+                except FileNotFoundError:
+                    print(f"问卷 {item_id} 的 spool 文件不存在，无法移入 failed 目录")
+                self._attempts.pop(item_id, None)
+                with self._cond:
+                    self._stats['dead_lettered'] += 1
+            else:
+                self._attempts[item_id] = attempts
+                retry.append((item_id, record))
+        return len(batch) - len(failed), retry
+
+    def _run(self):
+        delay = self._retry_delay
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                saved, retry = self._process_batch(batch)
+                error = None
+            except Exception as e:
+                # 意外错误不能让后台线程退出：整批放回队列，退避后重试
+                print(f"后台写入线程出错（{len(batch)} 条问卷稍后重试）: {e!r}")
+                saved, retry, error = 0, batch, e
+
+            with self._cond:
+                self._stats['saved'] += saved
+                self._stats['retries'] += len(retry)
+                if error is not None:
+                    self._stats['worker_errors'] += 1
+                    self._last_error = repr(error)
+                self._pending.extendleft(reversed(retry))
+                self._in_flight = 0
+                self._cond.notify_all()
+
+                if retry or error is not None:
+                    # 指数退避，停止时立即退出等待
+                    self._cond.wait(delay)
+                    delay = min(delay * 2, self._max_retry_delay)
+                else:
+                    delay = self._retry_delay
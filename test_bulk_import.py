@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# 历史问卷批量导入测试脚本
+
+import csv
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+import database
+import logic
+
+
+def test_bulk_import(temp_database, make_submissions):
+    """
+    测试批量导入：用户去重、分批提交、数据与单条保存一致
+    """
+    print("=== 测试批量导入 ===")
+
+    existing_id = database.get_or_create_user("导入用户0")
+    submissions = make_submissions(1200, 150)
+
+    progress = []
+    start = time.perf_counter()
+    count = database.bulk_import_questionnaires(submissions, chunk_size=500, progress_callback=progress.append)
+    elapsed = time.perf_counter() - start
+
+    assert count == 1200
+    assert progress == [500, 1000, 1200]
+
+    with database.get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM users")
+        assert c.fetchone()[0] == 150  # 已有用户被复用，没有重复创建
+        c.execute("SELECT COUNT(*) FROM complete_questionnaires WHERE user_id = ?", (existing_id,))
+        assert c.fetchone()[0] == 8
+        c.execute("SELECT bagang_type_code, wjw_scores, created_at FROM complete_questionnaires ORDER BY id LIMIT 1")
+        row = c.fetchone()
+
+    first = submissions[0]
+    assert row[0] == first["part1_result"]["user_info"]["type_code"]
+    assert json.loads(row[1]) == first["part2_result"]["constitution_scores"]
+    assert row[2] == first["created_at"]
+
+    print(f"✅ 导入 {count} 条问卷，用时 {elapsed:.2f} 秒")
+
+
+def test_bulk_import_flat_rows(temp_database):
+    """
+    测试导入表结构格式的记录（如其他实例导出的 JSONL / CSV）
+    """
+    print("\n=== 测试导入表结构格式 ===")
+
+    rows = [{
+        "nickname": "迁移用户",
+        "bagang_type_code": "CVDQ",
+        "bagang_type_name": "听风者",
+        "bagang_radar_data": {"cold": 50.0},
+        "wjw_main_constitution": "气虚质",
+        "wjw_main_score": "11",
+        "wjw_main_result": "是",
+        "raw_answers": '{"q_1": "A. 非常符合"}',
+        "created_at": ""
+    }]
+    assert database.bulk_import_questionnaires(rows) == 1
+
+    with database.get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT bagang_radar_data, wjw_main_score, raw_answers, answer_codes, created_at "
+                  "FROM complete_questionnaires")
+        radar, score, raw, answer_codes, created_at = c.fetchone()
+
+    assert json.loads(radar) == {"cold": 50.0}
+    assert score == 11
+    assert raw is None  # 答案只保存压缩编码
+    assert logic.decode_answer_codes(answer_codes) == {"q_1": "A. 非常符合"}
+    assert created_at is not None  # 空时间使用当前时间
+
+    print("✅ 表结构格式导入正确")
+
+
+def test_bulk_import_bad_records(temp_database, make_submissions):
+    """
+    测试缺少 nickname 的记录被跳过并报告；写入失败时异常说明已导入条数，之前的批次保留
+    """
+    print("\n=== 测试批量导入中的坏记录 ===")
+    submissions = make_submissions(30, 5)
+    submissions[3]["nickname"] = ""
+    del submissions[25]["nickname"]
+
+    invalid = []
+    count = database.bulk_import_questionnaires(
+        submissions, chunk_size=10, invalid_callback=lambda position, record: invalid.append(position)
+    )
+    assert count == 28 and invalid == [4, 26]
+
+    temp_database()
+    submissions = make_submissions(30, 5)
+    submissions[25]["created_at"] = object()  # 无法写入的值，第 3 批失败
+    try:
+        database.bulk_import_questionnaires(submissions, chunk_size=10)
+        assert False, "写入失败时应抛出 RuntimeError"
+    except RuntimeError as e:
+        assert "已导入 20 条" in str(e)
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM complete_questionnaires").fetchone()[0] == 20
+
+    print("✅ 坏记录被跳过，失败批次回滚且报告已导入条数")
+
+
+def test_reimport_export_csv(temp_database, make_submissions):
+    """
+    测试本应用导出的 CSV（中文表头）可以直接重新导入，再次导出的内容不变
+    """
+    print("\n=== 测试重新导入导出文件 ===")
+    database.bulk_import_questionnaires(make_submissions(30, 7))
+
+    def export():
+        filename = os.path.join(tempfile.mkdtemp(), "export.csv")
+        database.export_questionnaires(filename)
+        with open(filename, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+        return filename, rows[0], sorted(row[1:] for row in rows[1:])  # ID 由数据库重新分配
+
+    filename, headers, before = export()
+    temp_database()
+    assert database.bulk_import_questionnaires(database.iter_submission_file(filename)) == 30
+
+    _, _, after = export()
+    assert after == before and len(after) == 30
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 7
+        all_results = conn.execute("SELECT wjw_all_results FROM complete_questionnaires LIMIT 1").fetchone()[0]
+    assert set(json.loads(all_results)) == set(logic.WJW_CONSTITUTIONS)
+
+    print("✅ 导出文件重新导入后内容一致")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
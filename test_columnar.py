@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# 列式存储（数值列 + 压缩答案编码）测试脚本
+
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+import columnar
+import database
+import logic
+
+
+def test_answer_codes_roundtrip(make_submissions):
+    """
+    测试压缩答案编码 / 解码，以及由编码直接批量计算的结果与逐份计算一致
+    """
+    print("=== 测试答案编码 ===")
+    submissions = make_submissions(50, 5)
+    codes = [logic.encode_answer_codes(s["raw_answers"]) for s in submissions]
+    assert all(len(c) == logic.PACKED_ANSWERS_SIZE == 23 for c in codes)
+    assert logic.decode_answer_codes(codes[0]) == submissions[0]["raw_answers"]
+    assert len(json.dumps(submissions[0]["raw_answers"])) > 50 * len(codes[0])
+
+    # 未作答和无法识别的答案编码为 0，解码时不出现；session_state 中的其他键被忽略
+    partial = logic.encode_answer_codes({"q_1": "A. 非常符合", "q_2": "乱填", "wjw_q_33": 1, "user_id": 7})
+    assert logic.decode_answer_codes(partial) == {"q_1": "A. 非常符合", "wjw_q_33": "E. 完全不符"}
+
+    # 早期每题 1 字节的编码按长度识别
+    legacy = bytes(logic.answer_codes_to_matrix([codes[1]])[0].astype("uint8"))
+    assert len(legacy) == 61 and logic.decode_answer_codes(legacy) == submissions[1]["raw_answers"]
+    assert logic.pack_answer_matrix(logic.answer_codes_to_matrix([legacy])) == [codes[1]]
+    try:
+        logic.decode_answer_codes(b"\x00" * 10)
+        assert False, "长度不对的编码应抛出 ValueError"
+    except ValueError:
+        pass
+
+    codes[1] = legacy
+    bagang, wjw = logic.answer_codes_to_matrices(codes)
+    assert bagang.shape == (50, 28) and wjw.shape == (50, 33)
+    df_questions, df_types = logic.load_data()
+    bagang_result = logic.calculate_results_batch(bagang, df_questions, df_types)
+    wjw_result = logic.calculate_wjw_results_batch(wjw)
+    for i, s in enumerate(submissions):
+        assert bagang_result["type_code"].iloc[i] == s["part1_result"]["user_info"]["type_code"]
+        assert wjw_result["main_constitution"].iloc[i] == s["part2_result"]["main_constitution"]
+
+    # 判定只依赖得分
+    sums = np.array([[s["part2_result"]["constitution_scores"][c] for c in logic.WJW_CONSTITUTIONS]
+                     for s in submissions])
+    for results, s in zip(logic.judge_wjw_scores(sums), submissions):
+        expected = s["part2_result"]["constitution_results"]
+        assert list(results) == [expected[c]["result"] for c in logic.WJW_CONSTITUTIONS]
+
+    print("✅ 答案编码、解码和批量计算正确")
+
+
+def test_migration_backfills_columns(temp_database, make_submissions, tmp_path, monkeypatch):
+    """
+    测试迁移从 JSON 文本列回填数值列和答案编码，损坏的 JSON 对应列保持 NULL；
+    JSON 答案列只在手动清理时清空，且只清空编码能完整还原的行
+    """
+    print("\n=== 测试列式存储迁移 ===")
+    submissions = make_submissions(30, 3)
+    path = tmp_path / "json_only.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, nickname TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE complete_questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+        bagang_type_code TEXT, bagang_type_name TEXT, bagang_radar_data TEXT, bagang_energy_data TEXT,
+        bagang_answers TEXT, wjw_main_constitution TEXT, wjw_main_score INTEGER, wjw_main_result TEXT,
+        wjw_all_results TEXT, wjw_answers TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    INSERT INTO users (nickname) VALUES ('老用户');
+    """)
+    # 旧版数据没有 raw_answers 列，答案分存在 bagang_answers / wjw_answers 中
+    conn.executemany(
+        "INSERT INTO complete_questionnaires (user_id, bagang_radar_data, bagang_answers, wjw_answers) "
+        "VALUES (1, ?, ?, ?)",
+        [(json.dumps(s["part1_result"]["radar_chart"]), json.dumps(s["part1_answers"]),
+          json.dumps(s["part2_answers"])) for s in submissions]
+    )
+    conn.execute("INSERT INTO complete_questionnaires (user_id, bagang_radar_data, bagang_answers) "
+                 "VALUES (1, '{broken', 'null')")
+    # 含有题目以外的键，压缩编码无法完整保存
+    extra = dict(submissions[0]["part1_answers"], nickname="老用户")
+    conn.execute("INSERT INTO complete_questionnaires (user_id, bagang_answers) VALUES (1, ?)", (json.dumps(extra),))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "_BACKFILL_CHUNK_SIZE", 7)  # 多批回填
+    temp_database(path)
+
+    with database.get_db_connection() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(columnar.COLUMNS)} FROM complete_questionnaires ORDER BY id"
+        ).fetchall()
+    assert len(rows) == 32
+    for row, s in zip(rows, submissions):
+        radar = dict(zip(logic.DIMENSIONS, row[:8]))
+        assert radar == s["part1_result"]["radar_chart"]
+        assert row[8:17] == (None,) * 9  # 旧版数据没有 wjw_scores
+        assert logic.decode_answer_codes(row[17]) == s["raw_answers"]
+    assert tuple(rows[30]) == (None,) * len(columnar.COLUMNS)
+
+    # 迁移不修改 JSON 答案列
+    answers_query = "SELECT bagang_answers, wjw_answers FROM complete_questionnaires ORDER BY id"
+    with database.get_db_connection() as conn:
+        answers = conn.execute(answers_query).fetchall()
+    assert all(row[0] is not None for row in answers)
+
+    # 手动清理：先检查，只清空编码能完整还原的行
+    assert database.clear_legacy_answer_json(dry_run=True) == {"checked": 31, "cleared": 30, "kept": 1}
+    with database.get_db_connection() as conn:
+        assert conn.execute(answers_query).fetchall() == answers
+    assert database.clear_legacy_answer_json() == {"checked": 31, "cleared": 30, "kept": 1}
+    with database.get_db_connection() as conn:
+        answers = conn.execute(answers_query).fetchall()
+    assert all(tuple(row) == (None, None) for row in answers[:30])
+    assert answers[30][0] == "null" and json.loads(answers[31][0]) == extra
+
+    averages = database.get_score_averages()
+    assert averages["count"] == 31  # 含多余键的一行也有答案编码
+    expected = np.mean([s["part1_result"]["radar_chart"]["cold"] for s in submissions])
+    assert abs(averages["radar"]["cold"] - expected) < 0.01
+    assert averages["wjw_scores"]["平和质"] is None
+
+    print("✅ 迁移回填正确，损坏数据保持为空")
+
+
+def test_published_migrations_answer_codes(tmp_path, make_submissions):
+    """
+    测试已发布的迁移 5 仍写入每题 1 字节的答案编码，由迁移 6 打包为压缩编码
+    """
+    print("\n=== 测试答案编码迁移 ===")
+    submission = make_submissions(1, 1)[0]
+    conn = sqlite3.connect(tmp_path / "v4.db")
+    c = conn.cursor()
+    for migration in database.MIGRATIONS[:4]:
+        migration(c)
+    c.execute("INSERT INTO users (nickname) VALUES ('老用户')")
+    c.execute("INSERT INTO complete_questionnaires (user_id, raw_answers) VALUES (1, ?)",
+              (json.dumps(submission["raw_answers"]),))
+    codes_query = "SELECT answer_codes FROM complete_questionnaires"
+
+    database.MIGRATIONS[4](c)
+    legacy = c.execute(codes_query).fetchone()[0]
+    assert len(legacy) == len(logic.ANSWER_KEYS) == 61
+    database.MIGRATIONS[5](c)
+    packed = c.execute(codes_query).fetchone()[0]
+    assert packed == logic.encode_answer_codes(submission["raw_answers"])
+    assert logic.decode_answer_codes(packed) == logic.decode_answer_codes(legacy) == submission["raw_answers"]
+    conn.close()
+
+    print("✅ 迁移 5 写入旧编码，迁移 6 重新打包")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
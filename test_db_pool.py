@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# SQLite 连接池测试脚本
+
+import os
+import tempfile
+import threading
+import time
+
+import database
+
+
+def _make_pool(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    return database.DatabasePool(db_path=path, **kwargs)
+
+
+def test_bounded_checkout():
+    """
+    测试连接数有上限：池满时阻塞等待，有连接归还后继续，等待超时抛出 PoolTimeout
+    """
+    print("=== 测试连接池上限 ===")
+    pool = _make_pool(max_connections=2, timeout=0.2)
+    holders = []
+    release = threading.Event()
+
+    def hold():
+        conn = pool.get_connection()
+        holders.append(conn)
+        release.wait()
+        pool.release_connection(conn)
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for t in threads:
+        t.start()
+    while len(holders) < 2:
+        time.sleep(0.01)
+
+    try:
+        pool.get_connection()
+        assert False, "池满时应等待超时"
+    except database.PoolTimeout:
+        pass
+
+    # 另一个线程归还后，等待中的借出拿到被归还的连接，不会新建连接
+    threading.Timer(0.05, release.set).start()
+    pool.timeout = 5
+    conn = pool.get_connection()
+    assert conn in holders
+    pool.release_connection(conn)
+    for t in threads:
+        t.join()
+
+    stats = pool.stats()
+    assert stats["open_connections"] == stats["creations"] == 2
+    assert stats["in_use_connections"] == 0
+    assert stats["waits"] == 2 and stats["timeouts"] == 1
+    pool.close_all()
+
+    print("✅ 连接数不超过上限")
+
+
+def test_reentrant_lease():
+    """
+    测试同一线程嵌套借出返回同一个连接，内层归还不影响外层；归还时回滚未提交的事务
+    """
+    print("\n=== 测试嵌套借出 ===")
+    pool = _make_pool(max_connections=1, timeout=0.1)
+    outer = pool.get_connection()
+    outer.execute("CREATE TABLE t (x INTEGER)")
+    inner = pool.get_connection()
+    assert inner is outer
+    pool.release_connection(inner)
+
+    # 内层归还后外层仍持有连接，其他线程借不到
+    errors = []
+    t = threading.Thread(target=lambda: errors.append(_try_checkout(pool)))
+    t.start()
+    t.join()
+    assert errors == ["timeout"]
+
+    outer.execute("INSERT INTO t VALUES (1)")  # 未提交
+    pool.release_connection(outer)
+    conn = pool.get_connection()
+    assert conn is outer and conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release_connection(conn)
+
+    try:
+        pool.release_connection(conn)
+        assert False, "重复归还应报错"
+    except database.sqlite3.ProgrammingError:
+        pass
+
+    stats = pool.stats()
+    assert stats["reentrant_checkouts"] == 1 and stats["creations"] == 1
+    pool.close_all()
+
+    print("✅ 嵌套借出共用连接")
+
+
+def _try_checkout(pool):
+    try:
+        conn = pool.get_connection()
+    except database.PoolTimeout:
+        return "timeout"
+    pool.release_connection(conn)
+    return "ok"
+
+
+def test_stale_connection_replaced():
+    """
+    测试空闲较久的连接借出前检查，已关闭的连接被丢弃并重建
+    """
+    print("\n=== 测试失效连接 ===")
+    pool = _make_pool(max_connections=1, health_check_idle=0)
+    conn = pool.get_connection()
+    pool.release_connection(conn)
+    conn.close()
+
+    fresh = pool.get_connection()
+    assert fresh is not conn and fresh.execute("SELECT 1").fetchone()[0] == 1
+    pool.release_connection(fresh)
+    stats = pool.stats()
+    assert stats["discarded"] == 1 and stats["creations"] == 2 and stats["open_connections"] == 1
+    pool.close_all()
+
+    print("✅ 失效连接已重建")
+
+
+def test_concurrent_stress():
+    """
+    测试多线程并发读写：连接数不超过上限，所有写入都成功
+    """
+    print("\n=== 测试并发读写 ===")
+    pool = _make_pool(max_connections=3)
+    conn = pool.get_connection()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    pool.release_connection(conn)
+
+    def worker(i):
+        for j in range(50):
+            conn = pool.get_connection()
+            try:
+                nested = pool.get_connection()
+                nested.execute("INSERT INTO t VALUES (?)", (i * 100 + j,))
+                pool.release_connection(nested)
+                conn.commit()
+            finally:
+                pool.release_connection(conn)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    conn = pool.get_connection()
+    assert conn.execute("SELECT COUNT(DISTINCT x) FROM t").fetchone()[0] == 16 * 50
+    pool.release_connection(conn)
+    stats = pool.stats()
+    assert stats["creations"] <= 3 and stats["in_use_connections"] == 0
+    assert stats["checkouts"] == 16 * 50 + 2
+    pool.close_all()
+
+    print(f"✅ 16 个线程共用 {stats['creations']} 个连接")
+
+
+if __name__ == "__main__":
+    print("开始连接池测试...\n")
+
+    success = True
+    for test in (
+        test_bounded_checkout,
+        test_reentrant_lease,
+        test_stale_connection_replaced,
+        test_concurrent_stress,
+    ):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！连接池功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
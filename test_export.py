@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# 数据流式导出测试脚本
+
+import csv
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pytest
+from supabase import create_client
+
+import database
+import columnar
+import database_supabase
+import exporter
+
+
+def test_streaming_export(temp_database, make_submissions):
+    """
+    测试 Excel / CSV 流式导出：列、内容、进度回调
+    """
+    print("=== 测试流式导出 ===")
+    submissions = make_submissions(2500, 100)
+    database.bulk_import_questionnaires(submissions)
+    tmp_dir = tempfile.mkdtemp()
+
+    progress = []
+    xlsx = database.export_to_excel(os.path.join(tmp_dir, "export.xlsx"), progress_callback=progress.append)
+    assert progress == [1000, 2000, 2500]
+
+    df = pd.read_excel(xlsx)
+    assert list(df.columns) == exporter.EXPORT_HEADERS
+    assert len(df) == 2500
+
+    # 按提交时间倒序，最后一份提交（1月28日）排在最前
+    latest = max(range(len(submissions)), key=lambda i: (submissions[i]["created_at"], i))
+    row = df[df["ID"] == latest + 1].iloc[0]
+    submission = submissions[latest]
+    part1, part2 = submission["part1_result"], submission["part2_result"]
+    assert row["提交时间"] == submission["created_at"] == df["提交时间"].iloc[0]
+    assert row["八纲体质代码"] == part1["user_info"]["type_code"]
+    assert row["八纲雷达数据"] == ", ".join(f"{k}:{v}" for k, v in part1["radar_chart"].items())
+    assert row["八纲能量数据"] == ", ".join(f"{bar['label']}:{bar['val']}" for bar in part1["energy_bars"])
+    assert row["卫健委主要体质"] == part2["main_constitution"]
+    for ctype in exporter.CONSTITUTION_TYPES:
+        assert row[ctype] == part2["constitution_scores"][ctype]
+    assert row["卫健委各体质结果"] == ", ".join(
+        f"{ctype}({v['score']}分-{v['result']})" for ctype, v in part2["constitution_results"].items()
+    )
+    assert row["原始答案"].startswith("Q1:")
+    assert row["原始答案"].split("; ")[28].startswith("W1:")
+
+    csv_path = database.export_to_csv(os.path.join(tmp_dir, "export.csv"))
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == exporter.EXPORT_HEADERS
+    assert len(rows) == 2501
+
+    print("✅ Excel / CSV 导出内容正确")
+
+
+def test_export_missing_columns():
+    """
+    测试缺少列式数据（旧数据 JSON 损坏、无法回填）的行导出为空白，不影响其他行
+    """
+    print("\n=== 测试缺失数据导出 ===")
+    row = exporter.export_row({"id": 1, "nickname": "用户\x01", "radar_cold": 50.0, "wjw_qixu": 3})
+    assert row[4:6] == ["", ""]
+    assert row[9:18] == [None] * 9
+    assert row[-3:-1] == ["", ""]
+
+    path = os.path.join(tempfile.mkdtemp(), "bad.xlsx")
+    exporter.write_rows(path, exporter.EXPORT_HEADERS, [row])
+    assert pd.read_excel(path)["用户昵称"].iloc[0] == "用户"  # Excel 不允许的控制字符被去掉
+
+    print("✅ 缺失数据导出为空白")
+
+
+def _legacy_json(submission):
+    """问卷在旧版 JSON 文本列中的值（顺序见 exporter.EXPORT_LEGACY_COLUMNS）"""
+    return [
+        json.dumps(submission["part1_result"]["radar_chart"]),
+        json.dumps(submission["part2_result"]["constitution_scores"]),
+        json.dumps(submission["raw_answers"]),
+        json.dumps(submission["part1_answers"]),
+        json.dumps(submission["part2_answers"]),
+    ]
+
+
+def test_export_legacy_json_fallback(make_submissions):
+    """
+    测试尚未回填列式存储的行（列式数据为空、附带 JSON 文本列）导出内容与回填后一致
+    """
+    print("\n=== 测试未回填数据导出 ===")
+    legacy = _legacy_json(make_submissions(1, 1)[0])
+    backfilled = {"id": 1, "nickname": "用户", "created_at": "2025-01-01 12:00:00",
+                  **dict(zip(columnar.COLUMNS, columnar.column_values_from_json(*legacy)))}
+    expected = exporter.export_row(backfilled)
+    assert "" not in expected[4:6] and None not in expected[9:18] and "" not in expected[-3:-1]
+
+    row = [backfilled.get(col) if col not in columnar.COLUMNS else None for col in exporter.EXPORT_SOURCE_COLUMNS]
+    assert exporter.export_row(tuple(row + legacy)) == expected
+    assert exporter.export_row({**dict(zip(exporter.EXPORT_SOURCE_COLUMNS, row)),
+                                **dict(zip(exporter.EXPORT_LEGACY_COLUMNS, legacy))}) == expected
+    # 已回填的行附带的 JSON 列为 NULL，按原样导出
+    assert exporter.export_row(tuple(row + [None] * len(legacy))) == exporter.export_row(tuple(row))
+
+    print("✅ 未回填的行由 JSON 文本列导出")
+
+
+def test_empty_export(temp_database, tmp_path):
+    """
+    测试没有问卷时不生成文件，返回 None（与 PostgreSQL / Supabase 后端一致）
+    """
+    print("\n=== 测试空数据导出 ===")
+    for name in ["empty.csv", "empty.xlsx"]:
+        path = tmp_path / name
+        assert database.export_questionnaires(str(path)) is None
+        assert not path.exists()
+
+    print("✅ 没有问卷时不生成文件")
+
+
+# Supabase 导出用的问卷行：历史数据的提交时间与 id 顺序不一致，两行提交时间相同；id 5 尚未回填列式存储
+_SUPABASE_ROWS = [
+    {"id": 2, "created_at": "2025-03-01T12:00:00+00:00", "users": {"nickname": "乙"}, "answer_codes": "\\x00"},
+    {"id": 9, "created_at": "2025-02-01T12:00:00+00:00", "users": {"nickname": "丙"}, "answer_codes": "\\x00"},
+    {"id": 5, "created_at": "2025-02-01T12:00:00+00:00", "users": {"nickname": "丁"}, "answer_codes": None},
+    {"id": 7, "created_at": "2025-01-01T12:00:00+00:00", "users": {"nickname": "甲"}, "answer_codes": "\\x00"},
+]
+
+
+class _ExportStandIn(BaseHTTPRequestHandler):
+    """只实现导出用到的查询：按 (created_at, id) 倒序和 keyset 条件返回一页，按 id 取 JSON 文本列"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        if "id" in query:
+            self.server.legacy_queries.append(query)
+            ids = query["id"][0].removeprefix("in.(").removesuffix(")").split(",")
+            return self._send([{"id": int(i), **self.server.legacy[int(i)]} for i in ids])
+        self.server.queries.append(query)
+        rows = sorted(_SUPABASE_ROWS, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        if "or" in query:
+            created_at, last_id = self.server.last_key
+            rows = [r for r in rows if (r["created_at"], r["id"]) < (created_at, last_id)]
+        rows = rows[:int(query["limit"][0])]
+        if rows:
+            self.server.last_key = (rows[-1]["created_at"], rows[-1]["id"])
+        self._send(rows)
+
+    def _send(self, rows):
+        payload = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def test_supabase_export_order(monkeypatch, make_submissions):
+    """
+    测试 Supabase 导出与 SQLite / PostgreSQL 一样按 (created_at, id) 倒序，翻页条件使用同一组键；
+    尚未回填的行补上 JSON 文本列
+    """
+    print("\n=== 测试 Supabase 导出顺序 ===")
+    legacy = _legacy_json(make_submissions(1, 1)[0])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ExportStandIn)
+    server.queries = []
+    server.legacy_queries = []
+    server.legacy = {5: dict(zip(exporter.EXPORT_LEGACY_COLUMNS, legacy))}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(database_supabase, "supabase",
+                        create_client(f"http://127.0.0.1:{server.server_port}", "test-key"))
+    try:
+        rows = list(database_supabase._iter_export_rows(page_size=2))
+    finally:
+        server.shutdown()
+
+    assert [row["id"] for row in rows] == [2, 9, 5, 7]
+    assert all(q["order"] == ["created_at.desc,id.desc"] for q in server.queries)
+    assert "or" not in server.queries[0]
+    assert server.queries[1]["or"] == [
+        '(created_at.lt."2025-02-01T12:00:00+00:00",and(created_at.eq."2025-02-01T12:00:00+00:00",id.lt.9))'
+    ]
+    # 只为未回填的行多取一次 JSON 文本列
+    assert [q["id"] for q in server.legacy_queries] == [["in.(5)"]]
+    assert [row["bagang_radar_data"] for row in rows if "bagang_radar_data" in row] == [legacy[0]]
+    radar = exporter.export_row(rows[2])[4]
+    assert radar and radar == exporter.export_row(
+        dict(zip(columnar.COLUMNS, columnar.column_values_from_json(*legacy))))[4]
+
+    print("✅ Supabase 导出顺序与其他后端一致")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
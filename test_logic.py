@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# 体质计算逻辑测试脚本
+
+import os
+import random
+import shutil
+import tempfile
+
+import numpy as np
+
+import logic
+
+
+def _random_sessions(n, seed=42):
+    """生成随机答题记录（含未作答和带分数格式）"""
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(n):
+        session = {}
+        for qid in range(1, 29):
+            if i % 5 == 0 and rng.random() < 0.2:
+                continue  # 模拟漏答
+            session[f"q_{qid}"] = rng.choice(logic.ANSWER_OPTIONS)
+        if i % 7 == 0:
+            session["q_3"] = "B. 比较符合 (4分)"
+        sessions.append(session)
+    return sessions
+
+
+def test_batch_matches_single():
+    """
+    测试批量计算与单份计算结果完全一致
+    """
+    print("=== 测试八纲批量计算 ===")
+    df_questions, df_types = logic.load_data()
+    sessions = _random_sessions(500)
+
+    batch = logic.calculate_results_batch(sessions, df_questions, df_types)
+    assert len(batch) == len(sessions)
+
+    for i, session in enumerate(sessions):
+        single = logic.calculate_results(session, df_questions, df_types)
+        info = single["user_info"]
+        assert batch["type_code"].iloc[i] == info["type_code"]
+        assert batch["type_name"].iloc[i] == info["type_name"]
+        assert batch["health_level"].iloc[i] == info["health_level"]
+        assert round(batch["magnitude"].iloc[i], 1) == info["magnitude"]
+        for dim in logic.DIMENSIONS:
+            assert batch[dim].iloc[i] == single["radar_chart"][dim]
+
+    print(f"✅ {len(sessions)} 份答卷批量与单份结果一致")
+
+
+def test_batch_accepts_score_matrix():
+    """
+    测试分数矩阵输入与选项文本输入等价
+    """
+    print("\n=== 测试分数矩阵输入 ===")
+    df_questions, _ = logic.load_data()
+    sessions = _random_sessions(50, seed=7)
+
+    question_ids = df_questions["id"].tolist()
+    matrix = logic.answers_to_matrix(sessions, question_ids)
+    assert matrix.shape == (50, 28)
+
+    from_text = logic.calculate_results_batch(sessions, df_questions)
+    from_matrix = logic.calculate_results_batch(matrix, df_questions)
+    assert (from_text["type_code"] == from_matrix["type_code"]).all()
+    assert np.array_equal(from_text[logic.DIMENSIONS].to_numpy(), from_matrix[logic.DIMENSIONS].to_numpy())
+
+    print("✅ 分数矩阵与选项文本结果一致")
+
+
+def test_scoring_plan_bounds():
+    """
+    测试计分方案按题目数量和权重推导归一化上下限
+    """
+    print("\n=== 测试计分方案 ===")
+    df_questions = logic.load_questions()
+    plan = df_questions.attrs["scoring_plan"]
+    assert plan["weights"].shape == (8, 28)
+    cold = logic.DIMENSIONS.index("cold")
+    assert (plan["lower"][cold], plan["upper"][cold]) == (3, 15)
+
+    # 删掉一道寒证题后，上下限随之变化，全选A仍然是100分
+    reduced = df_questions[df_questions["id"] != 1].reset_index(drop=True)
+    reduced_plan = logic.get_scoring_plan(reduced)
+    assert (reduced_plan["lower"][cold], reduced_plan["upper"][cold]) == (2, 10)
+    all_a = {f"q_{qid}": logic.ANSWER_OPTIONS[0] for qid in reduced["id"]}
+    result = logic.calculate_results_batch([all_a], reduced)
+    assert result["cold"].iloc[0] == 100
+
+    # 权重翻倍的题目贡献两倍原始分
+    weighted = df_questions.copy()
+    weighted.loc[weighted["id"] == 1, "weight"] = 2
+    weighted_plan = logic.get_scoring_plan(logic._attach_scoring_plan(weighted))
+    assert (weighted_plan["lower"][cold], weighted_plan["upper"][cold]) == (4, 20)
+
+    print("✅ 计分方案上下限正确")
+
+
+def test_wjw_batch_matches_single():
+    """
+    测试卫健委批量判定与单份判定一致（含平和质反向计分）
+    """
+    print("\n=== 测试卫健委批量计算 ===")
+    df_wjw = logic.load_wjw_data()
+    rng = random.Random(3)
+    sessions = []
+    for i in range(500):
+        # 一部分答卷只选C/D/E，覆盖平和质"是/基本是"分支
+        options = logic.ANSWER_OPTIONS[2:] if i % 3 == 0 else logic.ANSWER_OPTIONS
+        sessions.append({f"wjw_q_{qid}": rng.choice(options) for qid in range(1, 34)})
+
+    batch = logic.calculate_wjw_results_batch(sessions)
+    for i, session in enumerate(sessions):
+        single = logic.calculate_wjw_results(session, df_wjw)
+        assert batch["main_constitution"].iloc[i] == single["main_constitution"]
+        assert batch["main_score"].iloc[i] == single["main_score"]
+        assert batch["main_result"].iloc[i] == single["main_result"]
+        for constitution, data in single["constitution_results"].items():
+            assert batch[constitution].iloc[i] == data["score"]
+            assert batch[f"{constitution}判定"].iloc[i] == data["result"]
+
+    # 全选E：偏颇体质各4分，平和质 = 1 + 4×5 = 21 分，判定为"是"
+    all_e = {f"wjw_q_{qid}": logic.ANSWER_OPTIONS[-1] for qid in range(1, 34)}
+    result = logic.calculate_wjw_results(all_e, df_wjw)
+    assert result["constitution_scores"]["平和质"] == 21
+    assert result["constitution_results"]["平和质"]["result"] == "是"
+
+    print(f"✅ {len(sessions)} 份卫健委答卷批量与单份结果一致")
+
+
+def test_workbook_cache():
+    """
+    测试 Excel 题库缓存：未改动时不再解析 Excel，修改时间变化后重新解析
+    """
+    print("\n=== 测试题库缓存 ===")
+    tmp_dir = tempfile.mkdtemp()
+    original_cache_dir = logic.CACHE_DIR
+    original_read_excel = logic.pd.read_excel
+    parse_count = [0]
+
+    def counting_read_excel(*args, **kwargs):
+        parse_count[0] += 1
+        return original_read_excel(*args, **kwargs)
+
+    try:
+        logic.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        logic.pd.read_excel = counting_read_excel
+        workbook = os.path.join(tmp_dir, "database.xlsx")
+        shutil.copy("database.xlsx", workbook)
+
+        first = logic.read_workbook(workbook)
+        assert set(first) >= {"Questions", "Types"}
+        assert parse_count[0] == 1  # 一次打开读取全部工作表
+
+        second = logic.read_workbook(workbook)
+        assert parse_count[0] == 1  # 命中缓存
+        assert second["Questions"].equals(first["Questions"])
+
+        stat = os.stat(workbook)
+        os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        logic.read_workbook(workbook)
+        assert parse_count[0] == 2  # 文件改动后重新解析
+    finally:
+        logic.pd.read_excel = original_read_excel
+        logic.CACHE_DIR = original_cache_dir
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✅ 题库缓存命中与失效正确")
+
+
+def test_question_bank_shared_and_read_only():
+    """
+    测试进程级题库只加载一次，且修改视图不影响共享数据
+    """
+    print("\n=== 测试进程级题库 ===")
+    bank = logic.get_question_bank()
+    assert logic.get_question_bank() is bank
+    assert len(bank.questions) == 28 and len(bank.wjw_questions) == 33
+    assert "CVDQ" in bank.types.index
+
+    view = bank.questions
+    view.loc[0, "dimension"] = "heat"
+    assert bank.questions.loc[0, "dimension"] == "cold"
+    assert not bank.scoring_plan["weights"].flags.writeable
+
+    print("✅ 题库共享且只读")
+
+
+if __name__ == "__main__":
+    print("开始体质计算逻辑测试...\n")
+
+    success = True
+    for test in (
+        test_batch_matches_single,
+        test_batch_accepts_score_matrix,
+        test_scoring_plan_bounds,
+        test_wjw_batch_matches_single,
+        test_workbook_cache,
+        test_question_bank_shared_and_read_only,
+    ):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！体质计算功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
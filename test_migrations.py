@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# 数据库迁移测试脚本
+
+import sqlite3
+
+import pytest
+
+import database
+
+
+def test_fresh_database(temp_database):
+    """
+    测试新数据库一次迁移到最新版本，重复初始化不再执行 DDL
+    """
+    print("=== 测试新数据库迁移 ===")
+
+    statements = []
+    with database.get_db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+        conn.set_trace_callback(statements.append)
+        database.migrate_db(conn)
+        conn.set_trace_callback(None)
+
+    assert statements == ["PRAGMA user_version"]
+    print("✅ 新数据库迁移完成，重复初始化只检查版本号")
+
+
+def test_legacy_database_upgrade(temp_database, tmp_path):
+    """
+    测试缺少 wjw_scores / raw_answers 列的旧数据库可以升级且保留数据
+    """
+    print("\n=== 测试旧数据库升级 ===")
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, nickname TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE complete_questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+        bagang_type_code TEXT, bagang_type_name TEXT, bagang_radar_data TEXT, bagang_energy_data TEXT,
+        bagang_answers TEXT, wjw_main_constitution TEXT, wjw_main_score INTEGER, wjw_main_result TEXT,
+        wjw_all_results TEXT, wjw_answers TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    INSERT INTO users (nickname) VALUES ('老用户');
+    INSERT INTO complete_questionnaires (user_id, bagang_type_code) VALUES (1, 'CVDQ');
+    """)
+    conn.close()
+
+    temp_database(path)
+
+    with database.get_db_connection() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(complete_questionnaires)")}
+        assert {"wjw_scores", "raw_answers"} <= columns
+        assert conn.execute("SELECT bagang_type_code FROM complete_questionnaires").fetchone()[0] == "CVDQ"
+
+    print("✅ 旧数据库升级成功，已有数据保留")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# 昵称子串搜索测试脚本
+
+import pytest
+
+import database
+
+NICKNAMES = ["赛博本草", "本草纲目", "小明同学", "Alice_W", "alice100%", "BOB", "bobby", "阿草", "草"]
+
+
+def _import_users(nicknames, template):
+    database.bulk_import_questionnaires({**template, "nickname": name} for name in nicknames)
+
+
+def _expected(term, nicknames):
+    return sorted(name for name in nicknames if term.lower() in name.lower())
+
+
+def _search(term):
+    return sorted(row["nickname"] for row in database.search_questionnaires(nickname=term))
+
+
+def test_nickname_search_matches_substring(temp_database, make_submissions):
+    """
+    测试各种长度的关键词（含 % _ " 等特殊字符）与子串匹配结果一致
+    """
+    print("=== 测试昵称子串搜索 ===")
+    _import_users(NICKNAMES, make_submissions(1, 1)[0])
+
+    for term in ["本草", "本草纲", "草纲目", "赛博本草", "ALICE", "ice_", "100%", "_", "%", "bob", "Bob", "草",
+                 '"本草', "不存在的昵称"]:
+        assert _search(term) == _expected(term, NICKNAMES), term
+
+    # 3 个字符以上走 FTS 索引
+    with database.get_db_connection() as conn:
+        c = conn.cursor()
+        where, params = database._questionnaire_filters(c, nickname="本草纲")
+        plan = [row[3] for row in c.execute("EXPLAIN QUERY PLAN " + database._QUESTIONNAIRE_LIST_QUERY + where, params)]
+    assert any("users_fts VIRTUAL TABLE" in step for step in plan), plan
+
+    print("✅ 昵称搜索结果正确")
+
+
+def test_nickname_index_follows_users(temp_database, make_submissions):
+    """
+    测试修改、删除用户后搜索索引同步更新
+    """
+    print("\n=== 测试搜索索引同步 ===")
+    _import_users(NICKNAMES, make_submissions(1, 1)[0])
+
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE users SET nickname = '赛博中医' WHERE nickname = '赛博本草'")
+        conn.execute("DELETE FROM complete_questionnaires WHERE user_id = (SELECT id FROM users WHERE nickname = 'BOB')")
+        conn.execute("DELETE FROM users WHERE nickname = 'BOB'")
+        conn.commit()
+
+    assert _search("赛博本") == []
+    assert _search("赛博中") == ["赛博中医"]
+    assert _search("bob") == ["bobby"]
+    with database.get_db_connection() as conn:
+        matches = conn.execute("SELECT rowid FROM users_fts WHERE users_fts MATCH '\"BOB\"'").fetchall()
+    assert len(matches) == 1
+
+    print("✅ 搜索索引随用户表更新")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
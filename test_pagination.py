@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# 问卷游标分页测试脚本
+
+import pytest
+
+import database
+import pagination
+
+
+def _all_pages(page_size, **filters):
+    """从第一页翻到最后一页"""
+    pages = [database.get_questionnaires_page(page_size, **filters)]
+    while pages[-1]["next_cursor"]:
+        pages.append(database.get_questionnaires_page(page_size, cursor=pages[-1]["next_cursor"], **filters))
+    return pages
+
+
+def test_keyset_pages_cover_all_rows(temp_database, make_submissions):
+    """
+    测试逐页读取与一次性查询的结果和顺序完全一致（大量相同提交时间）
+    """
+    print("=== 测试游标分页 ===")
+    database.bulk_import_questionnaires(make_submissions(1000, 60))
+
+    expected = [row["id"] for row in database.search_questionnaires()]
+    pages = _all_pages(97)
+    assert [row["id"] for page in pages for row in page["items"]] == expected
+    assert len(pages) == 11 and len(pages[-1]["items"]) == 1000 - 97 * 10
+    assert pages[0]["total"] == 1000 and not pages[0]["total_is_estimate"]
+    assert pages[1]["total"] is None  # 只在第一页计数
+
+    # 带筛选条件
+    filters = {"nickname": "导入用户1", "start_date": "2025-01-10"}
+    expected = [row["id"] for row in database.search_questionnaires(**filters)]
+    pages = _all_pages(20, **filters)
+    assert [row["id"] for page in pages for row in page["items"]] == expected
+    assert pages[0]["total"] == len(expected)
+
+    print(f"✅ 分页结果与一次性查询一致（{len(expected)} 条筛选结果）")
+
+
+def test_keyset_stable_under_inserts(temp_database, make_submissions):
+    """
+    测试翻页过程中插入新问卷不会导致重复或漏行
+    """
+    print("\n=== 测试翻页时插入 ===")
+    submissions = make_submissions(300, 10)
+    database.bulk_import_questionnaires(submissions)
+    before = [row["id"] for row in database.search_questionnaires()]
+
+    first = database.get_questionnaires_page(100)
+    database.bulk_import_questionnaires(submissions[:50])  # 新插入的问卷
+    seen = [row["id"] for row in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = database.get_questionnaires_page(100, cursor=cursor)
+        seen += [row["id"] for row in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert len(seen) == len(set(seen))
+    assert set(before) <= set(seen)
+
+    print("✅ 翻页期间插入不重复、不漏行")
+
+
+def test_page_limits_and_cursor_validation(temp_database, make_submissions):
+    """
+    测试每页条数上限、计数上限和无效游标
+    """
+    print("\n=== 测试分页参数 ===")
+    database.bulk_import_questionnaires(make_submissions(120, 10))
+
+    assert len(database.get_questionnaires_page(100000)["items"]) == 120
+    assert pagination.clamp_page_size(100000) == pagination.MAX_PAGE_SIZE
+    assert pagination.clamp_page_size(0) == 1
+    assert pagination.clamp_page_size("abc") == pagination.DEFAULT_PAGE_SIZE
+
+    original_limit = pagination.COUNT_LIMIT
+    try:
+        pagination.COUNT_LIMIT = 50
+        page = database.get_questionnaires_page(10, nickname="导入用户")
+        assert page["total"] == 50 and page["total_is_estimate"]
+    finally:
+        pagination.COUNT_LIMIT = original_limit
+
+    cursor = pagination.encode_cursor("2025-01-01 12:00:00", 42)
+    assert pagination.decode_cursor(cursor) == ("2025-01-01 12:00:00", 42)
+    for bad in ["not-a-cursor", pagination.encode_cursor("2025-01-01", 1)[:-2] + "!!"]:
+        try:
+            database.get_questionnaires_page(10, cursor=bad)
+            assert False, "无效游标应抛出 ValueError"
+        except ValueError:
+            pass
+
+    print("✅ 分页参数校验正确")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
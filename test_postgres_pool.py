@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# PostgreSQL 连接池借出逻辑测试（用内存中的替身连接，不需要数据库）
+
+import psycopg2
+import pytest
+
+import database_postgres
+
+
+class _StandInConnection:
+    def __init__(self, closed=False):
+        self.closed = closed
+        self.last_used = database_postgres.time.monotonic()
+
+    def close(self):
+        self.closed = True
+
+
+class _StandInPool:
+    """与 _BoundedConnectionPool 接口相同：先借出空闲连接，没有时新建"""
+
+    def __init__(self, idle, minconn, new_connections_broken=False):
+        self.idle = list(idle)
+        self.minconn = minconn
+        self.new_connections_broken = new_connections_broken
+        self.created = []
+        self.in_use = 0
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop(0)
+        conn = _StandInConnection(closed=self.new_connections_broken)
+        self.created.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+
+    def checkout(self, timeout):
+        self.in_use += 1
+        return self.getconn()
+
+    def release(self, conn, close=False):
+        if conn is not None:
+            self.putconn(conn, close=close)
+        self.in_use -= 1
+
+
+def test_stale_idle_connections_replaced(monkeypatch):
+    """
+    测试换来的空闲连接同样失效时继续更换，直到拿到可用连接
+    """
+    print("=== 测试失效连接更换 ===")
+    stale = [_StandInConnection(closed=True) for _ in range(3)]
+    pool = _StandInPool(stale, minconn=3)
+    monkeypatch.setattr(database_postgres, "_get_pool", lambda: pool)
+
+    checked_out_pool, conn = database_postgres._checkout()
+    assert checked_out_pool is pool and conn is pool.created[0] and not conn.closed
+    assert pool.idle == [] and len(pool.created) == 1 and pool.in_use == 1
+
+    print("✅ 失效的空闲连接全部丢弃，借出新建的连接")
+
+
+def test_unusable_replacement_raises(monkeypatch):
+    """
+    测试新建的连接也不可用时抛出 OperationalError，并交还借出名额
+    """
+    print("\n=== 测试新建连接不可用 ===")
+    pool = _StandInPool([_StandInConnection(closed=True)], minconn=1, new_connections_broken=True)
+    monkeypatch.setattr(database_postgres, "_get_pool", lambda: pool)
+
+    with pytest.raises(psycopg2.OperationalError, match="数据库连接不可用"):
+        database_postgres._checkout()
+    assert len(pool.created) == 2 and pool.in_use == 0
+
+    print("✅ 新建连接不可用时报错")
+
+
+if __name__ == "__main__":
+    # 测试用到 pytest 的 monkeypatch 夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# 查询计划回归测试：按日期筛选必须走 created_at 索引的范围扫描
+
+import pytest
+
+import database
+
+
+def _sqlite_plan(sql, params):
+    with database.get_db_connection() as conn:
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def test_sqlite_date_filter_uses_index(temp_database, make_submissions):
+    """
+    测试 SQLite 的日期筛选和翻页查询使用 idx_complete_created_at 范围扫描
+    """
+    print("=== 测试 SQLite 查询计划 ===")
+    database.bulk_import_questionnaires(make_submissions(200, 20))
+
+    with database.get_db_connection() as conn:
+        where, params = database._questionnaire_filters(conn.cursor(), start_date="2025-01-03", end_date="2025-01-05")
+    assert params == ["2025-01-03", "2025-01-06"]  # 半开区间 [开始日期, 结束日期的下一天)
+    plan = _sqlite_plan(database._QUESTIONNAIRE_LIST_QUERY + where + ' ORDER BY q.created_at DESC, q.id DESC',
+                        params)
+    assert any("USING INDEX idx_complete_created_at (created_at>? AND created_at<?)" in step for step in plan), plan
+    assert not any("USE TEMP B-TREE" in step for step in plan), plan
+
+    # 只有开始日期
+    with database.get_db_connection() as conn:
+        where, params = database._questionnaire_filters(conn.cursor(), start_date="2025-01-03")
+    plan = _sqlite_plan(database._QUESTIONNAIRE_LIST_QUERY + where, params)
+    assert any("USING INDEX idx_complete_created_at (created_at>?)" in step for step in plan), plan
+
+    # 筛选结果与逐行比较日期一致
+    rows = database.search_questionnaires(start_date="2025-01-03", end_date="2025-01-05")
+    with database.get_db_connection() as conn:
+        expected = conn.execute(
+            "SELECT COUNT(*) FROM complete_questionnaires WHERE DATE(created_at) BETWEEN '2025-01-03' AND '2025-01-05'"
+        ).fetchone()[0]
+    assert len(rows) == expected > 0
+
+    print("✅ 日期筛选使用索引范围扫描")
+
+
+def test_postgres_date_filter_uses_index():
+    """
+    测试 PostgreSQL 的日期筛选可以使用 created_at 索引（没有可用的数据库时跳过）
+    """
+    print("\n=== 测试 PostgreSQL 查询计划 ===")
+    try:
+        import database_postgres
+        conn_context = database_postgres.get_connection()
+        conn = conn_context.__enter__()
+    except Exception as e:
+        pytest.skip(f"无法连接 PostgreSQL（{e}）")
+
+    try:
+        where, params = database_postgres._questionnaire_filters(start_date="2025-01-03", end_date="2025-01-05")
+        with conn.cursor() as c:
+            # 测试库数据量很小，关闭顺序扫描后检查索引是否可用
+            c.execute('SET LOCAL enable_seqscan = off')
+            c.execute('EXPLAIN ' + database_postgres._QUESTIONNAIRE_LIST_QUERY + where, params)
+            plan = "\n".join(row[0] for row in c.fetchall())
+        conn.rollback()
+    finally:
+        conn_context.__exit__(None, None, None)
+
+    assert "idx_complete_created_at" in plan and "Index Cond" in plan, plan
+    print("✅ 日期筛选使用索引")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# 分页问卷测试脚本
+
+import logic
+import questionnaire_pages
+from streamlit.testing.v1 import AppTest
+
+
+def _questionnaire_app():
+    import streamlit as st
+
+    import logic
+    import questionnaire_pages
+
+    bank = logic.get_question_bank()
+    questions = questionnaire_pages.question_list(bank.questions, bank.wjw_questions)
+    answers = questionnaire_pages.render_questionnaire_page(questions)
+    if answers is not None:
+        st.session_state["submitted_answers"] = answers
+
+
+def _click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+
+
+def test_answer_sheet():
+    """
+    测试答题卡：默认选 C，记录选项文本或分数，无法识别的答案记为未作答
+    """
+    print("=== 测试答题卡 ===")
+    sheet = questionnaire_pages.AnswerSheet()
+    assert len(sheet.scores) == 61
+    assert sheet.answers() == {key: "C. 一般" for key in logic.ANSWER_KEYS}
+
+    sheet.set("q_1", "A. 非常符合")
+    sheet.set("wjw_q_33", 1)
+    sheet.set("q_2", "乱填")
+    answers = sheet.answers()
+    assert answers["q_1"] == "A. 非常符合" and answers["wjw_q_33"] == "E. 完全不符"
+    assert "q_2" not in answers and len(answers) == 60
+    assert sheet.option_index("q_1") == 0 and sheet.option_index("q_2") == 2
+
+    print("✅ 答题卡正确")
+
+
+def test_paged_questionnaire():
+    """
+    测试分页问卷：每页只渲染10道题，翻页后答案保留，提交的答案与整张表单一致
+    """
+    print("\n=== 测试分页问卷 ===")
+    at = AppTest.from_function(_questionnaire_app).run()
+    assert len(at.radio) == 10
+    assert [r.key for r in at.radio] == [f"page_q_{i}" for i in range(1, 11)]
+
+    at.radio(key="page_q_1").set_value("A. 非常符合")
+    _click(at, "下一页 ➡️")
+    assert at.radio[0].key == "page_q_11"
+    _click(at, "⬅️ 上一页")
+    assert at.radio(key="page_q_1").value == "A. 非常符合"
+
+    for _ in range(6):
+        _click(at, "下一页 ➡️")
+    assert len(at.radio) == 1 and at.radio[0].key == "page_wjw_q_33"
+    at.radio[0].set_value("E. 完全不符")
+    _click(at, "🚀 提交问卷")
+    assert not at.exception
+
+    expected = {key: "C. 一般" for key in logic.ANSWER_KEYS}
+    expected.update(q_1="A. 非常符合", wjw_q_33="E. 完全不符")
+    answers = at.session_state["submitted_answers"]
+    assert answers == expected
+
+    df_questions, df_types = logic.load_data()
+    bank = logic.get_question_bank()
+    _, part1, part2 = bank.score(answers)
+    assert part1 == logic.calculate_results(expected, df_questions, df_types)
+    assert part2 == logic.calculate_wjw_results(expected, None)
+
+    print("✅ 分页问卷正确")
+
+
+if __name__ == "__main__":
+    print("开始分页问卷测试...\n")
+
+    success = True
+    for test in (test_answer_sheet, test_paged_questionnaire):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！分页问卷功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# 只读连接池测试脚本
+
+import csv
+import sqlite3
+import threading
+
+import pytest
+
+import database
+import logic
+
+
+def _save_submission(nickname, seed):
+    """用真实计算结果保存一份完整问卷"""
+    df_questions, df_types = logic.load_data()
+    df_wjw = logic.load_wjw_data()
+    answers = {f"q_{qid}": logic.ANSWER_OPTIONS[(seed + qid) % 5] for qid in range(1, 29)}
+    wjw_answers = {f"wjw_q_{qid}": logic.ANSWER_OPTIONS[(seed * qid) % 5] for qid in range(1, 34)}
+    user_id = database.get_or_create_user(nickname)
+    return database.save_complete_questionnaire(
+        user_id,
+        logic.calculate_results(answers, df_questions, df_types),
+        logic.calculate_wjw_results(wjw_answers, df_wjw),
+        answers, wjw_answers, {**answers, **wjw_answers}
+    )
+
+
+def test_read_only_connections(temp_database):
+    """
+    测试只读连接：拒绝写入，能读到已提交的数据，查询类函数走只读连接池
+    """
+    print("=== 测试只读连接 ===")
+    _save_submission("读者0", 0)
+
+    with database.get_read_connection() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -database.READ_CACHE_SIZE_KIB
+        try:
+            conn.execute("DELETE FROM users")
+            assert False, "只读连接不应允许写入"
+        except sqlite3.OperationalError:
+            pass
+
+    before = database.get_read_pool().stats()["checkouts"]
+    assert database.get_statistics()["total_questionnaires"] == 1
+    assert len(database.get_all_users()) == 1
+    # 写入后新的读取立即可见
+    _save_submission("读者1", 1)
+    assert database.get_statistics()["total_questionnaires"] == 2
+
+    stats = database.get_pool_stats()
+    assert stats["read"]["checkouts"] == before + 3
+    assert stats["read"]["open_connections"] <= database.READ_POOL_MAX_CONNECTIONS
+
+    print("✅ 只读连接拒绝写入，读取走只读连接池")
+
+
+def test_long_read_does_not_block_writes(temp_database, tmp_path):
+    """
+    测试长时间读取（如导出）进行中时，问卷仍能正常保存；读取看到的是开始时的快照
+    """
+    print("\n=== 测试读写分离 ===")
+    for i in range(3):
+        _save_submission(f"导出用户{i}", i)
+
+    with database.get_read_connection() as conn:
+        cursor = conn.execute("SELECT id FROM complete_questionnaires ORDER BY id")
+        first = cursor.fetchone()  # 读事务保持打开，模拟导出到一半
+
+        saved = []
+        writer = threading.Thread(target=lambda: saved.append(_save_submission("新用户", 9)))
+        writer.start()
+        writer.join(timeout=5)
+        assert not writer.is_alive() and saved, "读取进行中时保存被阻塞"
+
+        rest = cursor.fetchall()
+        assert len(rest) + 1 == 3 and first is not None
+
+    filename = str(tmp_path / "export.csv")
+    database.export_questionnaires(filename)
+    with open(filename, encoding="utf-8-sig") as f:
+        assert len(list(csv.reader(f))) == 1 + 4
+
+    print("✅ 读取期间保存不受影响")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
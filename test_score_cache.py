@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# 评分结果缓存（答案指纹）测试脚本
+
+import pytest
+
+import logic
+
+
+def test_answer_fingerprint(make_submissions):
+    """
+    测试答案指纹只由61道题的分数决定
+    """
+    print("=== 测试答案指纹 ===")
+    submissions = make_submissions(20, 2)
+    answers = submissions[0]["raw_answers"]
+    fingerprint = logic.answer_fingerprint(answers)
+    assert len(fingerprint) == 2 * logic.PACKED_ANSWERS_SIZE
+
+    # 选项文本和分数写法相同，session_state 中的其他键不影响指纹
+    as_scores = {key: logic.parse_answer_score(value) for key, value in answers.items()}
+    assert logic.answer_fingerprint(as_scores) == fingerprint
+    assert logic.answer_fingerprint({**answers, "user_id": 1, "nickname": "x"}) == fingerprint
+
+    fingerprints = {logic.answer_fingerprint(s["raw_answers"]) for s in submissions}
+    distinct = {tuple(sorted(s["raw_answers"].items())) for s in submissions}
+    assert len(fingerprints) == len(distinct)
+
+    print("✅ 答案指纹正确")
+
+
+def test_question_bank_score_cached(make_submissions):
+    """
+    测试 QuestionBank.score 与直接计算一致，重复答案命中缓存，返回的结果互不影响
+    """
+    print("\n=== 测试评分结果缓存 ===")
+    df_questions, df_types = logic.load_data()
+    bank = logic.QuestionBank(df_questions, df_types, logic.load_wjw_data())
+    submissions = make_submissions(30, 3)
+
+    for s in submissions:
+        session_state = {**s["raw_answers"], "user_id": 1, "active_tab": 0}
+        fingerprint, part1, part2 = bank.score(session_state)
+        assert fingerprint == logic.answer_fingerprint(s["raw_answers"])
+        assert part1 == logic.calculate_results(session_state, df_questions, df_types)
+        assert part2 == logic.calculate_wjw_results(session_state, None)
+
+    stats = bank.score_cache_stats()
+    assert stats["misses"] == len({logic.answer_fingerprint(s["raw_answers"]) for s in submissions})
+    assert stats["hits"] == len(submissions) - stats["misses"]
+
+    # 重复提交直接命中缓存；修改返回结果不影响缓存
+    _, part1, part2 = bank.score(submissions[0]["raw_answers"])
+    part1["user_info"]["type_name"] = "被修改"
+    part2["constitution_results"].clear()
+    _, part1_again, part2_again = bank.score(submissions[0]["raw_answers"])
+    assert part1_again == submissions[0]["part1_result"]
+    assert part2_again == submissions[0]["part2_result"]
+    assert bank.score_cache_stats()["hits"] == stats["hits"] + 2
+
+    # 超出编码范围的分数（如 "(6分)"）按原答案计算，不与指纹相同的答案共用缓存
+    unusual = {**submissions[0]["raw_answers"], "q_1": "A. 非常符合 (6分)"}
+    clipped = {**submissions[0]["raw_answers"], "q_1": None}
+    assert logic.answer_fingerprint(unusual) == logic.answer_fingerprint(clipped)
+    bank.score(clipped)
+    _, part1, part2 = bank.score(unusual)
+    assert part1 == logic.calculate_results(unusual, df_questions, df_types)
+    assert part2 == logic.calculate_wjw_results(unusual, None)
+    assert part1 != bank.score(clipped)[1]
+
+    # 题号与答案编码不一致的题库加载时直接报错，不会把新题当作未作答
+    renumbered = df_questions.copy()
+    renumbered.loc[renumbered.index[-1], "id"] = 29
+    try:
+        logic.QuestionBank(renumbered, df_types, logic.load_wjw_data())
+        assert False, "题号不一致时应抛出 ValueError"
+    except ValueError as e:
+        assert "[28]" in str(e) and "[29]" in str(e)
+
+    print("✅ 评分结果缓存正确")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
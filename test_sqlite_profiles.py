@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# SQLite 性能配置档和后台维护测试脚本
+
+import os
+import tempfile
+import time
+
+import database
+
+
+def test_profile_pragmas():
+    """
+    测试连接按配置档设置 PRAGMA，未知配置档报错
+    """
+    print("=== 测试性能配置档 ===")
+    path = os.path.join(tempfile.mkdtemp(), "profile.db")
+    profile = database.SQLITE_PROFILES["throughput"]
+    pool = database.DatabasePool(db_path=path, profile="throughput")
+    conn = pool.get_connection()
+    try:
+        pragma = lambda name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+        assert pragma("cache_size") == -profile["cache_size_kib"]
+        assert pragma("mmap_size") == profile["mmap_size"]
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("wal_autocheckpoint") == profile["wal_autocheckpoint"]
+        assert pragma("journal_mode") == "wal"
+    finally:
+        pool.release_connection(conn)
+        pool.close_all()
+
+    try:
+        database.DatabasePool(db_path=path, profile="turbo")
+        assert False, "未知配置档应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✅ 配置档 PRAGMA 设置正确")
+
+
+def test_maintenance_truncates_wal():
+    """
+    测试后台维护：TRUNCATE 检查点清空 WAL 文件，线程按间隔运行并能停止
+    """
+    print("\n=== 测试后台维护 ===")
+    path = os.path.join(tempfile.mkdtemp(), "maintenance.db")
+    pool = database.DatabasePool(db_path=path, profile="balanced")
+    conn = pool.get_connection()
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, payload TEXT)")
+    conn.executemany("INSERT INTO t (payload) VALUES (?)", [("x" * 200,) for _ in range(2000)])
+    conn.commit()
+    pool.release_connection(conn)
+    assert os.path.getsize(path + "-wal") > 0  # 池中连接仍打开，WAL 不会自动删除
+
+    scheduler = database.MaintenanceScheduler(path, interval=0.05)
+    busy, _, _ = scheduler.run_once()
+    assert busy == 0 and os.path.getsize(path + "-wal") == 0
+
+    scheduler.start()
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["runs"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    scheduler.stop()
+    stats = scheduler.stats()
+    assert stats["runs"] >= 3 and stats["errors"] == 0
+    pool.close_all()
+
+    print("✅ 检查点清空 WAL，后台线程正常启停")
+
+
+if __name__ == "__main__":
+    print("开始 SQLite 配置档测试...\n")
+
+    success = True
+    for test in (test_profile_pragmas, test_maintenance_truncates_wal):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！配置档和后台维护功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# 静态资源 URL 测试脚本
+
+import base64
+import os
+import tempfile
+
+import static_assets
+
+
+def test_asset_urls():
+    """
+    测试带哈希的 URL 和 data URI，内容变化后 URL 随之改变
+    """
+    print("=== 测试静态资源 URL ===")
+    for name in ["doro.gif", "account.jpg"]:
+        url = static_assets.hashed_url(name)
+        assert url.startswith(f"app/static/{name}?v=") and url == static_assets.hashed_url(name)
+
+    uri = static_assets.data_uri("doro.gif")
+    with open(os.path.join(static_assets.STATIC_DIR, "doro.gif"), "rb") as f:
+        assert uri == "data:image/gif;base64," + base64.b64encode(f.read()).decode()
+
+    # 项目配置开启了静态文件服务，页面中不再内联图片
+    assert static_assets.static_serving_enabled()
+    assert static_assets.asset_url("doro.gif") == static_assets.hashed_url("doro.gif")
+
+    static_dir = static_assets.STATIC_DIR
+    static_assets.STATIC_DIR = tempfile.mkdtemp()
+    try:
+        path = os.path.join(static_assets.STATIC_DIR, "logo.png")
+        urls = []
+        for content in [b"v1", b"v2"]:
+            with open(path, "wb") as f:
+                f.write(content)
+            static_assets._read_asset.cache_clear()
+            urls.append(static_assets.hashed_url("logo.png"))
+        assert urls[0] != urls[1]
+    finally:
+        static_assets.STATIC_DIR = static_dir
+        static_assets._read_asset.cache_clear()
+
+    print("✅ 静态资源 URL 正确")
+
+
+if __name__ == "__main__":
+    print("开始静态资源测试...\n")
+
+    success = True
+    for test in (test_asset_urls,):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！静态资源功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# 统计表测试脚本
+
+from collections import Counter
+
+import pytest
+
+import database
+
+
+def _statistics_by_scan():
+    """直接扫描问卷表得到的统计结果，用于和统计表对照"""
+    with database.get_db_connection() as conn:
+        total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        codes = [row[0] for row in conn.execute("SELECT bagang_type_code FROM complete_questionnaires")]
+        # created_at 是 UTC 时间，"今天"按 UTC 日期计算
+        today_count = conn.execute(
+            "SELECT COUNT(*) FROM complete_questionnaires WHERE DATE(created_at) = date('now')"
+        ).fetchone()[0]
+    return total_users, len(codes), today_count, Counter(codes)
+
+
+def _assert_statistics_match():
+    stats = database.get_statistics()
+    total_users, total_questionnaires, today_count, type_counts = _statistics_by_scan()
+    assert stats["total_users"] == total_users
+    assert stats["total_questionnaires"] == total_questionnaires
+    assert stats["today_count"] == today_count
+    assert {item["type_code"]: item["count"] for item in stats["type_distribution"]} == dict(type_counts)
+    counts = [item["count"] for item in stats["type_distribution"]]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_statistics_follow_writes(temp_database, make_submissions):
+    """
+    测试插入、批量导入、修改、删除后统计表与全表扫描结果一致
+    """
+    print("=== 测试统计表随写入更新 ===")
+    _assert_statistics_match()
+
+    submissions = make_submissions(300, 40)
+    for submission in submissions[:100]:
+        submission["created_at"] = None  # 今天
+    database.bulk_import_questionnaires(submissions, chunk_size=128)
+    _assert_statistics_match()
+    assert database.get_statistics()["today_count"] == 100
+
+    first = submissions[0]
+    database.save_complete_questionnaire(
+        database.get_or_create_user("新用户"), first["part1_result"], first["part2_result"],
+        first["part1_answers"], first["part2_answers"], first["raw_answers"]
+    )
+    _assert_statistics_match()
+
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE complete_questionnaires SET bagang_type_code = 'XXXX', created_at = '2020-01-01' "
+                     "WHERE id % 7 = 0")
+        conn.execute("DELETE FROM complete_questionnaires WHERE id % 5 = 0")
+        conn.execute("DELETE FROM users WHERE id NOT IN (SELECT user_id FROM complete_questionnaires)")
+        conn.commit()
+    _assert_statistics_match()
+
+    print("✅ 统计表与全表扫描结果一致")
+
+
+def test_rebuild_statistics(temp_database, make_submissions):
+    """
+    测试统计表被破坏后可以重建
+    """
+    print("\n=== 测试重建统计表 ===")
+    database.bulk_import_questionnaires(make_submissions(50, 10))
+
+    with database.get_db_connection() as conn:
+        conn.execute("DELETE FROM stats_type_counts")
+        conn.execute("UPDATE stats_counters SET value = 0")
+        conn.commit()
+    assert database.get_statistics()["total_questionnaires"] == 0
+
+    database.rebuild_statistics()
+    _assert_statistics_match()
+
+    # get_statistics 只读统计表，不再扫描问卷表
+    statements = []
+    with database.get_db_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        database.get_statistics()
+        conn.set_trace_callback(None)
+    assert not any("complete_questionnaires" in sql for sql in statements)
+
+    print("✅ 统计表重建正确")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
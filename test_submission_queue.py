@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# 问卷后台写入队列测试脚本
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import database
+from submission_queue import SubmissionQueue
+
+
+def _records(submissions):
+    """把测试问卷转换为 save_complete_questionnaire 的参数"""
+    records = []
+    for submission in submissions:
+        records.append({
+            "user_id": database.get_or_create_user(submission["nickname"]),
+            "part1_result": submission["part1_result"],
+            "part2_result": submission["part2_result"],
+            "part1_answers": submission["part1_answers"],
+            "part2_answers": submission["part2_answers"],
+            "raw_answers": submission["raw_answers"]
+        })
+    return records
+
+
+def _count_questionnaires():
+    with database.get_db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM complete_questionnaires").fetchone()[0]
+
+
+def test_queue_batches_writes(temp_database, make_submissions):
+    """
+    测试并发入队后批量写入 SQLite，写完后 spool 目录清空
+    """
+    print("=== 测试批量写入 ===")
+    spool_dir = tempfile.mkdtemp()
+    records = _records(make_submissions(200, 5))
+    batches = []
+
+    def save_many(batch):
+        batches.append(len(batch))
+        database.save_complete_questionnaires(batch)
+
+    queue = SubmissionQueue(database.save_complete_questionnaire, save_many=save_many,
+                            spool_dir=spool_dir, batch_size=50, flush_interval=0.2)
+    try:
+        threads = [threading.Thread(target=lambda part: [queue.enqueue(**r) for r in part], args=(records[i::8],))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert queue.flush(timeout=10)
+    finally:
+        queue.stop()
+
+    assert _count_questionnaires() == 200
+    assert sum(batches) == 200 and max(batches) <= 50
+    assert len(batches) < 200  # 确实合并成了批量写入
+    assert [f for f in os.listdir(spool_dir) if f.endswith(".json")] == []
+    assert queue.get_stats()["saved"] == 200
+
+    shutil.rmtree(spool_dir, ignore_errors=True)
+    print(f"✅ 200 份问卷分 {len(batches)} 批写入")
+
+
+def test_queue_retries_and_recovers(temp_database, make_submissions):
+    """
+    测试数据库不可用时重试，进程重启后从 spool 目录恢复未写入的问卷
+    """
+    print("\n=== 测试重试与重启恢复 ===")
+    spool_dir = tempfile.mkdtemp()
+    records = _records(make_submissions(3, 5))
+    attempts = [0]
+
+    def unavailable(*args, **kwargs):
+        attempts[0] += 1
+        raise ConnectionError("数据库不可用")
+
+    queue = SubmissionQueue(unavailable, spool_dir=spool_dir, flush_interval=0, retry_delay=0.01)
+    for record in records:
+        queue.enqueue(**record)
+    assert not queue.flush(timeout=0.3)
+    queue.stop()
+    assert attempts[0] > 3  # 失败后持续重试
+    spooled = sorted(f for f in os.listdir(spool_dir) if f.endswith(".json"))
+    assert len(spooled) == 3
+
+    # 提交时间在入队时记录；早期没有 created_at 的 spool 文件按条目ID中的入队时间补上
+    submitted_at = []
+    for filename in spooled:
+        with open(os.path.join(spool_dir, filename), encoding="utf-8") as f:
+            submitted_at.append(json.load(f)["created_at"])
+    legacy_id = f"{int(datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc).timestamp()) * 10**9}-legacy00"
+    with open(os.path.join(spool_dir, f"{legacy_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(records[0], f, ensure_ascii=False)
+    submitted_at.insert(0, "2025-01-02 03:04:05")
+    time.sleep(1.1)  # 写入时间与提交时间不同
+
+    # "重启"：新队列从 spool 目录恢复，数据库恢复后全部写入
+    queue = SubmissionQueue(database.save_complete_questionnaire, spool_dir=spool_dir, flush_interval=0)
+    try:
+        assert queue.get_stats()["recovered"] == 4
+        assert queue.flush(timeout=10)
+    finally:
+        queue.stop()
+
+    assert _count_questionnaires() == 4
+    with database.get_db_connection() as conn:
+        rows = conn.execute("SELECT created_at FROM complete_questionnaires ORDER BY id").fetchall()
+    assert [row[0] for row in rows] == submitted_at
+    assert [f for f in os.listdir(spool_dir) if f.endswith(".json")] == []
+
+    shutil.rmtree(spool_dir, ignore_errors=True)
+    print("✅ 失败重试、重启恢复正确")
+
+
+def test_queue_dead_letters_bad_records(temp_database, make_submissions):
+    """
+    测试批量写入失败时逐条定位，反复失败的问卷移入 failed 目录，不阻塞其他问卷
+    """
+    print("\n=== 测试失败问卷隔离 ===")
+    spool_dir = tempfile.mkdtemp()
+    records = _records(make_submissions(4, 5))
+    records[1] = {**records[1], "part1_result": {}}  # 缺少字段，永远写不进去
+
+    queue = SubmissionQueue(database.save_complete_questionnaire, save_many=database.save_complete_questionnaires,
+                            spool_dir=spool_dir, flush_interval=0.1, retry_delay=0.01, max_attempts=3)
+    try:
+        for record in records:
+            queue.enqueue(**record)
+        assert queue.flush(timeout=10)
+    finally:
+        queue.stop()
+
+    assert _count_questionnaires() == 3
+    assert queue.get_stats()["dead_lettered"] == 1
+    assert len(os.listdir(os.path.join(spool_dir, "failed"))) == 1
+
+    shutil.rmtree(spool_dir, ignore_errors=True)
+    print("✅ 失败问卷已隔离，其余问卷正常写入")
+
+
+def test_worker_survives_unexpected_errors(temp_database, make_submissions):
+    """
+    测试后台线程遇到意外错误时不退出：记录错误、整批放回队列，随后正常写入；
+    线程已退出时入队直接报错，不会假装提交成功
+    """
+    print("\n=== 测试后台线程异常保护 ===")
+    spool_dir = tempfile.mkdtemp()
+    records = _records(make_submissions(3, 5))
+
+    queue = SubmissionQueue(database.save_complete_questionnaire, save_many=database.save_complete_questionnaires,
+                            spool_dir=spool_dir, flush_interval=0, retry_delay=0.01)
+    write_batch = queue._write_batch
+    calls = [0]
+
+    def broken_once(batch):
+        calls[0] += 1
+        if calls[0] == 1:
+            raise OSError("磁盘出错")
+        return write_batch(batch)
+
+    queue._write_batch = broken_once
+    try:
+        for record in records:
+            queue.enqueue(**record)
+        assert queue.flush(timeout=10)
+        stats = queue.get_stats()
+        assert stats["worker_alive"] and stats["worker_errors"] == 1 and "磁盘出错" in stats["last_error"]
+        assert stats["saved"] == 3
+    finally:
+        queue.stop()
+    assert _count_questionnaires() == 3
+
+    assert not queue.get_stats()["worker_alive"]
+    try:
+        queue.enqueue(**records[0])
+        assert False, "队列停止后入队应抛出 RuntimeError"
+    except RuntimeError:
+        pass
+
+    shutil.rmtree(spool_dir, ignore_errors=True)
+    print("✅ 意外错误后继续写入")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# Supabase 批量写入测试脚本（本地模拟 PostgREST 接口，不需要真实的 Supabase 项目）
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from supabase import ClientOptions, create_client
+
+import database_supabase
+from request_batcher import RequestBatcher
+
+
+class _PostgRESTStandIn(BaseHTTPRequestHandler):
+    """只实现用户查询 / upsert 和问卷插入；server.users 为 昵称 -> ID"""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _record(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        url = urlsplit(self.path)
+        with self.server.lock:
+            self.server.requests.append((self.command, url.path, self.headers.get("Prefer"), body))
+        return url, body
+
+    def do_GET(self):
+        url, _ = self._record()
+        assert url.path == "/rest/v1/users"
+        wanted = parse_qs(url.query)["nickname"][0]
+        assert wanted.startswith("in.(") and wanted.endswith(")")
+        names = [name.strip('"') for name in wanted[4:-1].split(",")]
+        with self.server.lock:
+            rows = [{"id": self.server.users[n], "nickname": n} for n in names if n in self.server.users]
+        self._reply(200, rows)
+
+    def do_POST(self):
+        url, body = self._record()
+        if url.path == "/rest/v1/users":
+            inserted = []
+            with self.server.lock:
+                for row in body:
+                    if row["nickname"] not in self.server.users:
+                        self.server.users[row["nickname"]] = len(self.server.users) + 1
+                        inserted.append({"id": self.server.users[row["nickname"]], "nickname": row["nickname"]})
+            self._reply(201, inserted)
+        else:
+            assert url.path == "/rest/v1/complete_questionnaires"
+            self._reply(201)
+
+
+def _start_stand_in(users=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PostgRESTStandIn)
+    server.requests = []
+    server.users = dict(users or {})
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    database_supabase.supabase = create_client(
+        f"http://127.0.0.1:{server.server_port}", "test-key",
+        options=ClientOptions(httpx_client=database_supabase.create_http_client())
+    )
+    database_supabase._user_cache.clear()
+    return server
+
+
+def test_request_batcher():
+    """
+    测试并发请求合并为少量批次，重复的键只查询一次，异常传给同一批的所有请求，
+    批量处理卡住时等待超时
+    """
+    print("=== 测试请求合并 ===")
+    calls = []
+
+    def handler(keys):
+        calls.append(sorted(keys))
+        time.sleep(0.01)
+        if "坏" in keys:
+            raise RuntimeError("批量请求失败")
+        return {key: f"id-{key}" for key in keys}
+
+    batcher = RequestBatcher(handler, max_batch=8, max_wait=0.05)
+    keys = [str(i % 20) for i in range(40)]
+    results = {}
+    barrier = threading.Barrier(len(keys))
+
+    def worker(i, key):
+        barrier.wait()
+        results[i] = batcher.submit(key)
+
+    threads = [threading.Thread(target=worker, args=(i, key)) for i, key in enumerate(keys)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"id-{key}" for i, key in enumerate(keys)}
+    assert all(len(c) == len(set(c)) for c in calls)  # 同一批中重复的键只查询一次
+    assert len(calls) <= 6, calls
+    assert batcher.stats() == {"requests": 40, "batches": len(calls), "timeouts": 0}
+
+    try:
+        RequestBatcher(handler, max_wait=0).submit("坏")
+        assert False, "批量请求失败应抛出异常"
+    except RuntimeError:
+        pass
+
+    # 批量处理卡住时，发起请求的线程和同一批的其他线程都按时报错
+    release = threading.Event()
+    stuck = RequestBatcher(lambda keys: release.wait() and {}, max_wait=0.05, timeout=0.2)
+    errors = []
+
+    def waiter(key):
+        try:
+            stuck.submit(key)
+        except TimeoutError as e:
+            errors.append(str(e))
+
+    waiters = [threading.Thread(target=waiter, args=(key,)) for key in ["甲", "乙", "丙"]]
+    start = time.monotonic()
+    for t in waiters:
+        t.start()
+    for t in waiters:
+        t.join(timeout=5)
+    assert len(errors) == 3 and time.monotonic() - start < 2
+    assert stuck.stats()["timeouts"] == 3
+    release.set()
+
+    print(f"✅ 40 个请求合并为 {len(calls)} 批")
+
+
+def test_burst_logins_batched():
+    """
+    测试一个班级同时登录：已有和新建用户都只需少量请求，ID 与逐个创建一致
+    """
+    print("\n=== 测试并发登录合并 ===")
+    server = _start_stand_in(users={f"学生{i}": i + 1 for i in range(10)})
+    nicknames = [f"学生{i}" for i in range(40)]
+    results = {}
+    barrier = threading.Barrier(len(nicknames))
+
+    def login(nickname):
+        barrier.wait()
+        results[nickname] = database_supabase.get_or_create_user(nickname)
+
+    try:
+        threads = [threading.Thread(target=login, args=(n,)) for n in nicknames]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        requests_after_burst = len(server.requests)
+
+        # 再次登录命中缓存，不发请求
+        assert database_supabase.get_or_create_user("学生5") == 6
+    finally:
+        server.shutdown()
+
+    assert results == {n: server.users[n] for n in nicknames}
+    assert len(set(results.values())) == 40
+    assert requests_after_burst <= 6, server.requests
+    assert len(server.requests) == requests_after_burst
+
+    print(f"✅ 40 个同时登录只发出 {requests_after_burst} 个请求")
+
+
+def test_save_questionnaires_in_one_request(make_submissions):
+    """
+    测试批量保存问卷：一批问卷一个数组 insert 请求，超过上限时分块
+    """
+    print("\n=== 测试问卷批量插入 ===")
+    submissions = make_submissions(30, 3)
+    records = [{
+        "user_id": i % 3 + 1,
+        "part1_result": s["part1_result"],
+        "part2_result": s["part2_result"],
+        "part1_answers": s["part1_answers"],
+        "part2_answers": s["part2_answers"],
+        "raw_answers": s["raw_answers"],
+        "created_at": s["created_at"]
+    } for i, s in enumerate(submissions)]
+
+    server = _start_stand_in()
+    try:
+        database_supabase.save_complete_questionnaires(records)
+        database_supabase.SUPABASE_INSERT_BATCH_SIZE = 12
+        database_supabase.save_complete_questionnaires(records)
+    finally:
+        database_supabase.SUPABASE_INSERT_BATCH_SIZE = 500
+        server.shutdown()
+
+    sizes = [len(body) for _, _, _, body in server.requests]
+    assert sizes == [30, 12, 12, 6]
+    _, _, prefer, body = server.requests[0]
+    assert "return=minimal" in prefer
+    single = database_supabase._questionnaire_row(**records[0])
+    assert body[0] == json.loads(json.dumps(single))
+    assert body[0]["created_at"] == submissions[0]["created_at"] + "+00:00"  # 提交时间按 UTC 写入
+    assert body[0]["raw_answers"] is None and len(body[0]["answer_codes"]) == 2 + 2 * 23
+
+    print("✅ 一批问卷一个请求")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
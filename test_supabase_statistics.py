@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Supabase 统计函数测试脚本（本地模拟 PostgREST 接口，不需要真实的 Supabase 项目）
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from supabase import create_client
+
+import database_supabase
+
+SUMMARY = {
+    "total_users": 12,
+    "total_questionnaires": 30,
+    "today_count": 4,
+    "type_distribution": [
+        {"type_code": "CVDQ", "type_name": "听风者", "count": 20},
+        {"type_code": None, "type_name": None, "count": 10}
+    ]
+}
+COUNTS = {"users": 12, "complete_questionnaires": 30}
+TYPE_ROWS = [{"bagang_type_code": "CVDQ", "bagang_type_name": "听风者"}] * 2 + \
+            [{"bagang_type_code": "HSWB", "bagang_type_name": "燃烧者"}]
+
+
+class _PostgRESTStandIn(BaseHTTPRequestHandler):
+    """只实现 get_statistics 用到的接口；server.has_rpc 为 False 时模拟统计函数不存在"""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _record(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        self.server.requests.append((self.command, self.path, body))
+        return urlsplit(self.path), body
+
+    def do_POST(self):
+        url, body = self._record()
+        if url.path == "/rest/v1/rpc/get_statistics_summary" and self.server.has_rpc:
+            self._reply(200, SUMMARY)
+        else:
+            self._reply(404, {"code": "PGRST202", "message": "Could not find the function"})
+
+    def do_HEAD(self):
+        url, _ = self._record()
+        table = url.path.rsplit("/", 1)[-1]
+        count = 1 if "created_at" in url.query else COUNTS[table]
+        self._reply(200, headers={"Content-Range": f"*/{count}"})
+
+    def do_GET(self):
+        url, _ = self._record()
+        assert url.path == "/rest/v1/complete_questionnaires"
+        self._reply(200, TYPE_ROWS, headers={"Content-Range": f"0-{len(TYPE_ROWS) - 1}/*"})
+
+
+def _start_stand_in(has_rpc):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PostgRESTStandIn)
+    server.requests = []
+    server.has_rpc = has_rpc
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    database_supabase.supabase = create_client(f"http://127.0.0.1:{server.server_port}", "test-key")
+    return server
+
+
+def test_statistics_single_rpc():
+    """
+    测试 get_statistics 只发一次 RPC 请求，直接返回数据库汇总的结果
+    """
+    print("=== 测试统计函数 ===")
+    server = _start_stand_in(has_rpc=True)
+    try:
+        stats = database_supabase.get_statistics()
+    finally:
+        server.shutdown()
+
+    assert stats == SUMMARY
+    assert len(server.requests) == 1
+    method, path, body = server.requests[0]
+    assert (method, path) == ("POST", "/rest/v1/rpc/get_statistics_summary")
+    assert body == {}  # "今天"由数据库按统计触发器的时区决定
+
+    print("✅ 一次往返返回汇总结果")
+
+
+def test_statistics_fallback_without_rpc():
+    """
+    测试统计函数不存在时回退到直接统计：计数使用 HEAD 请求，不下载整行数据
+    """
+    print("\n=== 测试回退统计 ===")
+    server = _start_stand_in(has_rpc=False)
+    try:
+        stats = database_supabase.get_statistics()
+    finally:
+        server.shutdown()
+
+    assert stats["total_users"] == 12 and stats["total_questionnaires"] == 30
+    assert stats["today_count"] == 1
+    assert stats["type_distribution"] == [
+        {"type_code": "CVDQ", "type_name": "听风者", "count": 2},
+        {"type_code": "HSWB", "type_name": "燃烧者", "count": 1}
+    ]
+
+    methods = [method for method, _, _ in server.requests]
+    assert methods == ["POST", "HEAD", "HEAD", "GET", "HEAD"]
+    assert all("select=%2A" not in path and "select=*" not in path for _, path, _ in server.requests)
+
+    print("✅ 回退统计只用 HEAD 计数")
+
+
+if __name__ == "__main__":
+    print("开始 Supabase 统计测试...\n")
+
+    success = True
+    for test in (test_statistics_single_rpc, test_statistics_fallback_without_rpc):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e!r}")
+            success = False
+
+    print("\n=== 测试结果 ===")
+    if success:
+        print("🎉 所有测试通过！Supabase 统计功能正常")
+    else:
+        print("💥 部分测试失败，请检查错误信息")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# 用户缓存与昵称唯一约束测试脚本
+
+import sqlite3
+import threading
+
+import pytest
+
+import database
+from ttl_cache import TTLCache
+
+
+def test_ttl_cache():
+    """
+    测试 LRU 淘汰、过期和命中统计
+    """
+    print("=== 测试 TTL 缓存 ===")
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)  # 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    now[0] = 10.5
+    assert cache.get("a") is None  # 已过期
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+    print("✅ LRU 淘汰、过期和统计正确")
+
+
+def test_get_or_create_user_cached(temp_database):
+    """
+    测试重复调用 get_or_create_user 命中缓存，不再访问数据库
+    """
+    print("\n=== 测试用户缓存 ===")
+
+    user_id = database.get_or_create_user("缓存用户")
+    before = database.get_user_cache_stats()
+
+    statements = []
+    with database.get_db_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        for _ in range(100):
+            assert database.get_or_create_user("缓存用户") == user_id
+        conn.set_trace_callback(None)
+    assert statements == []
+
+    after = database.get_user_cache_stats()
+    assert after["hits"] - before["hits"] == 100
+    assert after["misses"] == before["misses"]
+
+    # 切换数据库后缓存失效
+    temp_database()
+    assert database.get_user_cache_stats()["size"] == 0
+
+    print("✅ 重复查询命中缓存")
+
+
+def test_concurrent_first_login(temp_database):
+    """
+    测试多个线程同时首次登录同一昵称只创建一个用户
+    """
+    print("\n=== 测试并发首次登录 ===")
+
+    results = []
+    barrier = threading.Barrier(8)
+
+    def login():
+        barrier.wait()
+        results.append(database.get_or_create_user("同时登录"))
+
+    threads = [threading.Thread(target=login) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with database.get_db_connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM users WHERE nickname = '同时登录'").fetchone()[0]
+        try:
+            conn.execute("INSERT INTO users (nickname) VALUES ('同时登录')")
+            assert False, "重复昵称应违反唯一约束"
+        except sqlite3.IntegrityError:
+            conn.rollback()
+    assert count == 1 and len(set(results)) == 1 and len(results) == 8
+
+    print("✅ 并发首次登录只创建一个用户")
+
+
+def test_duplicate_nicknames_merged(temp_database, tmp_path):
+    """
+    测试迁移合并已有的重复昵称，问卷归到最早创建的用户
+    """
+    print("\n=== 测试重复昵称合并 ===")
+    path = tmp_path / "duplicates.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, nickname TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE complete_questionnaires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+        bagang_type_code TEXT, bagang_type_name TEXT, bagang_radar_data TEXT, bagang_energy_data TEXT,
+        bagang_answers TEXT, wjw_main_constitution TEXT, wjw_main_score INTEGER, wjw_main_result TEXT,
+        wjw_all_results TEXT, wjw_answers TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    INSERT INTO users (nickname) VALUES ('重复'), ('唯一'), ('重复'), ('重复');
+    INSERT INTO complete_questionnaires (user_id, bagang_type_code) VALUES (1, 'A'), (3, 'B'), (4, 'C'), (2, 'D');
+    """)
+    conn.close()
+
+    temp_database(path)
+
+    with database.get_db_connection() as conn:
+        users = conn.execute("SELECT id, nickname FROM users ORDER BY id").fetchall()
+        owners = conn.execute("SELECT bagang_type_code, user_id FROM complete_questionnaires ORDER BY id").fetchall()
+    assert [tuple(u) for u in users] == [(1, "重复"), (2, "唯一")]
+    assert [tuple(o) for o in owners] == [("A", 1), ("B", 1), ("C", 1), ("D", 2)]
+    assert database.get_statistics()["total_users"] == 2
+    assert database.get_or_create_user("重复") == 1
+
+    print("✅ 重复昵称已合并")
+
+
+if __name__ == "__main__":
+    # 测试用到 conftest.py 中的夹具，通过 pytest 运行
+    raise SystemExit(pytest.main([__file__, "-v"]))
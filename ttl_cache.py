@@ -0,0 +1,87 @@
+"""
+带过期时间的 LRU 缓存（线程安全，三个数据库后端共用）
+
+Streamlit 每次交互都会重新执行整个脚本，同一个昵称会被反复查询；
+把昵称 -> 用户ID 缓存在进程内，绝大多数重跑不再访问数据库。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU + TTL 缓存
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 条目写入 ttl 秒后过期（过期后按未命中处理）
+    - 记录命中 / 未命中 / 淘汰次数，供 stats() 查看
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (过期时间, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """读取缓存，不存在或已过期时返回 default"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                expires_at, value = item
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """写入缓存（重新计算过期时间）"""
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """删除并返回一个条目"""
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            return default if item is _MISSING else item[1]
+
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        """
+        Returns:
+            dict: size, maxsize, ttl, hits, misses, evictions, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }